@@ -0,0 +1,801 @@
+#!/usr/bin/python
+
+###
+# DMX Benchmarks
+###
+# Times the hot paths of the DMX-controller:
+#	DMXPacket slot get/set & (de)serialization, DMXReceive parsing,
+#	DMXUSBPacket field packing & unpacking, DMXUSBPro send & read_packet,
+#	the steps of DMXCtrl.fadeScene() and of a cue-transition, the OSC /dmx/channel & /dmx/scene handlers,
+#	the network output-backends, the decoding of network DMX-input, the effects-engine, the fixture-patch, the output-processors, the show-recorder & -player
+#	and the shared-memory hand-over of split mode.
+#
+# No 'DMX USB Pro' box is needed; the box is emulated by an in-memory serial-port (see DMXBenchSerial),
+# or, for the '*-pty' benchmarks, by a thread at the other end of a pseudo-terminal (see DMXBenchWidget)
+#
+# Every benchmark is run for at least 'min_time' seconds per round, for 'repeat' rounds.
+# The results are written as JSON (together with the git-commit, Python- & numpy-versions),
+# so they can be compared with the results of another commit:
+#	python dmxbench.py -o before.json
+#	... change some code ...
+#	python dmxbench.py -c before.json
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+import os, sys, optparse, platform, re, socket, struct, tempfile, time, threading
+
+try:
+	import json
+except ImportError:
+	import simplejson as json
+
+import numpy
+
+import OSC
+
+from dmx512 import *
+from dmxusbpro import *
+from dmxoutput import *
+from dmxnetinput import *
+from dmxmerge import *
+from dmxscenes import *
+from dmxcues import *
+from dmxeffects import *
+from dmxpatch import *
+from dmxmasters import *
+from dmxcurves import *
+from dmxrecord import *
+from dmxshm import *
+import dmxctrl
+
+
+def _usbPacket(label, data):
+	"""Return a DMXUSBPacket (as a string) with the given label & data
+	"""
+	return struct.pack('<BBH', DMXUSBCodes['SOM'], label, len(data)) + data + chr(DMXUSBCodes['EOM'])
+
+# the box' replies to 'GET_WIDGET_PARAMS' (firmware v1.44, 40 frames/s) & 'GET_WIDGET_SERIAL' requests
+widget_replies = {DMXUSBCodes['GET_WIDGET_PARAMS']:_usbPacket(DMXUSBCodes['GET_WIDGET_PARAMS'], '\x2c\x01\x09\x01\x28'),
+				DMXUSBCodes['GET_WIDGET_SERIAL']:_usbPacket(DMXUSBCodes['GET_WIDGET_SERIAL'], '\x78\x56\x34\x12')}
+
+def rxPacket(values):
+	"""Return a 'RX_DMX' packet from the box (as a string), holding a DMXPacket with the given slot-values
+	"""
+	return _usbPacket(DMXUSBCodes['RX_DMX'], '\x00\x00' + values)
+
+
+class DMXBenchSerial(object):
+	"""In-memory stand-in for the serial-port of a 'DMX USB Pro' box.
+	Written packets are discarded, except widget-parameter & -serial requests, which are answered.
+	When there is no answer to be read, reading returns an endless stream of the given 'rx' packet (if any).
+	"""
+	portstr = "<memory>"
+	
+	def __init__(self, rx=None):
+		self.rx = rx
+		self.buf = ""
+		self.pos = 0
+		self.written = 0
+	
+	def write(self, data):
+		self.written += len(data)
+		if data[1] in ('\x03', '\x0a'):
+			self.buf = self.buf[self.pos:] + widget_replies[ord(data[1])]
+			self.pos = 0
+	
+	def read(self, size=1):
+		if (self.pos + size > len(self.buf)) and (self.rx != None):
+			self.buf = self.buf[self.pos:] + (self.rx * (1 + (size / len(self.rx))))
+			self.pos = 0
+			
+		out = self.buf[self.pos:self.pos + size]
+		self.pos += len(out)
+		return out
+	
+	def flush(self):
+		pass
+	
+	def setTimeout(self, timeout):
+		pass
+	
+	def close(self):
+		pass
+
+
+class DMXBenchWidget(threading.Thread):
+	"""Emulates a 'DMX USB Pro' box at the master-end of a pseudo-terminal.
+	Open the pseudo-terminal's slave-end ('portname') with DMXUSBPro(...).
+	Requests are answered like DMXBenchSerial does; while 'rx' is set, it is written continuously.
+	"""
+	def __init__(self):
+		threading.Thread.__init__(self, name="DMXBenchWidget")
+		self.setDaemon(True)
+		
+		(self.master, self.slave) = os.openpty()
+		self.portname = os.ttyname(self.slave)
+		self.rx = None
+		self.running = True
+		self.received = 0
+	
+	def run(self):
+		import select
+		
+		buf = ""
+		while self.running:
+			wr = []
+			if self.rx != None:
+				wr = [self.master]
+				
+			(r, w, x) = select.select([self.master], wr, [], 0.1)
+			if len(r):
+				buf += os.read(self.master, 4096)
+				
+			while len(buf) >= 4:
+				size = struct.unpack('<H', buf[2:4])[0]
+				if len(buf) < size + 5:
+					break
+					
+				label = ord(buf[1])
+				buf = buf[size + 5:]
+				self.received += 1
+				if label in widget_replies:
+					os.write(self.master, widget_replies[label])
+					
+			if len(w):
+				os.write(self.master, self.rx)
+	
+	def stop(self):
+		self.running = False
+		self.join()
+		os.close(self.master)
+		os.close(self.slave)
+
+
+class DMXBench(object):
+	"""Runs & times benchmarks, and collects the results
+	"""
+	def __init__(self, min_time=0.2, repeat=5, pattern=None, out=sys.stdout):
+		"""Every benchmark is run for at least 'min_time' seconds per round, for 'repeat' rounds.
+		Only the benchmarks whose name matches the regular expression 'pattern' (if given) are run
+		"""
+		self.min_time = min_time
+		self.repeat = repeat
+		self.pattern = None
+		if pattern != None:
+			self.pattern = re.compile(pattern)
+			
+		self.out = out
+		self.results = []
+	
+	def wanted(self, name):
+		"""Return True if the named benchmark should be run
+		"""
+		return (self.pattern == None) or (self.pattern.search(name) != None)
+	
+	def measure(self, name, run, unit='op'):
+		"""Time 'run', a function that performs the given nr of operations when called as run(n)
+		The nr of operations per round is doubled until one round takes at least 'min_time' seconds.
+		"""
+		if not self.wanted(name):
+			return
+			
+		n = 1
+		while True:
+			start = time.time()
+			run(n)
+			elapsed = time.time() - start
+			if elapsed >= self.min_time:
+				break
+				
+			n *= 2
+			
+		times = [elapsed / n]
+		for i in range(self.repeat - 1):
+			start = time.time()
+			run(n)
+			times.append((time.time() - start) / n)
+			
+		times.sort()
+		result = {'name':name, 'unit':unit, 'ops':n, 'rounds':len(times),
+				'best_us':times[0] * 1e6, 'median_us':times[len(times) / 2] * 1e6, 'worst_us':times[-1] * 1e6,
+				'ops_per_sec':1. / times[len(times) / 2]}
+		self.results.append(result)
+		if self.out != None:
+			self.out.write("%-32s %12.2f us/%s  (best %.2f, %d x %d %ss)\n" %
+					(name, result['median_us'], unit, result['best_us'], len(times), n, unit))
+	
+	def skip(self, name, reason):
+		"""Note that the named benchmark could not be run
+		"""
+		if not self.wanted(name):
+			return
+			
+		self.results.append({'name':name, 'skipped':reason})
+		if self.out != None:
+			self.out.write("%-32s skipped: %s\n" % (name, reason))
+	
+	def report(self):
+		"""Return the results, and where they were obtained, as a dict
+		"""
+		commit = None
+		try:
+			pipe = os.popen("git rev-parse --short HEAD 2>%s" % os.devnull)
+			commit = pipe.read().strip() or None
+			pipe.close()
+		except OSError:
+			pass
+			
+		return {'commit':commit, 'time':time.strftime("%Y-%m-%dT%H:%M:%S"), 'python':platform.python_version(),
+				'numpy':numpy.__version__, 'platform':platform.platform(),
+				'min_time':self.min_time, 'repeat':self.repeat, 'results':self.results}
+
+
+def benchPacket(bench):
+	"""DMXPacket slot get/set & (de)serialization, and DMXReceive parsing
+	"""
+	pkt = DMXPacket()
+	pkt.fromString('\x00' + ''.join([chr(i % 256) for i in range(512)]))
+	
+	def setslot(n):
+		for i in xrange(n):
+			pkt.setSlot((i & 511) + 1, i & 255)
+	
+	def getslot(n):
+		for i in xrange(n):
+			pkt.getSlot((i & 511) + 1)
+	
+	def tostr(n):
+		for i in xrange(n):
+			str(pkt)
+			
+	out = str(pkt)
+	def fromstr(n):
+		for i in xrange(n):
+			pkt.fromString(out)
+			
+	bench.measure('packet-setslot', setslot)
+	bench.measure('packet-getslot', getslot)
+	bench.measure('packet-str-512', tostr)
+	bench.measure('packet-fromstring-512', fromstr)
+	
+	for (name, p) in (('null', pkt), ('text', DMXTextPacket(txt="DMX512 benchmark")), ('sip', DMXSIPacket())):
+		in_str = str(p)
+		def receive(n, in_str=in_str):
+			for i in xrange(n):
+				DMXReceive(in_str)
+				
+		bench.measure('dmxreceive-%s' % name, receive)
+
+
+def benchUSBPacket(bench):
+	"""DMXUSBPacket field packing & unpacking
+	"""
+	dmx = DMXPacket()
+	dmx.fromString('\x00' + ''.join([chr(i % 256) for i in range(512)]))
+	
+	def setfields(n):
+		for i in xrange(n):
+			DMXUSBSendOncePacket().setDataFields({'dmx':dmx})
+			
+	rx = DMXUSBReceivedPacket()
+	rx.fromString(rxPacket(str(dmx)[1:]))
+	def getfields(n):
+		for i in xrange(n):
+			rx.getDataFields()
+			
+	params = DMXUSBGetWidgetParamsPacket()
+	params.fromString(widget_replies[DMXUSBCodes['GET_WIDGET_PARAMS']])
+	def getparams(n):
+		for i in xrange(n):
+			params.getDataFields()
+			
+	bench.measure('usbpacket-setfields-dmx', setfields)
+	bench.measure('usbpacket-getfields-dmx', getfields)
+	bench.measure('usbpacket-getfields-params', getparams)
+
+
+def benchUSBPro(bench, pty=True):
+	"""DMXUSBPro send & read_packet, through an in-memory serial-port, and through a pseudo-terminal
+	"""
+	dmx = DMXPacket()
+	dmx.fromString('\x00' + ''.join([chr(i % 256) for i in range(512)]))
+	rx = rxPacket(str(dmx)[1:])
+	
+	def measure(suffix, box, widget=None):
+		def send(n):
+			for i in xrange(n):
+				box.sendDMX(dmx)
+		
+		def read(n):
+			for i in xrange(n):
+				box.read_packet()
+		
+		def receive(n):
+			for i in xrange(n):
+				box.receive()
+				
+		bench.measure('usbpro-send%s' % suffix, send)
+		
+		if widget != None:
+			widget.rx = rx
+		else:
+			box.ser.rx = rx
+			
+		bench.measure('usbpro-read_packet%s' % suffix, read)
+		bench.measure('usbpro-receive%s' % suffix, receive)
+		
+	box = DMXUSBPro(DMXBenchSerial())
+	measure('', box)
+	box.close()
+	
+	names = ['usbpro-%s-pty' % name for name in ('send', 'read_packet', 'receive')]
+	if not pty:
+		for name in names:
+			bench.skip(name, "disabled")
+		return
+		
+	if not hasattr(os, 'openpty'):
+		for name in names:
+			bench.skip(name, "no pseudo-terminals on this platform")
+		return
+		
+	if not len(filter(bench.wanted, names)):
+		return
+		
+	widget = DMXBenchWidget()
+	widget.start()
+	try:
+		try:
+			box = DMXUSBPro(widget.portname)
+		except Exception, e:
+			for name in names:
+				bench.skip(name, "can't open DMXUSBPro on %s: %s" % (widget.portname, str(e)))
+			return
+			
+		measure('-pty', box, widget)
+		box.close()
+	finally:
+		widget.stop()
+
+
+def benchFade(bench):
+	"""The cost of one step of DMXCtrl.fadeScene() (without the delay between steps), sending each step to the box
+	"""
+	if not bench.wanted('fadescene-step'):
+		return
+		
+	ctrl = dmxctrl.DMXCtrl(DMXBenchSerial())
+	ctrl.delay_factor = 0.
+	for (nr, val) in ((1, 0), (2, 255)):
+		ctrl.setTXFrame(chr(val) * 512)
+		ctrl.storeScene(nr)
+		
+	rate = ctrl.box.params['dmx_rate']
+	scenes = [1, 2]
+	def fade(n):
+		while n > 0:
+			steps = min(n, 512)
+			scenes.reverse()
+			ctrl.fadeScene(scenes[0], float(steps) / rate)
+			n -= steps
+			
+	try:
+		bench.measure('fadescene-step', fade, 'step')
+	finally:
+		ctrl.close()
+
+
+def benchCues(bench):
+	"""The cue-player (without the box); one frame of a transition that fades all 512 channels ('cue-step-512'),
+	and a GO (with the transition's first & last frame) through a 1000-cue list ('cue-go-1000')
+	"""
+	if not len(filter(bench.wanted, ['cue-step-512', 'cue-go-1000'])):
+		return
+		
+	scenes = DMXSceneStore()
+	for nr in range(1000):
+		scenes.store(nr, numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8) + ((nr & 1) * 255))
+		
+	cues = DMXCueList(scenes)
+	for nr in range(1000):
+		cues.add(DMXCue(nr + 1, nr, 1e6))
+		
+	player = DMXCuePlayer(cues, DMXMerger().addSource('cues'), lambda: None)
+	def step(n):
+		player.goto(2)
+		now = player.go_time
+		for i in xrange(n):
+			player._step(now + i)
+	
+	def go(n):
+		for i in xrange(n):
+			if not player.go():
+				player.goto(1)
+				
+			player._step(player.go_time)
+			player._step(player.go_time + 1e6)
+			
+	bench.measure('cue-step-512', step, 'frame')
+	player.goto(1)
+	player._step(player.go_time + 1e6)
+	bench.measure('cue-go-1000', go, 'go')
+
+
+def benchEffects(bench):
+	"""The effects-engine; one frame of 32 effects (all shapes, 16 channels each, partly overlapping), rendered and
+	set into a merge-source ('effects-frame-32x16')
+	"""
+	if not len(filter(bench.wanted, ['effects-frame-32x16'])):
+		return
+		
+	engine = DMXEffectEngine()
+	for i in range(32):
+		shape = DMXEffect.shapes[i % len(DMXEffect.shapes)]
+		engine.add("fx%d" % i, DMXEffect(range((i * 14) + 1, (i * 14) + 17), shape, 0.5 + i, spread=1))
+		
+	src = DMXMerger().addSource('effects')
+	def frame(n):
+		now = time.time()
+		for i in xrange(n):
+			(values, mask) = engine.render(now + (i * 0.025))
+			src.setLayer(values, mask)
+			
+	bench.measure('effects-frame-32x16', frame, 'frame')
+
+
+def benchPatch(bench):
+	"""The fixture-patch; one frame of 42 fixtures (2 16-bit & 8 8-bit attributes each, 504 channels),
+	with all attributes fading ('patch-fade-42x12')
+	"""
+	if not len(filter(bench.wanted, ['patch-fade-42x12'])):
+		return
+		
+	patch = DMXPatch()
+	patch.addType(DMXFixtureType('spot', [('pan', 16), ('tilt', 16)] + ["attr%d" % i for i in range(8)]))
+	for i in range(42):
+		patch.patch(i + 1, 'spot', (i * 12) + 1)
+		
+	now = time.time()
+	for i in range(42):
+		for attr in patch.attributes(i + 1):
+			patch.set(i + 1, attr, 255, 1e6, now)
+			
+	src = DMXMerger().addSource('fixtures')
+	def frame(n):
+		for i in xrange(n):
+			(values, mask, fading) = patch.render(now + (i * 0.025))
+			src.setLayer(values, mask)
+			
+	bench.measure('patch-fade-42x12', frame, 'frame')
+
+
+def benchMasters(bench):
+	"""The masters; scaling a 512-slot frame by the grand master & 16 submasters ('masters-apply-512'),
+	and moving a submaster ('masters-move')
+	"""
+	if not len(filter(bench.wanted, ['masters-apply-512', 'masters-move'])):
+		return
+		
+	masters = DMXMasters()
+	masters.setGrand(0.8)
+	for i in range(16):
+		masters.addSub("sub%d" % i, range((i * 32) + 1, (i * 32) + 33), 0.5)
+		
+	values = numpy.arange(DMXPacket.packetMaxSlots).astype(numpy.uint8)
+	def apply(n):
+		for i in xrange(n):
+			masters.apply(values)
+	
+	def move(n):
+		for i in xrange(n):
+			masters.setSub('sub0', (i & 0xff) / 255.)
+			
+	bench.measure('masters-apply-512', apply, 'frame')
+	bench.measure('masters-move', move, 'move')
+
+
+def benchCurves(bench):
+	"""The output-curves; passing a 512-slot frame through the lookup-table, with a mix of curves, limits & parked channels
+	('curves-apply-512')
+	"""
+	if not len(filter(bench.wanted, ['curves-apply-512'])):
+		return
+		
+	curves = DMXCurves()
+	for (i, curve) in enumerate(DMXCurves.curves):
+		curves.setCurve(range(i + 1, DMXPacket.packetMaxSlots + 1, len(DMXCurves.curves)), curve, 10, 250, i & 1)
+		
+	curves.park(range(500, 513), 255)
+	values = numpy.arange(DMXPacket.packetMaxSlots).astype(numpy.uint8)
+	def apply(n):
+		for i in xrange(n):
+			curves.apply(values)
+			
+	bench.measure('curves-apply-512', apply, 'frame')
+
+
+def benchRecord(bench):
+	"""The show-recorder & -player; recording a 512-slot frame with 8 changed slots ('record-frame-512'),
+	and decoding such a frame from the memory-mapped show-file ('replay-decode-512')
+	"""
+	if not len(filter(bench.wanted, ['record-frame-512', 'replay-decode-512'])):
+		return
+		
+	(fd, filename) = tempfile.mkstemp('.show', 'dmxbench-')
+	os.close(fd)
+	recorder = DMXRecorder(filename, key_interval=1e6)
+	values = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+	def record(n):
+		now = time.time()
+		for i in xrange(n):
+			values[(i * 8) % 504:((i * 8) % 504) + 8] += 1
+			recorder.record(DMXRecorder.OUTPUT, values, now + (i * 0.025))
+			
+	try:
+		bench.measure('record-frame-512', record, 'frame')
+		recorder.close()
+		
+		show = DMXShowFile(filename)
+		records = show.records()
+		def decode(n):
+			for i in xrange(n):
+				show.decode(records[(i % (len(records) - 1)) + 1], values)
+				
+		bench.measure('replay-decode-512', decode, 'frame')
+		show.close()
+	finally:
+		recorder.close()
+		os.remove(filename)
+
+
+def benchShm(bench):
+	"""The shared-memory hand-over of split mode; publishing a 512-slot frame into a DMXSharedUniverse ('shm-publish-512'),
+	reading it back consistently ('shm-read-512'), and a push & pop through a DMXCommandRing ('shm-ring-cmd')
+	"""
+	if not len(filter(bench.wanted, ['shm-publish-512', 'shm-read-512', 'shm-ring-cmd'])):
+		return
+		
+	universe = DMXSharedUniverse()
+	ring = DMXCommandRing()
+	data = '\x00' + ''.join([chr(i % 256) for i in range(DMXPacket.packetMaxSlots)])
+	def publish(n):
+		for i in xrange(n):
+			universe.publish(data)
+	
+	def read(n):
+		for i in xrange(n):
+			universe.read()
+	
+	def command(n):
+		for i in xrange(n):
+			ring.push(DMXCommandRing.ONCE)
+			ring.pop()
+			
+	bench.measure('shm-publish-512', publish, 'frame')
+	bench.measure('shm-read-512', read, 'frame')
+	bench.measure('shm-ring-cmd', command, 'cmd')
+
+
+def benchOSC(bench):
+	"""OSC-handler throughput, with synthetic /dmx/channel & /dmx/scene messages.
+	The 'osc-*-dispatch' benchmarks decode the messages and call the handler directly,
+	'osc-channel-udp' sends the messages through the OSC-server's socket (clocked output, 4 workers)
+	"""
+	names = ['osc-channel-dispatch', 'osc-channel-dispatch-unclocked', 'osc-scene-recall-dispatch', 'osc-scene-store-dispatch', 'osc-channel-udp']
+	if not len(filter(bench.wanted, names)):
+		return
+		
+	ctrl = dmxctrl.OSCDMXCtrl(DMXBenchSerial(), None, '127.0.0.1:0', overload='block')
+	client = ('127.0.0.1', 9)
+	
+	def messages(address, args_list):
+		out = []
+		for args in args_list:
+			msg = OSC.OSCMessage(address)
+			msg.append(args)
+			out.append(msg.getBinary())
+			
+		return out
+	
+	def dispatcher(handler, msgs):
+		def dispatch(n):
+			for i in xrange(n):
+				decoded = OSC.decodeOSC(msgs[i % len(msgs)])
+				handler(decoded[0], decoded[1][1:], decoded[2:], client)
+				
+		return dispatch
+		
+	chan_msgs = messages('/dmx/channel', [[ch, ch % 256] for ch in range(1, 513)])
+	
+	try:
+		ctrl.setTXFrame('\x80' * 512)
+		for nr in range(1, 9):
+			ctrl.storeScene(nr)
+			
+		bench.measure('osc-channel-dispatch-unclocked', dispatcher(ctrl.dmxChanHandler, chan_msgs), 'msg')
+		bench.measure('osc-scene-recall-dispatch', dispatcher(ctrl.dmxSceneHandler, messages('/dmx/scene', [[nr] for nr in range(1, 9)])), 'msg')
+		bench.measure('osc-scene-store-dispatch', dispatcher(ctrl.dmxSceneHandler, messages('/dmx/scene', [['store', nr] for nr in range(1, 9)])), 'msg')
+		
+		ctrl.start(clocked=True)
+		bench.measure('osc-channel-dispatch', dispatcher(ctrl.dmxChanHandler, chan_msgs), 'msg')
+		
+		addr = ctrl.srv.socket.getsockname()
+		sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		def udp(n):
+			# keep at most 64 messages in flight, so the socket-buffer doesn't overflow
+			base = ctrl.srv.handled
+			for i in xrange(n):
+				while (base + i - ctrl.srv.handled) > 64:
+					time.sleep(0.0001)
+					
+				sock.sendto(chan_msgs[i % len(chan_msgs)], addr)
+				
+			while ctrl.srv.handled < (base + n):
+				time.sleep(0.0001)
+				
+		bench.measure('osc-channel-udp', udp, 'msg')
+		sock.close()
+	finally:
+		ctrl.close()
+
+
+def benchOutput(bench):
+	"""Network output-backends; sending one universe (out of 64) to a local UDP-socket
+	"""
+	sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+	sink.bind(('127.0.0.1', 0))
+	values = (numpy.arange(DMXPacket.packetMaxSlots) % 256).astype(numpy.uint8)
+	
+	artnet = DMXArtNetOutput('127.0.0.1', sink.getsockname()[1])
+	def send(n):
+		for i in xrange(n):
+			artnet.sendUniverse(i & 63, values)
+			
+	sacn = DMXSACNOutput('127.0.0.1', sink.getsockname()[1], sync_universe=63999)
+	def send_sacn(n):
+		for i in xrange(n):
+			sacn.sendUniverse(1 + (i & 63), values)
+			if (i & 63) == 63:
+				sacn.sync()
+				
+	try:
+		bench.measure('artnet-senduniverse', send, 'universe')
+		bench.measure('sacn-senduniverse', send_sacn, 'universe')
+	finally:
+		artnet.close()
+		sacn.close()
+		sink.close()
+
+
+def benchNetInput(bench):
+	"""Network DMX-input; decoding a received Art-Net / sACN packet (already in the receive-buffer) into a
+	merged universe. Every other packet changes all 512 slots.
+	"""
+	inp = DMXNetInput(host='127.0.0.1', artnet_port=0, sacn_port=0)
+	changed = [0]
+	def callback(values, mask):
+		changed[0] += 1
+		
+	inp.listen('artnet', 1, callback)
+	inp.listen('sacn', 1, callback)
+	
+	def packets(out):
+		data = []
+		for v in (0, 255):
+			out.sendUniverse(1, numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8) + v)
+			data.append(sink.recv(2048))
+			
+		return data
+		
+	sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+	sink.bind(('127.0.0.1', 0))
+	artnet = DMXArtNetOutput('127.0.0.1', sink.getsockname()[1])
+	sacn = DMXSACNOutput('127.0.0.1', sink.getsockname()[1])
+	try:
+		art_packets = packets(artnet)
+		sacn_packets = packets(sacn)
+	finally:
+		artnet.close()
+		sacn.close()
+		sink.close()
+	
+	def decoder(decode, data):
+		def run(n):
+			for i in xrange(n):
+				# re-stamp the sequence-nr, so no packet is dropped as out-of-order
+				pkt = data[i & 1]
+				inp.rx[:len(pkt)] = numpy.fromstring(pkt, dtype=numpy.uint8)
+				inp.rx[seq_offset[decode]] = (i % 255) + 1
+				decode(len(pkt), ('127.0.0.1', 0))
+				
+		return run
+		
+	seq_offset = {inp.decodeArtNet:12, inp.decodeSACN:DMXSACNOutput.seq_offset}
+	try:
+		bench.measure('netinput-artnet-decode', decoder(inp.decodeArtNet, art_packets), 'packet')
+		bench.measure('netinput-sacn-decode', decoder(inp.decodeSACN, sacn_packets), 'packet')
+	finally:
+		inp.stop()
+
+
+def runBenchmarks(bench, pty=True):
+	"""Run all benchmarks
+	"""
+	benchPacket(bench)
+	benchUSBPacket(bench)
+	benchUSBPro(bench, pty)
+	benchFade(bench)
+	benchCues(bench)
+	benchEffects(bench)
+	benchPatch(bench)
+	benchMasters(bench)
+	benchCurves(bench)
+	benchRecord(bench)
+	benchShm(bench)
+	benchOSC(bench)
+	benchOutput(bench)
+	benchNetInput(bench)
+
+
+def compareResults(base, results, out=sys.stdout):
+	"""Write a comparison of two sets of results (as returned by DMXBench.report()) to 'out'
+	"""
+	out.write("%-32s %12s %12s %8s   (%s vs. %s)\n" % ('benchmark', 'base us', 'new us', 'change', base['commit'], results['commit']))
+	old = dict([(r['name'], r) for r in base['results'] if 'median_us' in r])
+	for r in results['results']:
+		if ('median_us' not in r) or (r['name'] not in old):
+			continue
+			
+		before = old[r['name']]['median_us']
+		out.write("%-32s %12.2f %12.2f %+7.1f%%\n" % (r['name'], before, r['median_us'], ((r['median_us'] / before) - 1.) * 100))
+
+
+###
+# Main
+###
+
+if __name__ == '__main__':
+	op = optparse.OptionParser(usage="%prog [options]\n" +
+					"Run the benchmarks, and write the results as JSON")
+					
+	op.add_option("-o", "--output", action='store', type='string', dest='output', metavar='FILE',
+									help="write the results to FILE [default = no file]")
+	op.add_option("-c", "--compare", action='store', type='string', dest='compare', metavar='FILE',
+									help="compare the results with earlier results, read from FILE")
+	op.add_option("-k", "--select", action='store', type='string', dest='pattern', metavar='REGEX',
+									help="only run the benchmarks whose name matches REGEX")
+	op.add_option("-t", "--time", action='store', type='float', dest='min_time', metavar='SEC',
+									help="run every benchmark for at least SEC seconds per round [default = 0.2]")
+	op.add_option("-r", "--repeat", action='store', type='int', dest='repeat', metavar='N',
+									help="run every benchmark for N rounds [default = 5]")
+	op.add_option("--no-pty", action='store_false', dest='pty',
+									help="don't run the benchmarks through a pseudo-terminal")
+	op.set_defaults(min_time=0.2, repeat=5, pty=True)
+	
+	(opts, args) = op.parse_args()
+	
+	bench = DMXBench(opts.min_time, opts.repeat, opts.pattern, sys.stderr)
+	runBenchmarks(bench, opts.pty)
+	results = bench.report()
+	
+	if opts.output != None:
+		f = open(opts.output, 'w')
+		json.dump(results, f, indent=1, sort_keys=True)
+		f.close()
+		
+	if opts.compare != None:
+		f = open(opts.compare)
+		compareResults(json.load(f), results)
+		f.close()
+		
+	if (opts.output == None) and (opts.compare == None):
+		json.dump(results, sys.stdout, indent=1, sort_keys=True)
+		sys.stdout.write("\n")
@@ -19,48 +19,327 @@
 #	Implemented 'fade-lock' so that a new call to *DMXCtrl.fade*() interrupts/aborts a fade in-progress
 #	Added *DMXCtrl.stopFade() method
 ###
+# version 0.2
+#	Scene-memory is now a DMXSceneStore (see dmxscenes.py); one contiguous scenes x 512 array,
+#	optionally memory-mapped to a file (see the '-m' command-line option)
+#	Scene-files are read with a streaming parser (see DMXSceneFileReader), which reports its throughput
+#	Scenes can be loaded from and saved to binary scene-archives ('.dmxa' files, see DMXSceneArchive)
+#	Scenes are saved atomically, in a background-thread (see DMXSceneSaver); only changed scenes are re-encoded
+#	Added HTP/LTP merge-engine for multiple named control-sources (see dmxmerge.py) & OSC /dmx/merge commands
+#	Added background DMX-input pipeline, pushing changed channels to OSC subscribers (see dmxinput.py & the '-i' option)
+#	Added 'getblob' OSC commands, which reply with channel-ranges as OSC-blobs, split to fit the network MTU
+#	Added *DMXCtrl.setTXChannels() & *DMXCtrl.setTXFrame() methods, and OSC '/dmx/channel setrange' & '/dmx/frame' commands
+#	OSC-messages are handled by a fixed pool of worker-threads, through a bounded queue (see dmxserver.py & the '-w' option)
+#	DMX input & output buffers are now per-instance. The output is double-buffered; writers change the back-buffer
+#	(self.dmx_out) under a lock, and sendDMX() sends a consistent snapshot (self.dmx_front)
+#	Added clocked output (see DMXSender); at most one DMX-frame per tick. OSCDMXCtrl coalesces the '/dmx/channel' set-commands
+#	received within one tick, and applies them as one batch
+#	Added runtime-statistics (see *DMXCtrl.getStats() & dmxstats.py) and the OSC '/dmx/stats' command
+#	Added optional latency-tracing, from OSC-reception to the serial-port (see dmxtrace.py, the '--trace' option & '/dmx/trace')
+#	Added background start-up (see the '-b' option); the box is probed and the scenes are loaded in a background-thread,
+#	while the OSC-server is already listening, and answers '/dmx/...' messages with a 'warming up' status until ready
+#	Added pluggable output-backends (see dmxoutput.py & *DMXCtrl.addOutput()), and Art-Net output (see the '--artnet' option)
+#	Added sACN (E1.31) output, with priority & universe-synchronization (see the '--sacn' option)
+#	Added network DMX-input (Art-Net & sACN, see dmxnetinput.py & the '--netinput' option); received universes can be
+#	merged into the output, or captured as scenes (see *DMXCtrl.mergeNetInput() & *DMXCtrl.captureNetScene()) & OSC /dmx/netinput commands
+#	Added cue-list sequencer, with precompiled transitions (see dmxcues.py, *DMXCtrl.addCue() & *DMXCtrl.goCue()) & OSC /dmx/cue commands
+#	Added effects-engine (sine, saw, square, strobe, flicker, chase, ...), rendered once per clocked frame
+#	(see dmxeffects.py, *DMXCtrl.addEffect()) & OSC /dmx/effect commands
+#	Added fixture-patch, with 8- & 16-bit attributes (see dmxpatch.py, *DMXCtrl.patchFixture() & *DMXCtrl.setFixture()),
+#	the '--patch' option & OSC /dmx/fixture commands; attributes are set (or faded) with OSC /dmx/fixture/<id>/<attr>
+#	Added output-processing after the merge (see *DMXCtrl.processors), with a grand master & submasters
+#	(see dmxmasters.py, *DMXCtrl.setGrandMaster() & *DMXCtrl.addSubmaster()) & OSC /dmx/master commands
+#	Added per-channel output-curves, limits, inversion & parking, as a lookup-table after the masters
+#	(see dmxcurves.py, *DMXCtrl.setCurve() & *DMXCtrl.parkChannels()) & OSC /dmx/curve commands
+#	Added show-recorder & -player, with a delta-compressed binary show-file, played back from a memory-mapped file
+#	(see dmxrecord.py, *DMXCtrl.startRecording() & *DMXCtrl.playShow()), the '--record' option & OSC /dmx/record & /dmx/replay commands
+#	Added split mode (see dmxshm.py & the '--split' option); the box is owned by a separate output-process with a steady
+#	clocked loop, and the frames are handed over through a shared-memory universe with a sequence-counter & a command-ring
+###
 
 from __future__ import with_statement
 
-import optparse, os, sys, time, types, threading, warnings
+import optparse, os, socket, sys, time, types, threading, warnings
 
 import numpy
 
-from xml.dom import minidom, DOMException, NotFoundErr
-from xml.parsers import expat
-
 import OSC
 
 from dmxusbpro import *
+from dmxscenes import *
+from dmxmerge import *
+from dmxinput import *
+from dmxserver import *
+from dmxstats import *
+from dmxtrace import *
+from dmxoutput import *
+from dmxnetinput import *
+from dmxcues import *
+from dmxeffects import *
+from dmxpatch import *
+from dmxmasters import *
+from dmxcurves import *
+from dmxrecord import *
+from dmxshm import *
 
 global version
-version = ("0.1.1", "r" + "$Rev: 5499 $"[6:-2])
+version = ("0.2", "r" + "$Rev: 5499 $"[6:-2])
+
+class DMXSender(threading.Thread):
+	"""Background-thread that sends the output of a DMXCtrl at most once per tick (see DMXCtrl.startTX(...))
+	Before each frame is sent, the DMXCtrl's frame-hooks are called (see DMXCtrl.frame_hooks)
+	An error in a frame-hook or while sending is counted and reported (with warnings.warn()), and the thread keeps running.
+	"""
+	def __init__(self, ctrl, rate):
+		"""Set-up (but don't start) the sender-thread, sending at most 'rate' frames per second
+		"""
+		threading.Thread.__init__(self, name="DMXSender")
+		self.setDaemon(True)
+		
+		self.ctrl = ctrl
+		self.period = 1. / rate
+		self.cond = threading.Condition()
+		self.dirty = False
+		self.running = True
+		self.frames = 0
+		self.errors = 0
+		self.last_error = None
+	
+	def kick(self):
+		"""Flag that the output has changed; it will be sent on the next tick
+		"""
+		with self.cond:
+			self.dirty = True
+			self.cond.notify()
+	
+	def run(self):
+		next = time.time()
+		while True:
+			with self.cond:
+				while self.running and not self.dirty:
+					self.cond.wait()
+					
+				if not self.running:
+					return
+					
+			now = time.time()
+			if now < next:
+				time.sleep(next - now)
+			else:
+				next = now
+				
+			next += self.period
+			
+			with self.cond:
+				self.dirty = False
+				
+			for hook in self.ctrl.frame_hooks:
+				self._call(hook)
+				
+			if self._call(self.ctrl._sendFrame):
+				self.frames += 1
+	
+	def _call(self, func):
+		"""Call 'func' (without arguments). Returns False if it raised an error, which is counted & reported.
+		"""
+		try:
+			func()
+			return True
+		except (DMXUSBError, DMXError, Exception), e:	# DMXUSBError & DMXError are not Exceptions
+			self.errors += 1
+			self.last_error = e
+			warnings.warn("Error in clocked output: %s: %s" % (e.__class__.__name__, str(e)))
+			return False
+	
+	def stop(self):
+		"""Stop the sender-thread
+		"""
+		with self.cond:
+			self.running = False
+			self.cond.notify()
+			
+		if self.isAlive():
+			self.join()
 
 class DMXCtrl(object):
 	"""A simple DMX512 controller using the 'DMX USB Pro' box
 	"""
 	
-	# DMX input & output buffers
-	dmx_in = DMXPacket()
-	dmx_out = DMXPacket()
-	
-	# scene-mempry (a list of DMXPackets)
-	scene = []
-		
 	delay_factor = 0.95
 		
-	def __init__(self, serport='/dev/ttyUSB0', scenefile=None):
+	def __init__(self, serport='/dev/ttyUSB0', scenefile=None, scenemap=None, background=False, split=False):
 		"""Instantiate the DMXCtrl-object.
 		This in turn instantiates a DMXUSBPro-object, connected to the provided serial-port
 		Scenes can be loaded from disk, from an XML-file, if the filename is provded.
+		If 'scenemap' is given, the scene-memory is kept in (and memory-mapped from) that file. (see DMXSceneStore)
+		If 'background' is True, the DMXUSBPro-object is instantiated (which probes the box) and the scenes are loaded
+		in a background-thread, and this returns immediately. Call waitReady() before using the DMXCtrl.
+		If 'split' is True, the box is opened in a separate output-process instead, and a DMXSharedBox stands in
+		for the DMXUSBPro-object (see dmxshm.py). DMX-input is not available in split mode.
+		If 'serport' is None, no box is used at all; the output is only sent to the output-backends (see addOutput(...))
 		"""
-		self.box = DMXUSBPro(serport)
+		self.box = None
+		self.split = split
+		
+		# background start-up (see waitReady()); set when the box has been probed and the scenes have been loaded
+		self.ready = threading.Event()
+		self.ready_lock = threading.Lock()
+		self.warmup_thread = None
+		self.warmup_status = "probing box"
+		self.warmup_error = None
+		if not background:
+			self.box = self._openBox(serport)
+		
+		# DMX input & output buffers
+		# The output is double-buffered: self.dmx_out is the back-buffer, which is only changed while holding self.out_lock.
+		# sendDMX() takes a snapshot of the back-buffer (merged with the other merge-sources) as the front-buffer (self.dmx_front),
+		# which is never changed after that, and sends the most recent front-buffer to the box.
+		self.dmx_in = DMXPacket()
+		self.dmx_out = DMXPacket()
+		self.dmx_front = DMXPacket()
+		self.dmx_merged = ''		# the front-buffer's slot-values before the output-processors (see _renderFrame())
+		self.out_lock = threading.RLock()
+		self.tx_lock = threading.Lock()
+		self.tx_sent = None
+		
+		# output-backends (see addOutput()); every frame sent to the box is sent to these too
+		self.outputs = []
+		
+		# clocked output (see startTX()); functions called (without arguments) before every clocked frame
+		self.tx_thread = None
+		self.frame_hooks = []
+		
+		# runtime-statistics (see getStats())
+		self.stats_lock = threading.Lock()
+		self.frames_sent = 0
+		self.frame_times = DMXStatsRing(256)
+		self.write_times = DMXStatsRing(256)
+		self.fades_active = 0
+		
+		# latency-tracing (see startTrace()); self.tracer is None while tracing is disabled.
+		# The trace-ids of the messages whose changes are in the back-buffer and in the (not yet sent) front-buffer
+		self.tracer = None
+		self.trace_log = None
+		self.trace_back = []
+		self.trace_front = []
+		
+		# scene-memory (a DMXSceneStore)
+		self.scene = DMXSceneStore(mapfile=scenemap)
+		self.saver = DMXSceneSaver(self.scene)
+		self.saver.start()
+		
+		# merge-engine; the output-buffer (self.dmx_out) is the 'local' source,
+		# other sources (consoles, DMX-input) are merged with it before sending (see sendDMX())
+		self.merge = DMXMerger()
+		self.local = self.merge.addSource('local')
+		self.input = None
+		
+		# output-processing; after the merge, every frame passes through these processors, in order.
+		# Each has an 'identity' attribute (True while it leaves the frame as it is), and an apply(values) method
+		self.masters = DMXMasters()
+		self.curves = DMXCurves()
+		self.processors = [self.masters, self.curves]
+		
+		# background DMX-input thread (see startRX())
+		self.rx_thread = None
+		
+		# network DMX-input thread (see startNetInput()), and the merge-sources it feeds, by (protocol, universe)
+		self.net_input = None
+		self.net_sources = {}
+		
+		# show-recording (see startRecording(...)), and show-playback into the merge-source 'replay' (see playShow(...))
+		self.recorder = None
+		self.record_input = False
+		self.show_player = None
+		
+		# cue-list (see addCue(...)), played as the merge-source 'cues' by a background-thread (see goCue())
+		self.cuelist = DMXCueList(self.scene)
+		self.cue_player = None
+		
+		# effects (see addEffect(...)), rendered before every clocked frame into the merge-source 'effects'
+		self.effects = DMXEffectEngine()
+		self.effects_src = None
+		self.frame_hooks.append(self._renderEffects)
+		
+		# fixture-patch (see patchFixture(...)); attribute-values are rendered into the merge-source 'fixtures'
+		self.patch = DMXPatch()
+		self.patch_src = None
+		self.frame_hooks.append(self._renderFixtures)
 		
 		self.fade_run = False
 		self.fade_done = threading.Condition()
 		
+		self.load_stats = None
+		if background:
+			self.warmup_thread = threading.Thread(target=self._warmUp, args=(serport, scenefile), name="DMXCtrl-warmup")
+			self.warmup_thread.setDaemon(True)
+			self.warmup_thread.start()
+			return
+			
 		if scenefile != None:
 			self.loadScenes(scenefile)
+			
+		self.warmup_status = "ready"
+		self.ready.set()
+	
+	def _warmUp(self, serport, scenefile):
+		"""Background start-up; probe the box, then load the scenes (see __init__(...))
+		"""
+		try:
+			box = self._openBox(serport)
+			if box != None:
+				box.tracer = self.tracer
+				
+			self.box = box
+			if scenefile != None:
+				self.warmup_status = "loading scenes"
+				self.loadScenes(scenefile)
+				
+		except BaseException, e:	# DMXUSBError is not an Exception
+			self.warmup_error = e
+			self.warmup_status = "failed: %s" % str(e)
+			self.ready.set()
+			return
+			
+		with self.ready_lock:
+			self.warmup_status = "ready"
+			self.ready.set()
+			self._warmedUp()
+	
+	def _openBox(self, serport):
+		"""Return a DMXUSBPro-object connected to the provided serial-port, or, in split mode,
+		a DMXSharedBox with the box opened in an output-process. Returns None if 'serport' is None (no box)
+		"""
+		if serport == None:
+			return None
+			
+		if self.split:
+			return DMXSharedBox(serport)
+			
+		return DMXUSBPro(serport)
+	
+	def _warmedUp(self):
+		"""Called (with self.ready_lock held) when the background start-up has finished
+		"""
+		pass
+	
+	def dmxRate(self):
+		"""Return the DMX output-rate (in frames per second); the box' 'dmx_rate', or 40 without a box
+		"""
+		if (self.box == None) or not self.box.params['dmx_rate']:
+			return 40
+			
+		return self.box.params['dmx_rate']
+	
+	def waitReady(self, timeout=None):
+		"""Wait until the box has been probed and the scenes have been loaded (see __init__(...))
+		Returns False if the timeout (in seconds) expires first, or re-raises the error that stopped the start-up
+		"""
+		self.ready.wait(timeout)
+		if self.warmup_error != None:
+			raise self.warmup_error
+			
+		return self.ready.isSet()
 		
 	def __str__(self):
 		return "%s v%s-%s" % (self.__class__.__name__, version[0], version[1])
@@ -70,33 +349,491 @@ class DMXCtrl(object):
 		Stop transmitting DMX-packets
 		Close the DMXUSBPro-object's serial-port
 		"""
-		self.box.sendDMXPacketOnce(self.dmx_out)
-		self.box.close()
+		if self.warmup_thread != None:
+			self.warmup_thread.join()
+			
+		self.stopRX()
+		self.stopNetInput()
+		self._stopCues()
+		self.stopShow()
+		self.stopTX()
+		self.stopRecording()
+		for output in self.outputs:
+			output.close()
+			
+		if self.box != None:
+			with self.tx_lock:
+				self.box.sendDMXPacketOnce(self.dmx_front)
+			self.box.close()
+			
+		self.saver.stop()
+		self.scene.close()
 
+	def _applyChannels(self):
+		"""Apply the channel-changes queued for the output-buffer, if any (see OSCDMXCtrl._applyChannels()).
+		Called (with self.out_lock held) before the output-buffer is written or read, so queued changes are never applied
+		after later changes, or missed by a read. DMXCtrl itself queues nothing.
+		"""
+		pass
+	
+	def _renderFrame(self):
+		"""Return a new DMXPacket with a snapshot of the output-buffer (self.dmx_out).
+		If other merge-sources exist (see addSource(...)), the output-buffer is merged with them first,
+		and the result is passed through the output-processors (see self.processors).
+		Returns a tuple (frame, merged); 'merged' is the string of slot-values before the output-processors.
+		Call with self.out_lock held.
+		"""
+		out = str(self.dmx_out)
+		frame = DMXPacket()
+		active = [proc for proc in self.processors if not proc.identity]
+		if (len(self.merge) < 2) and not len(active):
+			frame.fromString(out)
+			return (frame, out[1:])
+			
+		if len(self.merge) < 2:
+			values = numpy.fromstring(out[1:], dtype=numpy.uint8)
+		else:
+			self.local.setFrame(out[1:])
+			values = self.merge.render()
+			
+		merged = values.tostring()
+		for proc in active:
+			values = proc.apply(values)
+			
+		frame.fromString(out[0] + values.tostring())
+		return (frame, merged)
+	
 	def sendDMX(self):
 		"""Send the DMXPacket currently held in the output-buffer (self.dmx_out)
 		to the DMXUSBPro box
+		If clocked output is running (see startTX(...)), the DMXPacket is sent on the next tick instead.
+		"""
+		if self.tx_thread != None:
+			self.tx_thread.kick()
+		else:
+			self._sendFrame()
+	
+	def _sendFrame(self):
+		"""Send the DMXPacket currently held in the output-buffer (self.dmx_out) to the DMXUSBPro box
+		(if any) and to the output-backends, now.
+		A snapshot of the output-buffer (merged with the other merge-sources, if any) becomes the new front-buffer
+		(self.dmx_front). Only the most recent front-buffer is sent; if another thread has already
+		sent a newer snapshot, nothing is sent.
+		"""
+		if not self.ready.isSet():	# still probing the box (see waitReady())
+			return
+			
+		tracer = self.tracer
+		with self.out_lock:
+			start = time.time()
+			(self.dmx_front, self.dmx_merged) = self._renderFrame()
+			if tracer != None:
+				tracer.span('render', start, time.time())
+				self.trace_front.extend(self.trace_back)
+				self.trace_back = []
+				
+		with self.tx_lock:
+			with self.out_lock:
+				(frame, merged) = (self.dmx_front, self.dmx_merged)
+				
+			if frame is self.tx_sent:
+				return
+				
+			start = time.time()
+			if self.box != None:
+				self.box.sendDMX(frame)
+			for output in self.outputs:
+				output.sendDMX(frame)
+			for output in self.outputs:
+				output.sync()
+			done = time.time()
+			
+			recorder = self.recorder
+			if recorder != None:	# the frame before the output-processors; a replay passes through them again
+				recorder.record(DMXRecorder.OUTPUT, merged, done)
+			self.tx_sent = frame
+			self.frames_sent += 1
+			
+			if tracer != None:
+				with self.out_lock:
+					(links, self.trace_front) = (self.trace_front, [])
+					
+				tracer.span('box-send', start, done, links=links)
+				
+		self.write_times.add(done - start)
+		self.frame_times.add(done)
+	
+	def addOutput(self, output):
+		"""Add an output-backend (see DMXOutput); the current frame is sent to it right away, and every frame after that
+		"""
+		with self.tx_lock:
+			self.outputs = self.outputs + [output]
+			output.sendDMX(self.dmx_front)
+			output.sync()
+	
+	def removeOutput(self, output):
+		"""Remove an output-backend (the output-backend is not closed)
+		"""
+		with self.tx_lock:
+			self.outputs = [o for o in self.outputs if o is not output]
+	
+	def _traceChange(self):
+		"""Note the message being handled by the calling thread (if it is being traced) as changing the output-buffer.
+		Call with self.out_lock held, and only if tracing is enabled.
+		"""
+		trace_id = self.tracer.current()
+		if trace_id:
+			self.trace_back.append(trace_id)
+	
+	def startTrace(self, size=65536):
+		"""Start latency-tracing; the last 'size' trace-events are kept (see DMXTracer)
+		Any earlier trace is discarded.
+		"""
+		with self.out_lock:
+			self.trace_back = []
+			self.trace_front = []
+			
+		self.trace_log = DMXTracer(size)
+		if self.box != None:
+			self.box.tracer = self.trace_log
+		self.tracer = self.trace_log
+	
+	def stopTrace(self):
+		"""Stop latency-tracing. The trace is kept, and can still be dumped (see dumpTrace(...))
+		"""
+		self.tracer = None
+		if self.box != None:
+			self.box.tracer = None
+	
+	def dumpTrace(self, filename):
+		"""Write the trace to the given file, as a Chrome trace (JSON). Returns the nr of trace-events written
+		"""
+		if self.trace_log == None:
+			raise ValueError("No trace recorded")
+			
+		return self.trace_log.dump(filename)
+	
+	def _countFade(self, delta):
+		"""Keep count of the fades in progress
+		"""
+		with self.stats_lock:
+			self.fades_active += delta
+	
+	def getStats(self):
+		"""Return a dict with runtime-statistics:
+		'frames':		the nr of DMX-packets sent to the box
+		'fps':			the nr of DMX-packets sent in the last second
+		'dmx_rate':		the configured DMX output-rate of the box
+		'clocked':		1 if clocked output is running (see startTX(...)), else 0
+		'fades_active':		the nr of fades in progress
+		'serial_write_ms_*':	the time taken to write a DMX-packet to the serial-port (mean, p99 & max of the last 256 packets)
+		'netinput_packets':	the nr of datagrams received by the network DMX-input (see startNetInput(...))
+		'netinput_ignored':	the nr of those that were not for a received universe, or not DMX
+		and, in split mode, the output-process' statistics (see DMXSharedBox.getStats()).
+		In split mode, 'serial_write_ms_*' is the time taken to hand a DMX-packet over to the output-process.
+		"""
+		(p99,) = self.write_times.percentiles([99])
+		dmx_rate = 0
+		if self.box != None:
+			dmx_rate = self.box.params['dmx_rate']
+			
+		(net_packets, net_ignored) = (0, 0)
+		if self.net_input != None:
+			(net_packets, net_ignored) = (self.net_input.packets, self.net_input.ignored)
+			
+		stats = {'frames':self.frames_sent, 'fps':self.frame_times.rate(), 'dmx_rate':dmx_rate,
+				'clocked':int(self.tx_thread != None), 'fades_active':self.fades_active,
+				'serial_write_ms_mean':self.write_times.mean() * 1000, 'serial_write_ms_p99':p99 * 1000,
+				'serial_write_ms_max':self.write_times.max() * 1000,
+				'netinput_packets':net_packets, 'netinput_ignored':net_ignored}
+		if isinstance(self.box, DMXSharedBox):
+			stats.update(self.box.getStats())
+			
+		return stats
+	
+	def resetStats(self):
+		"""Reset the runtime-statistics (see getStats())
+		"""
+		self.frames_sent = 0
+		self.frame_times.clear()
+		self.write_times.clear()
+	
+	def startTX(self, rate=None):
+		"""Start clocked output; sendDMX() only flags that the output has changed, and a background-thread
+		(see DMXSender) sends the output at most 'rate' times per second (default: the box' 'dmx_rate').
+		Many changes within one tick result in only one DMX-packet sent to the box.
 		"""
-		self.box.sendDMX(self.dmx_out)
+		if self.tx_thread != None:
+			return
+			
+		if not rate:
+			rate = self.dmxRate()
+			
+		self.tx_thread = DMXSender(self, rate)
+		self.tx_thread.start()
+	
+	def stopTX(self):
+		"""Stop clocked output. Any pending change is sent immediately.
+		"""
+		if self.tx_thread == None:
+			return
+			
+		self.tx_thread.stop()
+		self.tx_thread = None
+		
+		for hook in self.frame_hooks:
+			hook()
+			
+		self._sendFrame()
 		
 	def receiveDMX(self):
 		"""Receive a DMXPacket from the DMXUSBPro box,
 		and store it in the input-buffer (self.dmx_in)
+		If DMX-input merging is enabled (see mergeInput(...)), the received DMXPacket is merged into the output.
 		"""
 		self.dmx_in = self.box.receiveDMX()
+		
+		recorder = self.recorder
+		if (recorder != None) and self.record_input:
+			recorder.record(DMXRecorder.INPUT, str(self.dmx_in)[1:])
+			
+		if self.input != None:
+			self.input.setFrame(str(self.dmx_in)[1:])
+			self.sendDMX()
+	
+	def startRX(self, onchange=True, callback=None):
+		"""Start receiving DMX-input in a background-thread (see DMXInputReader).
+		If 'onchange' is True, the box is set to 'Receive DMX On Change' mode, so it only sends the changed slots.
+		The input-buffer (self.dmx_in) is kept up to date, and 'callback' is called as callback(values, mask)
+		whenever the DMX-input changes.
+		"""
+		if self.rx_thread != None:
+			self.rx_thread.callback = callback
+			return
+			
+		if self.box == None:
+			raise DMXUSBError("DMX-input needs a DMX USB Pro box")
+			
+		self.box.setDMXRXOnChange(onchange)
+		self.rx_thread = DMXInputReader(self, callback)
+		self.rx_thread.start()
+	
+	def stopRX(self):
+		"""Stop the background DMX-input thread, if running
+		"""
+		if self.rx_thread == None:
+			return
+			
+		self.rx_thread.stop()
+		self.rx_thread = None
+	
+	def addSource(self, name, priority=0):
+		"""Add a named control-source to the merge-engine (see DMXMerger), and return it.
+		Sources with a higher priority override lower ones; equal priorities are merged HTP or LTP,
+		per channel (see setHTP(...)). The output-buffer (self.dmx_out) is the source named 'local', with priority 0.
+		"""
+		with self.out_lock:
+			self._applyChannels()
+			self.local.setFrame(str(self.dmx_out)[1:])
+			return self.merge.addSource(name, priority)
+	
+	def removeSource(self, name):
+		"""Remove the named control-source from the merge-engine
+		"""
+		if name == 'local':
+			raise ValueError("Can't remove the 'local' source")
+			
+		if (self.input != None) and (name == self.input.name):
+			self.input = None
+			
+		for (key, src) in self.net_sources.items():
+			if src.name == name:	# stop feeding the source
+				del self.net_sources[key]
+				self.net_input.listen(key[0], key[1])
+				
+		if name == 'cues':
+			self._stopCues()
+			
+		if name == 'effects':
+			self.effects.clear()
+			self.effects_src = None
+			
+		if name == 'fixtures':
+			self.patch_src = None
+			
+		if name == 'replay':
+			self.stopShow()
+			
+		self.merge.removeSource(name)
+		self.sendDMX()
+	
+	def mergeInput(self, priority=0):
+		"""Merge the received DMX-input (see receiveDMX()) into the output, as the source named 'input', with the given priority.
+		With priority None, stop merging the DMX-input.
+		"""
+		if priority == None:
+			if self.input != None:
+				self.removeSource(self.input.name)
+			return
+			
+		self.input = self.addSource('input', priority)
+	
+	def startNetInput(self, artnet=True, sacn=True, host=''):
+		"""Start receiving DMX-universes over the network, as Art-Net and/or sACN, on the given local address,
+		in a background-thread (see DMXNetInput). Universes are only received once they are listened to
+		(see listenNetInput(...) & mergeNetInput(...))
+		"""
+		if self.net_input != None:
+			return
+			
+		self.net_input = DMXNetInput(artnet, sacn, host)
+		self.net_input.start()
+	
+	def stopNetInput(self):
+		"""Stop receiving DMX-universes over the network, and remove their merge-sources
+		"""
+		if self.net_input == None:
+			return
+			
+		for (protocol, universe) in self.net_sources.keys():
+			self.mergeNetInput(protocol, universe, None)
+			
+		self.net_input.stop()
+		self.net_input = None
+	
+	def listenNetInput(self, protocol, universe):
+		"""Start receiving the given universe of the given protocol ('artnet' or 'sacn'), and return its DMXNetUniverse
+		"""
+		if self.net_input == None:
+			raise ValueError("Network DMX-input is not started")
+			
+		if (protocol, universe) in self.net_input.universes:
+			return self.net_input[(protocol, universe)]
+			
+		return self.net_input.listen(protocol, universe)
+	
+	def unlistenNetInput(self, protocol, universe):
+		"""Stop receiving the given universe (and stop merging it). Returns False if it wasn't received
+		"""
+		if self.net_input == None:
+			return False
+			
+		self.mergeNetInput(protocol, universe, None)
+		return self.net_input.unlisten(protocol, universe)
+	
+	def mergeNetInput(self, protocol, universe, priority=0):
+		"""Merge the given network-universe (see listenNetInput(...)) into the output, as the source named '<protocol>/<universe>',
+		with the given priority. Every received change of the universe is sent right away (see sendDMX())
+		With priority None, stop merging the universe (it is still received).
+		"""
+		key = (protocol, universe)
+		if priority == None:
+			if key in self.net_sources:
+				self.removeSource(self.net_sources[key].name)
+			return
+			
+		univ = self.listenNetInput(protocol, universe)
+		src = self.addSource("%s/%d" % key, priority)
+		self.net_sources[key] = src
+		
+		def update(values, mask):
+			src.setFrame(values)
+			self.sendDMX()
+			
+		with self.net_input.lock:
+			univ.callback = update
+			if univ.size:
+				src.setFrame(univ.values[:univ.size])
+				
+		self.sendDMX()
+	
+	def captureNetScene(self, nr, protocol, universe):
+		"""Store the last received values of the given network-universe (see listenNetInput(...))
+		in the scene-memory at the indicated location
+		"""
+		if (type(nr) != types.IntType) or (nr < 0):
+			raise ValueError("Invalid scene number '%s'" % str(nr))
+			
+		if (self.net_input == None) or ((protocol, universe) not in self.net_input.universes):
+			raise ValueError("Not receiving %s universe %s" % (str(protocol), str(universe)))
+			
+		univ = self.net_input[(protocol, universe)]
+		with self.net_input.lock:
+			if not univ.packets:
+				raise IndexError("Nothing received on %s universe %d" % (protocol, universe))
+				
+			values = univ.getValues()
+			
+		self.scene.store(nr, values)
+	
+	def setHTP(self, from_ch=1, to_ch=DMXPacket.packetMaxSlots, htp=True):
+		"""Set the given range of channels to be merged HTP (highest-takes-precedence),
+		or LTP (latest-takes-precedence) if 'htp' is False. All channels are LTP by default.
+		"""
+		self.merge.setHTP(from_ch, to_ch, htp)
+		self.sendDMX()
 
 	def setTXChannel(self, ch, val):
 		"""Change the value of one channel (i.e. slot) in the currently held DMXPacket
 		Send the changed DMXPacket to the DMXUSBPro box (see sendDMX())
 		"""
-		self.dmx_out.setSlot(ch, val)
+		with self.out_lock:
+			self._applyChannels()
+			self.dmx_out.setSlot(ch, val)
+			if self.tracer != None:
+				self._traceChange()
+				
+		self.sendDMX()
+	
+	def setTXChannels(self, start, values):
+		"""Change the values of a range of channels (i.e. slots) in the currently held DMXPacket in one go,
+		starting at channel 'start'. 'values' can be a string of slot-values, or a list of ints.
+		Send the changed DMXPacket to the DMXUSBPro box (see sendDMX())
+		"""
+		if type(values) not in types.StringTypes:
+			values = numpy.asarray(values)
+			if len(values) and ((values.min() < 0) or (values.max() > 255)):
+				raise ValueError("Invalid channel value in: '%s'" % str(values.tolist()))
+				
+			values = values.astype(numpy.uint8).tostring()
+			
+		if (type(start) != types.IntType) or (start < 1) or ((start + len(values) - 1) > self.dmx_out.packetMaxSlots):
+			raise IndexError("Channel-range must be in range (1, %d)" % self.dmx_out.packetMaxSlots)
+			
+		with self.out_lock:
+			self._applyChannels()
+			out = str(self.dmx_out)
+			if len(out) < start:
+				out += '\x00' * (start - len(out))
+				
+			self.dmx_out.fromString(out[:start] + str(values) + out[start + len(values):])
+			if self.tracer != None:
+				self._traceChange()
+				
+		self.sendDMX()
+	
+	def setTXFrame(self, values):
+		"""Replace all channels (i.e. slots) of the currently held DMXPacket with the given string of slot-values
+		Send the changed DMXPacket to the DMXUSBPro box (see sendDMX())
+		"""
+		if len(values) > self.dmx_out.packetMaxSlots:
+			raise IndexError("DMXPacket can only have %d slots" % self.dmx_out.packetMaxSlots)
+			
+		with self.out_lock:
+			self._applyChannels()
+			self.dmx_out.fromString(str(self.dmx_out)[0] + str(values))
+			if self.tracer != None:
+				self._traceChange()
+				
 		self.sendDMX()
 		
 	def getTXChannel(self, ch):
 		"""Return the value of one channel (i.e. slot) of the DMXPacket
-		currently held by the output-buffer (self.dmx_out)
+		currently held by the output-buffer (self.dmx_out), including queued changes
 		"""
-		return self.dmx_out.getSlot(ch)
+		with self.out_lock:
+			self._applyChannels()
+			return self.dmx_out.getSlot(ch)
 
 	def getRXChannel(self, ch):
 		"""Return the value of one channel (i.e. slot) of the DMXPacket
@@ -119,30 +856,39 @@ class DMXCtrl(object):
 		if (type(val) != types.IntType) or (val < 0) or (val > 255):
 			raise ValueError("Invalid channel value: '%s'" % str(val))
 		
-		if ch > len(self.dmx_out):
-			self.dmx_out.setSlot(ch, 0)
-		
-		from_val = self.getTXChannel(ch)
+		with self.out_lock:
+			if ch > len(self.dmx_out):
+				self.dmx_out.setSlot(ch, 0)
+				
+			from_val = self.getTXChannel(ch)
 		
-		steps = max(1, int(duration * self.box.params['dmx_rate']))
-		delay = self.delay_factor / self.box.params['dmx_rate']
+		steps = max(1, int(duration * self.dmxRate()))
+		delay = self.delay_factor / self.dmxRate()
 		
 		if steps > 512:
 			delay *= steps / 512.
 			steps = 512
 			
-		for st in range(1, steps + 1):
-			self.setTXChannel(ch, ((from_val * (steps - st)) + (val * st)) / steps)
-			if not self.fade_run:		# we got interrupted
-				break
-			
-			time.sleep(delay)
-		else:			# fade completed without interruptions
+		self._countFade(1)
+		try:
+			for st in range(1, steps + 1):
+				self.setTXChannel(ch, ((from_val * (steps - st)) + (val * st)) / steps)
+				if not self.fade_run:		# we got interrupted
+					break
+					
+				time.sleep(delay)
+			else:			# fade completed without interruptions
+				self.fade_run = False
+				ret = True
+				
+		except:
 			self.fade_run = False
-			ret = True
-		
-		with self.fade_done:
-			self.fade_done.notify()
+			raise
+			
+		finally:
+			self._countFade(-1)
+			with self.fade_done:
+				self.fade_done.notify()
 		
 		return ret
 	
@@ -152,10 +898,11 @@ class DMXCtrl(object):
 		if (type(nr) != types.IntType) or (nr < 0):
 			raise ValueError("Invalid scene number '%s'" % str(nr))
 		
-		while nr >= len(self.scene):
-			self.scene.append(None)
+		with self.out_lock:
+			self._applyChannels()
+			out = str(self.dmx_out)
 			
-		self.scene[nr] = self.dmx_out.copy()
+		self.scene.store(nr, out[1:])
 
 	def recallScene(self, nr):
 		"""Recall the indicated scene from the scene-memory
@@ -164,10 +911,13 @@ class DMXCtrl(object):
 		if (type(nr) != types.IntType) or (nr < 0) or (nr >= len(self.scene)):
 			raise ValueError("Invalid scene number '%s'" % str(nr))
 
-		if self.scene[nr] == None:
+		if self.scene.isEmpty(nr):
 			raise IndexError("Scene %d is empty" % nr)
 		
-		self.dmx_out = self.scene[nr].copy()
+		with self.out_lock:
+			self._applyChannels()
+			self.dmx_out.fromString(str(self.dmx_out)[0] + self.scene.getSlots(nr).tostring())
+			
 		self.sendDMX()
 		
 	def fadeScene(self, nr, duration=1):
@@ -189,44 +939,57 @@ class DMXCtrl(object):
 		if (type(nr) != types.IntType) or (nr < 0) or (nr >= len(self.scene)):
 			raise ValueError("Invalid scene number '%s'" % str(nr))
 
-		if self.scene[nr] == None:
+		if self.scene.isEmpty(nr):
 			raise IndexError("Scene %d is empty" % nr)
 		
 		if (type(duration) != types.IntType) and (type(duration) != types.FloatType):
 			raise TypeError("Duration must be int or float")
 		
-		dmx_to = self.scene[nr].copy()
-	
-		while len(self.dmx_out) < len(dmx_to):
-			self.dmx_out.append(0)
-			
-		while len(self.dmx_out) > len(dmx_to):
-			dmx_to.append(0)
+		dmx_to = self.scene.getSlots(nr)	# a view on the scene-memory; no copy
+		with self.out_lock:
+			self._applyChannels()
+			out = str(self.dmx_out)
 			
-		ar_from = numpy.array(self.dmx_out.getSlots(), dtype='int')
-		ar_to = numpy.array(dmx_to.getSlots(), dtype='int')
+		startcode = out[0]
+		size = max(len(out) - 1, len(dmx_to))
+		
+		ar_from = numpy.zeros(size, dtype='int')
+		ar_from[:len(out) - 1] = numpy.fromstring(out[1:], dtype=numpy.uint8)
+		ar_to = numpy.zeros(size, dtype='int')
+		ar_to[:len(dmx_to)] = dmx_to
 
-		steps = max(1, int(duration * self.box.params['dmx_rate']))
-		delay = self.delay_factor / self.box.params['dmx_rate']
+		steps = max(1, int(duration * self.dmxRate()))
+		delay = self.delay_factor / self.dmxRate()
 		
 		if steps > 512:
 			delay *= steps / 512.
 			steps = 512
 		
-		for st in range(1, steps + 1):
-			ar_out = ((ar_from * (steps - st)) + (ar_to * st)) / steps
-			self.dmx_out[1:] = ar_out.tolist()
-			self.sendDMX()
-			if not self.fade_run:	# interrupted
-				break
-			
-			time.sleep(delay)
-		else:
+		self._countFade(1)
+		try:
+			for st in range(1, steps + 1):
+				ar_out = ((ar_from * (steps - st)) + (ar_to * st)) / steps
+				with self.out_lock:
+					self._applyChannels()
+					self.dmx_out.fromString(startcode + ar_out.astype(numpy.uint8).tostring())
+					
+				self.sendDMX()
+				if not self.fade_run:	# interrupted
+					break
+				
+				time.sleep(delay)
+			else:
+				self.fade_run = False
+				ret = True
+				
+		except:
 			self.fade_run = False
-			ret = True
-		
-		with self.fade_done:
-			self.fade_done.notify()
+			raise
+			
+		finally:
+			self._countFade(-1)
+			with self.fade_done:
+				self.fade_done.notify()
 		
 		return ret
 	
@@ -242,146 +1005,389 @@ class DMXCtrl(object):
 		
 		return False
 	
-	def delScene(self, nr):
-		"""Remove the given scene from the scene-memory.
-		(This sets the scene-memory location to 'empty')
+	def addCue(self, nr, scene, fade_in=0., fade_out=None, delay=0., follow=None):
+		"""Add a cue to the cue-list (replacing the cue with the same number, if any) that fades to the given scene.
+		'fade_in' & 'fade_out' are the fade-times of the channels going up & down, 'delay' is the time between GO
+		and the start of the fade, and if 'follow' is given, the next cue is started automatically that long after the GO.
+		(all in seconds, see DMXCue)
 		"""
-		if (type(nr) != types.IntType) or (nr < 0) or (nr >= len(self.scene)):
-			raise ValueError("Invalid scene number '%s'" % str(nr))
-
-		self.scene[nr] = None
+		self.cuelist.add(DMXCue(nr, scene, fade_in, fade_out, delay, follow))
 	
-	def _sceneToStr(self, nr):
-		"""Return the given scene-memory slot as a multi-line string.
-		The channel-values are represented by 2-digit Hexadecimal, 16 channels per row,
-		preceded by a 3-digit Hexadeciaml slot-number.
-		Upto 32 rows per scene (== 512 slots)
+	def delCue(self, nr):
+		"""Remove the cue with the given number from the cue-list
 		"""
-		out = ""
-		
-		if self.scene[nr] == None:
-			return out
-		
-		values = self.scene[nr].getSlots()
-		rows = ((len(values) - 1) // 16) + 1
-		
-		for row in range(rows):
-			start = row * 16
-			out += "%03X: " % (start + 1)
-			for val in values[start:start+16]:
-				out += "%02X " % val
-		
-			out += "\n"
-
-		return out
-			
-	def _strToScene(self, nr, in_str):
-		"""Parse the given multi-line string into a DMXPacket (see _sceneToStr(...))
-		Store the new DMXPacket in the scene-memory at the indicarted location
+		self.cuelist.remove(nr)
+	
+	def _cuePlayer(self):
+		"""Return the cue-player, starting it (and adding the merge-source 'cues') if needed
 		"""
-		while nr >= len(self.scene):
-			self.scene.append(None)
+		if self.cue_player == None:
+			self.cue_player = DMXCuePlayer(self.cuelist, self.addSource('cues'), self.sendDMX, self.dmxRate())
+			self.cue_player.start()
 			
-		scene = DMXPacket()
-		
-		for row in in_str.splitlines():
-			for col in row.split():
-				if not col.endswith(':'):
-					try:
-						val = int(col, 16)
-					except ValueError:
-						raise ValueError("Invalid channel value: '%s'" % str(col))
-					
-					scene.append(val)
-					
-		self.scene[nr] = scene
-		
-	def loadScenes(self, scenefile):
-		"""Load the given XML-file and parse the scenes defined therein.
-		Scene-definitions are stored in scene-memory (as DMXPackets)
+		return self.cue_player
+	
+	def _stopCues(self):
+		"""Stop the cue-player, if running
 		"""
-		files_list = [scenefile]
-		if not scenefile.endswith('.xml'):
-			files_list.append("%s.xml" % scenefile)
-			
-		for f in files_list:
-			self.scenefile = f
-			if os.path.isfile(f):
-				self.dom = minidom.parse(f)
-				break
-		else:
-			warnings.warn("Scene-file '%s' not found." % scenefile)
-			self.scenefile = files_list[-1]
+		if self.cue_player == None:
 			return
-		
-		scenes_nodes = self.dom.getElementsByTagName('DMXScenes')
-		if not len(scenes_nodes):
-			raise AttributeError("Element <DMXScenes>...</DMXScenes> missing from scenefile %s" % self.scenefile)
-		
-		for sc in scenes_nodes[0].getElementsByTagName('Scene'):
-			nr_str = sc.getAttribute('nr')
-			if not len(nr_str):
-				raise AttributeError("Attribute 'nr' missing from XML scene definition")
 			
-			try:
-				nr = int(nr_str)
-			except ValueError:
-				raise ValueError("Invalid 'nr' Attribute in XML scene definition: '%s'" % nr_str)
+		(player, self.cue_player) = (self.cue_player, None)
+		player.stop()
+	
+	def goCue(self):
+		"""Start the next cue in the cue-list. Returns the number of the cue started, or None if there is no next cue.
+		The cues are played as the merge-source 'cues' (see addSource(...))
+		"""
+		player = self._cuePlayer()
+		if not player.go():
+			return None
 			
-			tn = sc.firstChild
+		return player.current
+	
+	def backCue(self):
+		"""Go back to the previous cue in the cue-list. Returns the number of that cue, or None if there is no previous cue
+		"""
+		player = self._cuePlayer()
+		if not player.back():
+			return None
 			
-			if tn == None:
-				raise AttributeError("DMX data missing from XML scene %d definition" % nr)
+		return player.current
+	
+	def gotoCue(self, nr):
+		"""Go to the cue with the given number
+		"""
+		self._cuePlayer().goto(nr)
+	
+	def currentCue(self):
+		"""Return the number of the current cue, or None
+		"""
+		if self.cue_player == None:
+			return None
 			
-			if tn.nodeType != tn.TEXT_NODE:
-				raise AttributeError("Wrong DMX data node-type (%d) in XML scene %d definition" % (tn.nodeType, nr))
+		return self.cue_player.current
+	
+	def releaseCues(self):
+		"""Stop playing the cue-list, and release all its channels
+		"""
+		if self.cue_player != None:
+			self.cue_player.release()
+	
+	def addEffect(self, name, channels, shape='sine', rate=1., low=0, high=255, spread=0., phase=0., duty=None):
+		"""Add (or replace) the named effect over the given channels (a list of channel-numbers), see DMXEffect.
+		The effects are rendered once per clocked frame (see startTX(...)) into the merge-source 'effects' (see addSource(...))
+		"""
+		if self.tx_thread == None:
+			raise ValueError("Effects need clocked output (see startTX())")
 			
-			self._strToScene(nr, tn.data)
+		effect = DMXEffect(channels, shape, rate, low, high, spread, phase, duty)
+		if self.effects_src == None:
+			self.effects_src = self.addSource('effects')
 			
-	def saveScenes(self, scenefile=None):
-		"""Store the DMXPackets currently in the scene-memory in an XML-file
-		If the scenefile name is not given, the filename from which the scenes were last loaded is used.
+		self.effects.add(name, effect)
+		self.sendDMX()
+	
+	def delEffect(self, name):
+		"""Remove the named effect; its channels are released (unless another effect runs on them)
+		"""
+		self.effects.remove(name)
+		self.sendDMX()
+	
+	def clearEffects(self):
+		"""Remove all effects, and release their channels
+		"""
+		self.effects.clear()
+		self.sendDMX()
+	
+	def _renderEffects(self):
+		"""Frame-hook; render the effects into the merge-source 'effects', and keep the clocked output going while effects run
 		"""
-		self.dom = minidom.parseString("<DMXScenes></DMXScenes>")
+		src = self.effects_src
+		if src == None:
+			return
+			
+		(values, mask) = self.effects.render()
+		src.setLayer(values, mask)
 		
-		for nr in range(len(self.scene)):
-			if self.scene[nr] == None:
-				continue
+		tx = self.tx_thread
+		if len(self.effects) and (tx != None):
+			tx.kick()
+	
+	def startRecording(self, filename, inputs=False, key_interval=10.):
+		"""Start recording every frame sent (and, if 'inputs' is True, every frame received) to a show-file (see DMXRecorder).
+		The output is recorded as merged, before the output-processors (masters & curves; see self.processors),
+		so a replay (which passes through them again, see playShow(...)) comes out the same.
+		The frames are written by a background-thread (see DMXRecordWriter). Any recording in progress is stopped first.
+		"""
+		self.stopRecording()
+		self.record_input = inputs
+		recorder = DMXRecordWriter(DMXRecorder(filename, key_interval))
+		recorder.start()
+		with self.tx_lock:
+			recorder.record(DMXRecorder.OUTPUT, self.dmx_merged)
+			self.recorder = recorder
+	
+	def stopRecording(self):
+		"""Stop recording, after writing all queued frames, and return the DMXRecordWriter (or None if not recording)
+		"""
+		(recorder, self.recorder) = (self.recorder, None)
+		if recorder != None:
+			recorder.close()
 			
-			sc = self.dom.createElement('Scene')
-			at = self.dom.createAttribute('nr')
-			sc.setAttributeNode(at)
-			sc.setAttribute('nr', str(nr))
-			tn = self.dom.createTextNode(self._sceneToStr(nr))
-			sc.appendChild(tn)
-			self.dom.firstChild.appendChild(sc)
+		return recorder
+	
+	def playShow(self, filename, loop=False, start=0., speed=1., kind='output'):
+		"""Play the output-frames (or, with kind 'input', the input-frames) of a show-file as the merge-source 'replay',
+		starting 'start' seconds into the recording. Any show playing is stopped first.
+		"""
+		if kind not in DMXRecorder.kinds:
+			raise ValueError("Unknown kind of frames '%s'" % str(kind))
 			
-		if scenefile != None:
-			if not scenefile.endswith('.xml'):
-				scenefile += ".xml"
-			self.scenefile = scenefile
+		self.stopShow()
+		show = DMXShowFile(filename)
+		try:
+			player = DMXShowPlayer(show, self.addSource('replay'), self.sendDMX, DMXRecorder.kinds[kind], loop, start, speed)
+		except ValueError:
+			show.close()
+			raise
+			
+		self.show_player = player
+		player.start()
+	
+	def stopShow(self):
+		"""Stop playing the show, if playing. Its channels stay as they are, until the merge-source 'replay' is removed.
+		"""
+		(player, self.show_player) = (self.show_player, None)
+		if player != None:
+			player.stop()
+			player.show.close()
+	
+	def setGrandMaster(self, level):
+		"""Set the grand master (0.0 - 1.0), which scales the intensity-channels (see setIntensityChannels(...))
+		"""
+		self.masters.setGrand(level)
+		self.sendDMX()
+	
+	def getGrandMaster(self):
+		"""Return the grand master's level
+		"""
+		return self.masters.grand
+	
+	def setIntensityChannels(self, channels=None):
+		"""Set the channels the grand master scales (a list of channel-numbers; None for all channels)
+		"""
+		self.masters.setIntensity(channels)
+		self.sendDMX()
+	
+	def addSubmaster(self, name, channels, level=1.):
+		"""Add (or replace) a submaster, scaling the given channels (a list of channel-numbers) by its level (0.0 - 1.0)
+		"""
+		self.masters.addSub(name, channels, level)
+		self.sendDMX()
+	
+	def setSubmaster(self, name, level):
+		"""Set a submaster's level (0.0 - 1.0)
+		"""
+		self.masters.setSub(name, level)
+		self.sendDMX()
+	
+	def delSubmaster(self, name):
+		"""Remove a submaster
+		"""
+		self.masters.removeSub(name)
+		self.sendDMX()
+	
+	def setCurve(self, channels, curve='linear', low=0, high=255, invert=False):
+		"""Set the output-curve ('linear', 'square', 'sqrt', 's' or 'switch'), the limits & the inversion of the given channels
+		(a list of channel-numbers), see DMXCurves
+		"""
+		self.curves.setCurve(channels, curve, low, high, invert)
+		self.sendDMX()
+	
+	def parkChannels(self, channels, value):
+		"""Park the given channels (a list of channel-numbers); they output 'value', whatever their level
+		"""
+		self.curves.park(channels, value)
+		self.sendDMX()
+	
+	def unparkChannels(self, channels):
+		"""Un-park the given channels (a list of channel-numbers)
+		"""
+		self.curves.unpark(channels)
+		self.sendDMX()
+	
+	def resetCurves(self, channels=None):
+		"""Reset the given channels (a list of channel-numbers; None for all channels) to linear, unlimited & not parked
+		"""
+		self.curves.reset(channels)
+		self.sendDMX()
+	
+	def loadPatch(self, filename):
+		"""Add the fixture-types & fixtures from a JSON patch-file (see DMXPatch.load(...))
+		"""
+		self.patch.load(filename)
+	
+	def addFixtureType(self, name, attrs):
+		"""Add (or replace) a fixture-type with the given attributes; a list of (name, bits) tuples (bits is 8 or 16),
+		in channel-order (see DMXFixtureType)
+		"""
+		self.patch.addType(DMXFixtureType(name, attrs))
+	
+	def patchFixture(self, fid, typename, address):
+		"""Patch (or re-patch) a fixture of the given type at the given start-address
+		"""
+		self.patch.patch(fid, typename, address)
+		self._updateFixtures()
+	
+	def unpatchFixture(self, fid):
+		"""Remove a fixture from the patch, and release its channels
+		"""
+		self.patch.unpatch(fid)
+		self._updateFixtures()
+	
+	def setFixture(self, fid, attr, value, duration=0.):
+		"""Set a fixture's attribute to 'value' (0 - 255 for 8-bit attributes, 0 - 65535 for 16-bit attributes),
+		or fade it there in 'duration' seconds. Fades need clocked output (see startTX(...)).
+		The attribute-values are played as the merge-source 'fixtures' (see addSource(...))
+		"""
+		if (duration > 0) and (self.tx_thread == None):
+			raise ValueError("Fixture-fades need clocked output (see startTX())")
+			
+		self.patch.set(fid, attr, value, duration)
+		self._updateFixtures()
+	
+	def getFixture(self, fid, attr):
+		"""Return a fixture's attribute-value, or None if the attribute isn't set
+		"""
+		return self.patch.get(fid, attr)
+	
+	def releaseFixture(self, fid, attr=None):
+		"""Stop controlling a fixture's attribute (or all its attributes), and release the channels
+		"""
+		self.patch.release(fid, attr)
+		self._updateFixtures()
+	
+	def _updateFixtures(self):
+		"""Send the changed attribute-values; rendered on the next tick, or right away without clocked output
+		"""
+		if self.patch_src == None:
+			self.patch_src = self.addSource('fixtures')
+			
+		if self.tx_thread == None:
+			self._renderFixtures()
+			
+		self.sendDMX()
+	
+	def _renderFixtures(self):
+		"""Frame-hook; render the attribute-values into the merge-source 'fixtures', and keep the clocked output going while fades run
+		"""
+		src = self.patch_src
+		if src == None:
+			return
+			
+		(values, mask, fading) = self.patch.render()
+		src.setLayer(values, mask)
+		
+		tx = self.tx_thread
+		if fading and (tx != None):
+			tx.kick()
+	
+	def delScene(self, nr):
+		"""Remove the given scene from the scene-memory.
+		(This sets the scene-memory location to 'empty')
+		"""
+		if (type(nr) != types.IntType) or (nr < 0) or (nr >= len(self.scene)):
+			raise ValueError("Invalid scene number '%s'" % str(nr))
+
+		self.scene.delete(nr)
+	
+	def _sceneToStr(self, nr):
+		"""Return the given scene-memory slot as a multi-line string.
+		The channel-values are represented by 2-digit Hexadecimal, 16 channels per row,
+		preceded by a 3-digit Hexadeciaml slot-number.
+		Upto 32 rows per scene (== 512 slots)
+		"""
+		if self.scene.isEmpty(nr):
+			return ""
+		
+		return encodeSceneText(self.scene.getSlots(nr))
 			
-		sf = open(self.scenefile, 'w')
+	def _strToScene(self, nr, in_str):
+		"""Parse the given multi-line string into an array of slot-values (see _sceneToStr(...))
+		Store the new scene in the scene-memory at the indicarted location
+		"""
+		self.scene.store(nr, decodeSceneText(in_str))
 		
-		for line in self.dom.toprettyxml().splitlines():
-			if not len(line):
-				continue
+	def loadScenes(self, scenefile):
+		"""Load the given XML-file and parse the scenes defined therein.
+		Scene-definitions are stored in scene-memory (see DMXSceneStore)
+		The file is parsed as a stream, so the load-time stays proportional to the file-size.
+		The file can also be a binary scene-archive (see DMXSceneArchive), in which case
+		scenes are read from the (memory-mapped) archive only when they are first used.
+		The load-statistics (nr of scenes, file-size & load-time) are kept in self.load_stats
+		"""
+		files_list = [scenefile]
+		if not (scenefile.endswith('.xml') or scenefile.endswith('.dmxa')):
+			files_list.append("%s.xml" % scenefile)
 			
-			if (':' in line) and not (line.startswith('\t')):
-				line = "\t\t" + line
+		for f in files_list:
+			self.scenefile = f
+			if os.path.isfile(f):
+				break
+		else:
+			warnings.warn("Scene-file '%s' not found." % scenefile)
+			self.scenefile = files_list[-1]
+			return
+		
+		self.load_stats = loadSceneFile(self.scene, self.scenefile)
+		
+	def loadStatsStr(self):
+		"""Return a string describing the throughput of the last loadScenes(...)
+		"""
+		if self.load_stats == None:
+			return "no scenes loaded"
 			
-			sf.write("%s\n" % line)
+		secs = max(self.load_stats['time'], 1e-6)
+		return "loaded %d scenes (%d bytes) from '%s' in %.1f ms (%.0f scenes/s, %.1f MB/s)" % (self.load_stats['scenes'], 
+				self.load_stats['bytes'], self.scenefile, secs * 1000, self.load_stats['scenes'] / secs, self.load_stats['bytes'] / (secs * 1e6))
+	
+	def saveScenes(self, scenefile=None, wait=True, callback=None):
+		"""Store the scenes currently in the scene-memory in an XML-file
+		If the scenefile name is not given, the filename from which the scenes were last loaded is used.
+		If the scenefile name ends with '.dmxa', the scenes are saved as a binary scene-archive (see DMXSceneArchive)
+		The file is written by a background-thread (see DMXSceneSaver); if 'wait' is False, this method returns
+		immediately, and the optional 'callback' is called as callback(scenefile, error) when the file has been written.
+		"""
+		if scenefile != None:
+			if not (scenefile.endswith('.xml') or scenefile.endswith('.dmxa')):
+				scenefile += ".xml"
+			self.scenefile = scenefile
 			
-		sf.close()
+		self.saver.save(self.scenefile, callback=callback, wait=wait)
 		
 
 class OSCDMXCtrl(DMXCtrl):
 	"""An OSC-controlled version of the DMX Controller
 	"""
-	def __init__(self, serport='/dev/ttyUSB0', scenefile=None, listenurl=':6788'):
-		"""Instantiate DMXCtrl, instantiate OSCMultiClient & ThreadingOSCServer
+	
+	# start clocked output when the background start-up has finished (see start(...))
+	start_clocked = False
+	
+	# max. size of one OSC reply-datagram (the Ethernet MTU, minus IP & UDP headers)
+	reply_mtu = 1472
+	
+	def __init__(self, serport='/dev/ttyUSB0', scenefile=None, listenurl=':6788', scenemap=None,
+				workers=4, queue_size=256, overload='drop-oldest', background=False, split=False):
+		"""Instantiate DMXCtrl, instantiate OSCMultiClient & PooledOSCServer
+		The OSC-server handles incoming messages with a pool of 'workers' threads, through a queue of at most
+		'queue_size' messages, dropping messages according to the 'overload' policy when the queue is full (see PooledOSCServer)
+		With 'workers' set to None, a ThreadingOSCServer is used instead, which starts a new thread for every message.
+		With 'background' set to True, the box is probed and the scenes are loaded in the background (see DMXCtrl.__init__(...));
+		until that has finished, the '/dmx/...' messages are answered with the start-up status (see '/dmx/status')
+		With 'split' set to True, the box is opened in a separate output-process (see DMXCtrl.__init__(...))
 		"""
-		super(self.__class__, self).__init__(serport, scenefile)
+		super(self.__class__, self).__init__(serport, scenefile, scenemap, background, split)
 		
 		# parse 'listenurl' argument
 		(addr, server_prefix) = OSC.parseUrlStr(listenurl)
@@ -395,22 +1401,172 @@ class OSCDMXCtrl(DMXCtrl):
 		
 		# Create OSC Client & Server
 		self.cli = OSC.OSCMultiClient()
-		self.srv = OSC.ThreadingOSCServer(listen_address, self.cli)
+		if workers == None:
+			self.srv = OSC.ThreadingOSCServer(listen_address, self.cli)
+		else:
+			self.srv = PooledOSCServer(listen_address, self.cli, workers=workers, queue_size=queue_size, overload=overload)
+			
 		self.srv.addDefaultHandlers(server_prefix)
 		self.srv.setSrvInfoPrefix("/serverinfo")
 		
 		# Register DMX-specific message-handlers
-		self.srv.addMsgHandler(server_prefix + "/dmx/scene", self.dmxSceneHandler)
-		self.srv.addMsgHandler(server_prefix + "/dmx/channel", self.dmxChanHandler)
+		handlers = [("/dmx/scene", self.dmxSceneHandler), ("/dmx/channel", self.dmxChanHandler), ("/dmx/frame", self.dmxFrameHandler),
+					("/dmx/merge", self.dmxMergeHandler), ("/dmx/input", self.dmxInputHandler), ("/dmx/stats", self.dmxStatsHandler),
+					("/dmx/trace", self.dmxTraceHandler), ("/dmx/netinput", self.dmxNetInputHandler), ("/dmx/cue", self.dmxCueHandler),
+					("/dmx/effect", self.dmxEffectHandler), ("/dmx/fixture", self.dmxFixtureHandler),
+					("/dmx/master", self.dmxMasterHandler), ("/dmx/curve", self.dmxCurveHandler),
+					("/dmx/record", self.dmxRecordHandler), ("/dmx/replay", self.dmxReplayHandler)]
+		for (address, handler) in handlers:
+			if background:
+				handler = self._gateOSCHandler(handler)
+				
+			self.srv.addMsgHandler(server_prefix + address, handler)
+			
+		# the '/dmx/fixture/<id>/<attr>' addresses depend on the patch, so they're handled by the 'default' handler
+		self.fixture_prefix = server_prefix + "/dmx/fixture/"
+		handler = self.dmxFixtureAttrHandler
+		if background:
+			handler = self._gateOSCHandler(handler)
+			
+		self.srv.addMsgHandler('default', handler)
+			
+		self.srv.addMsgHandler(server_prefix + "/dmx/status", self.dmxStatusHandler)
 			
 		self.srv_thread = None
+		
+		# pushes DMX-input changes to '/dmx/input subscribe'-ers
+		self.pusher = DMXInputPusher(self._sendOSCInput)
+		self.blob_subscribers = set()
+		
+		# '/dmx/channel' set-commands received within one tick of the clocked output,
+		# applied as one batch before the next frame is sent (see _applyChannels())
+		self.pending_lock = threading.Lock()
+		self.pending = {}
+		self.pending_ops = 0
+		self.pending_ids = []
+		self.coalesced = 0
+		self.frame_hooks.append(self._applyChannels)
 	
-	def start(self):
-		"""Start the ThreadingOSCServer
+	def start(self, clocked=True):
+		"""Start the OSCServer
+		If 'clocked' is True, clocked output is started too (see DMXCtrl.startTX(...)),
+		and '/dmx/channel' set-commands are coalesced per tick.
 		"""
 		# create OSCServer's main thread
 		self.srv_thread = threading.Thread(target=self.srv.serve_forever)
 		self.srv_thread.start()
+		
+		self.pusher.start()
+		
+		with self.ready_lock:
+			self.start_clocked = clocked
+			if not self.ready.isSet():	# clocked output is started when the box is ready (see _warmedUp())
+				return
+				
+		if clocked and (self.warmup_error == None):
+			self.startTX()
+	
+	def _warmedUp(self):
+		"""Start clocked output, if start(...) was called before the background start-up finished
+		"""
+		if self.start_clocked:
+			self.startTX()
+	
+	def _gateOSCHandler(self, handler):
+		"""Return a message-handler that calls the given handler once the background start-up has finished
+		(see DMXCtrl.waitReady()), and replies with the start-up status (see '/dmx/status') until then
+		"""
+		def gated(addr, tags, data, client_address):
+			if self.ready.isSet() and (self.warmup_error == None):
+				return handler(addr, tags, data, client_address)
+				
+			return self.dmxStatusHandler(addr, tags, data, client_address)
+			
+		return gated
+	
+	def getStats(self):
+		"""Return a dict with runtime-statistics (see DMXCtrl.getStats()), including:
+		'coalesced':		the nr of '/dmx/channel' set-commands that were merged into a batch (see _applyChannels())
+		and, if the OSC-server is a PooledOSCServer, the OSC-server's statistics (see PooledOSCServer.getStats())
+		"""
+		stats = super(self.__class__, self).getStats()
+		stats['coalesced'] = self.coalesced
+		if isinstance(self.srv, PooledOSCServer):
+			stats.update(self.srv.getStats())
+			
+		return stats
+	
+	def resetStats(self):
+		"""Reset the runtime-statistics (see getStats())
+		"""
+		super(self.__class__, self).resetStats()
+		self.coalesced = 0
+		if isinstance(self.srv, PooledOSCServer):
+			self.srv.resetStats()
+	
+	def startTrace(self, size=65536):
+		"""Start latency-tracing (see DMXCtrl.startTrace(...)), including the OSC-server's queue & dispatch
+		"""
+		super(self.__class__, self).startTrace(size)
+		self.srv.tracer = self.trace_log
+	
+	def stopTrace(self):
+		"""Stop latency-tracing (see DMXCtrl.stopTrace())
+		"""
+		self.srv.tracer = None
+		super(self.__class__, self).stopTrace()
+	
+	def _queueTXChannel(self, ch, val):
+		"""Queue a channel-change, to be applied (together with all other changes received within the same tick)
+		before the next clocked frame. A later change to the same channel replaces the earlier one.
+		"""
+		if (type(ch) != types.IntType) or (ch < 1) or (ch > DMXPacket.packetMaxSlots):
+			raise IndexError("Slot index must be in range (1, %d)" % DMXPacket.packetMaxSlots)
+			
+		if (val < 0) or (val > 255):
+			raise struct.error("ubyte format requires 0 <= number <= 255")
+			
+		with self.pending_lock:
+			self.pending[ch] = val
+			self.pending_ops += 1
+			if self.tracer != None:
+				self.pending_ids.append(self.tracer.current())
+			
+		self.sendDMX()
+	
+	def _applyChannels(self):
+		"""Apply all queued channel-changes to the output-buffer, in one go (see _queueTXChannel(...))
+		The nr of changes that were merged into a batch (i.e. that didn't cost a frame of their own) is counted in self.coalesced
+		Called before every clocked frame, and before any other change to (or read of) the output-buffer (see DMXCtrl._applyChannels()).
+		The batch is taken while holding self.out_lock, so no other change to the output-buffer can come in between.
+		"""
+		with self.out_lock:
+			with self.pending_lock:
+				if not self.pending_ops:
+					return
+					
+				(pending, ops, ids) = (self.pending, self.pending_ops, self.pending_ids)
+				self.pending = {}
+				self.pending_ops = 0
+				self.pending_ids = []
+				self.coalesced += ops - 1
+				
+			chans = numpy.array(pending.keys())
+			out = str(self.dmx_out)
+			slots = numpy.zeros(max(len(out), chans.max() + 1), dtype=numpy.uint8)
+			slots[:len(out)] = numpy.fromstring(out, dtype=numpy.uint8)
+			slots[chans] = pending.values()
+			self.dmx_out.fromString(slots.tostring())
+			self.trace_back.extend([trace_id for trace_id in ids if trace_id])
+	
+	def startRX(self, onchange=True, callback=None):
+		"""Start receiving DMX-input in a background-thread (see DMXCtrl.startRX(...))
+		Changes are pushed to the subscribed OSC-clients (see '/dmx/input subscribe')
+		"""
+		if callback == None:
+			callback = self.pusher.update
+			
+		super(self.__class__, self).startRX(onchange, callback)
 	
 	def close(self):
 		"""Stop the OSCServer threads
@@ -420,6 +1576,8 @@ class OSCDMXCtrl(DMXCtrl):
 		# wait for OSCServer to finish
 		if isinstance(self.srv_thread, threading.Thread) and self.srv_thread.isAlive():
 			self.srv_thread.join()
+			
+		self.pusher.stop()
 		
 		# close DMXCtrl
 		super(self.__class__, self).close()
@@ -428,15 +1586,63 @@ class OSCDMXCtrl(DMXCtrl):
 	# OSC Message-handlers (& support) 
 	###
 	
+	def _parseOSCRange(self, data):
+		"""Parse the optional '[<from_ch> [<to_ch>]]' arguments of an OSC-command.
+		Returns a (from_ch, to_ch) tuple; all channels if no arguments are given, or one channel if only <from_ch> is given.
+		Returns None if the arguments are not a valid channel-range.
+		"""
+		chans = [1, DMXPacket.packetMaxSlots]
+		chans[:len(data)] = data[:2]
+		if len(data) == 1:
+			chans[1] = chans[0]
+			
+		if (type(chans[0]) != types.IntType) or (type(chans[1]) != types.IntType):
+			return None
+			
+		if (chans[0] < 1) or (chans[1] < chans[0]) or (chans[1] > DMXPacket.packetMaxSlots):
+			return None
+			
+		return tuple(chans)
+	
+	def _blobOSCMsgs(self, args, from_ch, values):
+		"""Construct a list of OSCMessages of the form '/dmxinfo <args> <from_ch> <blob>', carrying the given string of slot-values
+		in OSC-blobs. The slot-values are split over as many messages as needed to keep each message within reply_mtu bytes.
+		"""
+		head = OSC.OSCMessage('/dmxinfo')
+		head.append(args + [from_ch])
+		head.append('', 'b')
+		chunk = self.reply_mtu - len(head.getBinary())
+		chunk -= chunk % 4
+		
+		msgs = []
+		for offset in range(0, len(values), chunk):
+			msg = OSC.OSCMessage('/dmxinfo')
+			msg.append(args + [from_ch + offset])
+			msg.append(values[offset:offset + chunk], 'b')
+			msgs.append(msg)
+			
+		return msgs
+	
+	def _sendOSCBlobs(self, args, dmx_str, from_ch, to_ch, client_address):
+		"""Reply with the given range of channels from the given (DMXPacket-)string, as '/dmxinfo <args> <from_ch> <blob>' messages.
+		Replies that don't fit in one datagram are split (see _blobOSCMsgs(...)); all but the last message are sent
+		from here, the last one is returned.
+		"""
+		msgs = self._blobOSCMsgs(args, from_ch, dmx_str[from_ch:to_ch + 1])
+		if not len(msgs):
+			return None
+			
+		for msg in msgs[:-1]:
+			self.srv.client.sendto(msg, client_address)
+			
+		return msgs[-1]
+	
 	def _lsOSCScenes(self):
 		"""Construct an OSCBundle listing all exisiting scene-numbers
 		"""
 		reply = OSC.OSCBundle('/dmxinfo')
-		for nr in range(len(self.scene)):
-			if self.scene[nr] == None:
-				continue
-			
-			reply.append(('scene', nr))
+		for nr in self.scene.numbers():
+			reply.append(('scene', int(nr)))
 		
 		return reply
 		
@@ -477,6 +1683,7 @@ class OSCDMXCtrl(DMXCtrl):
 			reply.append(("scene_command", "get <sc> : return all channels' values from scene"))
 			reply.append(("scene_command", "get <sc> <ch> : return a channel's value from scene"))
 			reply.append(("scene_command", "get <sc> <from_ch> <to_ch> : return a range of channels' values from scene"))
+			reply.append(("scene_command", "getblob <sc> [<from_ch> [<to_ch>]] : return (a range of) channels' values from scene as blob(s)"))
 			reply.append(("scene_command", "load [<file>] : load scenes from file"))
 			reply.append(("scene_command", "save [<file>] : save scenes to file"))
 			return reply
@@ -530,16 +1737,39 @@ class OSCDMXCtrl(DMXCtrl):
 					self.srv.reportErr("Filename in OSC /dmx/scene 'save ...' command must be a string", client_address)
 					return None
 				
+			def saved(scenefile, error):
+				if error != None:
+					self.srv.reportErr("Error saving scenes: %s" % str(error), client_address)
+					return
+					
+				reply = OSC.OSCMessage(self.srv.info_prefix)
+				reply.append("saved scenes to '%s'" % scenefile)
+				self.srv.client.sendto(reply, client_address)
+				
 			try:
-				self.saveScenes(filename)
+				self.saveScenes(filename, wait=False, callback=saved)
 			except Exception, e:
 				self.srv.reportErr("Error saving scenes: %s" % str(e), client_address)
 			
-			reply = OSC.OSCMessage(self.srv.info_prefix)
-			reply.append("saved scenes to '%s'" % self.scenefile)
-			
-			return reply
+			return None
+				
+		if data[0] == 'getblob':
+			if (len(data) < 2) or (type(data[1]) != types.IntType):
+				self.srv.reportErr("Missing scene-number in OSC /dmx/scene 'getblob ...' command", client_address)
+				return None
+				
+			nr = data[1]
+			chans = self._parseOSCRange(data[2:])
+			if chans == None:
+				self.srv.reportErr("Invalid channel-number in OSC /dmx/scene 'getblob ...' command", client_address)
+				return None
+				
+			if (nr < 0) or (nr >= len(self.scene)) or self.scene.isEmpty(nr):
+				self.srv.reportErr("Scene %d is empty" % nr, client_address)
+				return None
 				
+			return self._sendOSCBlobs(['scene', nr], '\x00' + self.scene.getSlots(nr).tostring(), chans[0], chans[1], client_address)
+			
 		if data[0] == 'get':
 			del data [0]
 			if not len(data):
@@ -646,8 +1876,11 @@ class OSCDMXCtrl(DMXCtrl):
 			reply.append(("channel_command", "get : return all channels' current value"))
 			reply.append(("channel_command", "[get] <ch> : return a channel's current value"))
 			reply.append(("channel_command", "get <from_ch> <to_ch> : return range of channels' current value"))
+			reply.append(("channel_command", "getblob [<from_ch> [<to_ch>]] : return (a range of) channels' current value as blob(s)"))
 			reply.append(("channel_command", "[set] <ch> <val> : set a channel to value"))
 			reply.append(("channel_command", "[set] <ch> <val> <time> : fade a channel to value"))
+			reply.append(("channel_command", "setrange <ch> <blob> : set a range of channels, starting at <ch>, to the values in the blob"))
+			reply.append(("channel_command", "setrange <ch> <val> [<val> ...] : set a range of channels, starting at <ch>, to the values"))
 			reply.append(("channel_command", "stop : abort a fade in progress"))
 			return reply
 		
@@ -659,6 +1892,35 @@ class OSCDMXCtrl(DMXCtrl):
 			
 			return None
 				
+		if data[0] == 'setrange':
+			if (len(data) < 3) or (type(data[1]) != types.IntType):
+				self.srv.reportErr("Missing channel-number or values in OSC /dmx/channel 'setrange ...' command", client_address)
+				return None
+				
+			if tags[2:] == 'b':
+				values = data[2]
+			elif tags[2:] == ('i' * (len(data) - 2)):
+				values = data[2:]
+			else:
+				self.srv.reportErr("Values in OSC /dmx/channel 'setrange ...' command must be one blob, or ints", client_address)
+				return None
+				
+			try:
+				self.setTXChannels(data[1], values)
+			except IndexError, e:
+				self.srv.reportErr("Invalid channel-range in OSC /dmx/channel 'setrange ...' command: %s" % str(e), client_address)
+			except ValueError, e:
+				self.srv.reportErr("Invalid channel value in OSC /dmx/channel 'setrange ...' command: %s" % str(e), client_address)
+			return None
+			
+		if data[0] == 'getblob':
+			chans = self._parseOSCRange(data[1:])
+			if chans == None:
+				self.srv.reportErr("Invalid channel-number in OSC /dmx/channel 'getblob ...' command", client_address)
+				return None
+				
+			return self._sendOSCBlobs(['channels'], str(self.dmx_out), chans[0], chans[1], client_address)
+			
 		if data[0] == 'get':
 			del data[0]
 		
@@ -702,7 +1964,10 @@ class OSCDMXCtrl(DMXCtrl):
 		
 		if not len(data):	# set channel value request
 			try:
-				self.setTXChannel(ch, val)
+				if self.tx_thread != None:
+					self._queueTXChannel(ch, val)
+				else:
+					self.setTXChannel(ch, val)
 			except IndexError, e:
 				self.srv.reportErr("Invalid channel-number in OSC /dmx/channel '[set] ...' command: %s" % str(e), client_address)
 			except struct.error, e:
@@ -730,66 +1995,1262 @@ class OSCDMXCtrl(DMXCtrl):
 			self.srv.reportErr("Invalid channel value in OSC /dmx/channel '[set] ...' command: %s" % str(e), client_address)
 			
 		return None
-
-###
-# Main 
-###
-# Creates and starts an OSCDMXCtrl instance
-###
-
-if __name__ == '__main__':
-	# Define default values
-	default_serport = "/dev/ttyUSB0"
-	default_port = 6788
-	default_listen = ":%d" % default_port
-	default_scenefile = "scenes.xml"
-
-	op = optparse.OptionParser()
-
-	# Define command-line options and arguments
-	op.add_option("-s", "--serport", action='store', type='string', dest='serport', metavar='DEV',
-									help="connect to DMX USB Pro box on DEV [default = %s]" % default_serport)
-	op.add_option("-l", "--listen", action='store', type='string', dest='listen', metavar='URL',
-									help="listen for OSC-messages on URL [default = %s]" % default_listen)
-	op.add_option("-f", "--scenefile", action='store', type='string', dest='scenefile', metavar='FILE',
-									help="load scene-memory from FILE [default = %s]" % default_scenefile)
-
-	# Set defaults
-	op.set_defaults(serport=default_serport)
-	op.set_defaults(listen=default_listen)
-	op.set_defaults(scenefile=default_scenefile)
-
-	# Parse command-line options
-	(opts, args) = op.parse_args()
-
-	def showwarning(message, category, filename, lineno, file=None):
-		"""Alternate 'warnings' printing function.
-		Writes warnings to stderr (using the write() method)
+	
+	def dmxStatusHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/status' address
+		Replies with the start-up status; 'ready', 'warming up <stage>' or 'failed <error>'
 		"""
-		sys.stderr.write("Warning: %s\n" % message)
+		reply = OSC.OSCMessage('/dmxinfo')
+		if self.warmup_error != None:
+			reply.append(['status', 'failed', str(self.warmup_error)])
+		elif self.ready.isSet():
+			reply.append(['status', 'ready'])
+		else:
+			reply.append(['status', 'warming up', self.warmup_status])
+			
+		return reply
 	
-	warnings.showwarning = showwarning
+	def dmxTraceHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/trace' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("trace_command", "start [<size>] : start latency-tracing, keeping the last <size> trace-events"))
+			reply.append(("trace_command", "stop : stop latency-tracing"))
+			reply.append(("trace_command", "dump <filename> : write the trace to file, as a Chrome trace (JSON)"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd == 'start':
+			size = 65536
+			if len(data):
+				size = data[0]
+				if (type(size) != types.IntType) or (size < 1):
+					self.srv.reportErr("Invalid size in OSC /dmx/trace 'start ...' command: '%s'" % str(size), client_address)
+					return None
+					
+			self.startTrace(size)
+			return None
+			
+		if cmd == 'stop':
+			self.stopTrace()
+			return None
+			
+		if cmd == 'dump':
+			if (not len(data)) or (type(data[0]) not in types.StringTypes):
+				self.srv.reportErr("Missing filename in OSC /dmx/trace 'dump ...' command", client_address)
+				return None
+				
+			try:
+				events = self.dumpTrace(data[0])
+			except (ValueError, IOError), e:
+				self.srv.reportErr("Error dumping trace to '%s': %s" % (data[0], str(e)), client_address)
+				return None
+				
+			reply = OSC.OSCMessage('/dmxinfo')
+			reply.append(['trace', data[0], events])
+			return reply
+			
+		self.srv.reportErr("Unrecognized OSC /dmx/trace command: '%s'" % str(cmd), client_address)
+		return None
+	
+	def dmxStatsHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/stats' address
+		"""
+		if len(data) and (data[0] in ('help', 'info')):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("stats_command", "[get] : return all runtime-statistics"))
+			reply.append(("stats_command", "reset : reset the runtime-statistics"))
+			return reply
+			
+		if len(data) and (data[0] == 'reset'):
+			self.resetStats()
+			return None
+			
+		if len(data) and (data[0] != 'get'):
+			self.srv.reportErr("Unrecognized OSC /dmx/stats command: '%s'" % str(data[0]), client_address)
+			return None
+			
+		stats = self.getStats()
+		reply = OSC.OSCBundle('/dmxinfo')
+		for name in sorted(stats.keys()):
+			val = stats[name]
+			if type(val) != types.IntType:
+				val = float(val)
+				
+			reply.append(('stat', name, val))
+			
+		return reply
+	
+	def dmxFrameHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/frame' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("frame_command", "<blob> : set all channels to the values in the blob"))
+			return reply
+			
+		if tags != 'b':
+			self.srv.reportErr("OSC /dmx/frame message must contain one blob", client_address)
+			return None
+			
+		try:
+			self.setTXFrame(data[0])
+		except IndexError, e:
+			self.srv.reportErr("Invalid frame in OSC /dmx/frame message: %s" % str(e), client_address)
+			
+		return None
+	
+	def _lsOSCSources(self):
+		"""Construct an OSCBundle listing all merge-sources and their priorities
+		"""
+		reply = OSC.OSCBundle('/dmxinfo')
+		for src in self.merge.sources.values():
+			reply.append(('source', src.name, src.priority))
+			
+		return reply
+	
+	def dmxMergeHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/merge' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("merge_command", "ls | list : list merge-sources and their priorities"))
+			reply.append(("merge_command", "add <src> [<prio>] : add a merge-source (or change its priority)"))
+			reply.append(("merge_command", "del <src> : remove a merge-source"))
+			reply.append(("merge_command", "input [<prio>] : merge the DMX-input as source 'input'"))
+			reply.append(("merge_command", "input off : stop merging the DMX-input"))
+			reply.append(("merge_command", "set <src> <ch> <val> [<val> ...] : set channel(s) of a merge-source"))
+			reply.append(("merge_command", "set <src> <ch> <blob> : set channels of a merge-source to the values in the blob"))
+			reply.append(("merge_command", "release <src> [<from_ch> [<to_ch>]] : release (all) channels of a merge-source"))
+			reply.append(("merge_command", "htp [<from_ch> [<to_ch>]] : merge (all) channels highest-takes-precedence"))
+			reply.append(("merge_command", "ltp [<from_ch> [<to_ch>]] : merge (all) channels latest-takes-precedence"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd in ('ls', 'list'):
+			return self._lsOSCSources()
+			
+		if cmd == 'input':
+			prio = 0
+			if len(data):
+				prio = data.pop(0)
+				if prio == 'off':
+					prio = None
+				elif type(prio) != types.IntType:
+					self.srv.reportErr("Unrecognized priority in OSC /dmx/merge 'input ...' command: '%s'" % str(prio), client_address)
+					return None
+					
+			self.mergeInput(prio)
+			return self._lsOSCSources()
+			
+		if cmd in ('htp', 'ltp'):
+			chans = self._parseOSCRange(data)
+			if chans == None:
+				self.srv.reportErr("Invalid channel-number in OSC /dmx/merge '%s ...' command" % cmd, client_address)
+				return None
+				
+			try:
+				self.setHTP(chans[0], chans[1], cmd == 'htp')
+			except IndexError, e:
+				self.srv.reportErr("Invalid channel-number in OSC /dmx/merge '%s ...' command: %s" % (cmd, str(e)), client_address)
+				
+			return None
+			
+		if cmd not in ('add', 'del', 'set', 'release'):
+			self.srv.reportErr("Unrecognized OSC /dmx/merge command: '%s'" % str(cmd), client_address)
+			return None
+			
+		if not len(data):
+			self.srv.reportErr("Missing source-name in OSC /dmx/merge '%s ...' command" % cmd, client_address)
+			return None
+			
+		name = data.pop(0)
+		if type(name) not in types.StringTypes:
+			self.srv.reportErr("Source-name in OSC /dmx/merge '%s ...' command must be a string" % cmd, client_address)
+			return None
+			
+		if cmd == 'add':
+			prio = 0
+			if len(data):
+				prio = data.pop(0)
+				if type(prio) != types.IntType:
+					self.srv.reportErr("Unrecognized priority in OSC /dmx/merge 'add ...' command: '%s'" % str(prio), client_address)
+					return None
+					
+			self.addSource(name, prio)
+			return self._lsOSCSources()
+			
+		if name not in self.merge:
+			self.srv.reportErr("Unknown source in OSC /dmx/merge '%s ...' command: '%s'" % (cmd, name), client_address)
+			return None
+			
+		if cmd == 'del':
+			try:
+				self.removeSource(name)
+			except ValueError, e:
+				self.srv.reportErr(str(e), client_address)
+				
+			return self._lsOSCSources()
+			
+		src = self.merge[name]
+		if cmd == 'release':
+			chans = self._parseOSCRange(data)
+			if chans == None:
+				self.srv.reportErr("Invalid channel-number in OSC /dmx/merge 'release ...' command", client_address)
+				return None
+				
+			src.release(chans[0], chans[1])
+			self.sendDMX()
+			return None
+			
+		# cmd == 'set'
+		if len(data) < 2:
+			self.srv.reportErr("Missing channel value in OSC /dmx/merge 'set ...' command", client_address)
+			return None
+			
+		if type(data[0]) != types.IntType:
+			self.srv.reportErr("Unrecognized channel-number in OSC /dmx/merge 'set ...' command: '%s'" % str(data[0]), client_address)
+			return None
+			
+		values = data[1:]
+		if tags[3:] == 'b':
+			values = values[0]
+		else:
+			for val in values:
+				if (type(val) != types.IntType) or (val < 0) or (val > 255):
+					self.srv.reportErr("Invalid channel value in OSC /dmx/merge 'set ...' command: '%s'" % str(val), client_address)
+					return None
+					
+		try:
+			src.setChannels(data[0], values)
+		except IndexError, e:
+			self.srv.reportErr("Invalid channel-number in OSC /dmx/merge 'set ...' command: %s" % str(e), client_address)
+			return None
+			
+		self.sendDMX()
+		return None
+	
+	def _inputOSCMsg(self, start_ch, values):
+		"""Construct an OSCMessage with the given range of DMX-input values, starting at channel 'start_ch'
+		'values' is a string of slot-values
+		"""
+		msg = OSC.OSCMessage('/dmxinfo')
+		msg.append(['input', start_ch])
+		msg.append(numpy.fromstring(values, dtype=numpy.uint8).tolist())
+		return msg
+	
+	def _sendOSCInput(self, address, ranges):
+		"""Send the given changed ranges of DMX-input to the given subscriber (see DMXInputPusher)
+		"""
+		if address in self.blob_subscribers:
+			for (start_ch, values) in ranges:
+				for msg in self._blobOSCMsgs(['inputs'], start_ch, values):
+					self.cli.socket.sendto(msg.getBinary(), address)
+					
+			return
+			
+		if len(ranges) == 1:
+			msg = self._inputOSCMsg(*ranges[0])
+		else:
+			msg = OSC.OSCBundle('/dmxinfo')
+			for (start_ch, values) in ranges:
+				msg.append(self._inputOSCMsg(start_ch, values))
+				
+		self.cli.socket.sendto(msg.getBinary(), address)
+	
+	def dmxInputHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/input' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("input_command", "start [always] : start receiving DMX-input (on change, or always)"))
+			reply.append(("input_command", "stop : stop receiving DMX-input"))
+			reply.append(("input_command", "get [<from_ch> [<to_ch>]] : return (a range of) DMX-input channels' current value"))
+			reply.append(("input_command", "getblob [<from_ch> [<to_ch>]] : return (a range of) DMX-input channels' current value as blob(s)"))
+			reply.append(("input_command", "subscribe [<port> [<rate>]] [blob] : push DMX-input changes to port, at most <rate> times per second (as blobs)"))
+			reply.append(("input_command", "unsubscribe [<port>] : stop pushing DMX-input changes to port"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd == 'start':
+			onchange = not (len(data) and (data[0] == 'always'))
+			try:
+				self.startRX(onchange)
+			except DMXUSBError, e:
+				self.srv.reportErr("Error starting DMX-input: %s" % str(e), client_address)
+				
+			return None
+			
+		if cmd == 'stop':
+			self.stopRX()
+			return None
+			
+		if cmd in ('get', 'getblob'):
+			chans = self._parseOSCRange(data)
+			if chans == None:
+				self.srv.reportErr("Invalid channel-number in OSC /dmx/input '%s ...' command" % cmd, client_address)
+				return None
+				
+			if cmd == 'getblob':
+				return self._sendOSCBlobs(['inputs'], str(self.dmx_in), chans[0], chans[1], client_address)
+				
+			values = str(self.dmx_in)[chans[0]:chans[1] + 1]
+			if not len(values):
+				return None
+				
+			return self._inputOSCMsg(chans[0], values)
+			
+		if cmd in ('subscribe', 'unsubscribe'):
+			blob = False
+			if len(data) and (data[-1] == 'blob'):
+				blob = True
+				del data[-1]
+				
+			port = client_address[1]
+			if len(data):
+				port = data.pop(0)
+				if type(port) != types.IntType:
+					self.srv.reportErr("Unrecognized port-number in OSC /dmx/input '%s ...' command: '%s'" % (cmd, str(port)), client_address)
+					return None
+					
+			address = (client_address[0], port)
+			if cmd == 'unsubscribe':
+				self.pusher.unsubscribe(address)
+				self.blob_subscribers.discard(address)
+				return None
+				
+			rate = 0
+			if len(data):
+				rate = data.pop(0)
+				if (type(rate) not in (types.IntType, types.FloatType)) or (rate < 0):
+					self.srv.reportErr("Invalid rate in OSC /dmx/input 'subscribe ...' command: '%s'" % str(rate), client_address)
+					return None
+					
+			if blob:
+				self.blob_subscribers.add(address)
+			else:
+				self.blob_subscribers.discard(address)
+				
+			self.pusher.subscribe(address, rate)
+			return None
+			
+		self.srv.reportErr("Unrecognized OSC /dmx/input command: '%s'" % str(cmd), client_address)
+		return None
+	
+	def _lsOSCCues(self):
+		"""Construct an OSCBundle listing all cues; number, scene and times (a follow-time of -1 means 'no follow')
+		"""
+		reply = OSC.OSCBundle('/dmxinfo')
+		with self.cuelist.lock:
+			for cue in self.cuelist.cues:
+				follow = cue.follow
+				if follow == None:
+					follow = -1
+					
+				reply.append(('cue', cue.nr, cue.scene, cue.fade_in, cue.fade_out, cue.delay, float(follow)))
+				
+		return reply
+	
+	def _currentOSCCue(self):
+		"""Construct an OSCMessage with the number of the current cue (-1 for none)
+		"""
+		nr = self.currentCue()
+		if nr == None:
+			nr = -1
+			
+		reply = OSC.OSCMessage('/dmxinfo')
+		reply.append(['cue', 'current', float(nr)])
+		return reply
+	
+	def dmxCueHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/cue' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("cue_command", "ls | list : list cues (nr, scene, fade-in, fade-out, delay & follow)"))
+			reply.append(("cue_command", "add <nr> <scene> [<fade_in> [<fade_out> [<delay> [<follow>]]]] : add (or replace) a cue"))
+			reply.append(("cue_command", "del <nr> : remove a cue"))
+			reply.append(("cue_command", "go : start the next cue"))
+			reply.append(("cue_command", "back : go back to the previous cue"))
+			reply.append(("cue_command", "goto <nr> : go to the given cue"))
+			reply.append(("cue_command", "current : return the current cue's nr"))
+			reply.append(("cue_command", "release : stop playing the cues, and release their channels"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd in ('ls', 'list'):
+			return self._lsOSCCues()
+			
+		if cmd == 'current':
+			return self._currentOSCCue()
+			
+		if cmd == 'release':
+			self.releaseCues()
+			return None
+			
+		if cmd in ('go', 'back'):
+			try:
+				if cmd == 'go':
+					self.goCue()
+				else:
+					self.backCue()
+			except IndexError, e:
+				self.srv.reportErr("Error in OSC /dmx/cue '%s' command: %s" % (cmd, str(e)), client_address)
+				return None
+				
+			return self._currentOSCCue()
+			
+		if cmd not in ('add', 'del', 'goto'):
+			self.srv.reportErr("Unrecognized OSC /dmx/cue command: '%s'" % str(cmd), client_address)
+			return None
+			
+		for arg in data:
+			if type(arg) not in (types.IntType, types.FloatType):
+				self.srv.reportErr("Invalid argument in OSC /dmx/cue '%s ...' command: '%s'" % (cmd, str(arg)), client_address)
+				return None
+				
+		if (not len(data)) or ((cmd == 'add') and (len(data) < 2)):
+			self.srv.reportErr("Missing argument(s) in OSC /dmx/cue '%s ...' command" % cmd, client_address)
+			return None
+			
+		try:
+			if cmd == 'add':
+				self.addCue(*data[:6])
+				return None
+				
+			if cmd == 'del':
+				self.delCue(data[0])
+				return None
+				
+			self.gotoCue(data[0])
+		except (ValueError, IndexError), e:
+			self.srv.reportErr("Error in OSC /dmx/cue '%s ...' command: %s" % (cmd, str(e)), client_address)
+			return None
+			
+		return self._currentOSCCue()
+	
+	def _lsOSCEffects(self):
+		"""Construct an OSCBundle listing all effects; name, shape, rate, levels, first channel & nr of channels
+		"""
+		reply = OSC.OSCBundle('/dmxinfo')
+		with self.effects.lock:
+			for name in sorted(self.effects.effects.keys()):
+				eff = self.effects.effects[name]
+				reply.append(('effect', name, eff.shape, eff.rate, int(eff.low), int(eff.high), int(eff.channels[0]), len(eff)))
+				
+		return reply
+	
+	def dmxEffectHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/effect' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("effect_command", "ls | list : list effects (name, shape, rate, low, high, first channel & nr of channels)"))
+			reply.append(("effect_command", "add <name> <shape> <from_ch> <to_ch> [<rate> [<low> [<high> [<spread> [<phase> [<duty>]]]]]] : "
+						"add (or replace) an effect over a range of channels"))
+			reply.append(("effect_command", "shapes : %s" % ", ".join(DMXEffect.shapes)))
+			reply.append(("effect_command", "del <name> : remove an effect"))
+			reply.append(("effect_command", "clear : remove all effects"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd in ('ls', 'list'):
+			return self._lsOSCEffects()
+			
+		if cmd == 'clear':
+			self.clearEffects()
+			return None
+			
+		if cmd not in ('add', 'del'):
+			self.srv.reportErr("Unrecognized OSC /dmx/effect command: '%s'" % str(cmd), client_address)
+			return None
+			
+		if (not len(data)) or ((cmd == 'add') and (len(data) < 4)):
+			self.srv.reportErr("Missing argument(s) in OSC /dmx/effect '%s ...' command" % cmd, client_address)
+			return None
+			
+		name = str(data.pop(0))
+		if cmd == 'del':
+			if name not in self.effects:
+				self.srv.reportErr("Unknown effect in OSC /dmx/effect 'del ...' command: '%s'" % name, client_address)
+				return None
+				
+			self.delEffect(name)
+			return None
+			
+		shape = str(data.pop(0))
+		for arg in data:
+			if type(arg) not in (types.IntType, types.FloatType):
+				self.srv.reportErr("Invalid argument in OSC /dmx/effect '%s ...' command: '%s'" % (cmd, str(arg)), client_address)
+				return None
+				
+		(first, last) = (int(data[0]), int(data[1]))
+		if last < first:	# a reversed range runs the effect (e.g. a chase) backwards
+			channels = range(first, last - 1, -1)
+		else:
+			channels = range(first, last + 1)
+			
+		try:
+			self.addEffect(name, channels, shape, *data[2:8])
+		except (ValueError, IndexError), e:
+			self.srv.reportErr("Error in OSC /dmx/effect '%s ...' command: %s" % (cmd, str(e)), client_address)
+			
+		return None
+	
+	def _lsOSCFixtures(self):
+		"""Construct an OSCBundle listing all patched fixtures; id, type, address & nr of channels
+		"""
+		reply = OSC.OSCBundle('/dmxinfo')
+		with self.patch.lock:
+			for fid in sorted(self.patch.fixtures.keys()):
+				(ftype, address) = self.patch.fixtures[fid]
+				reply.append(('fixture', fid, ftype.name, address, len(ftype)))
+				
+		return reply
+	
+	def _lsOSCFixtureTypes(self):
+		"""Construct an OSCBundle listing all fixture-types, with their attributes & their nr of bits
+		"""
+		reply = OSC.OSCBundle('/dmxinfo')
+		with self.patch.lock:
+			for name in sorted(self.patch.types.keys()):
+				msg = ['fixture_type', name]
+				for (attr, offset, bits) in self.patch.types[name].attrs:
+					msg.extend([attr, bits])
+					
+				reply.append(msg)
+				
+		return reply
+	
+	def dmxFixtureHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/fixture' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("fixture_command", "ls | list : list patched fixtures (id, type, address & nr of channels)"))
+			reply.append(("fixture_command", "types : list fixture-types (name, and attribute & nr of bits for each attribute)"))
+			reply.append(("fixture_command", "type <name> <attr> <bits> [<attr> <bits> ...] : define (or replace) a fixture-type"))
+			reply.append(("fixture_command", "patch <id> <type> <address> : patch (or re-patch) a fixture"))
+			reply.append(("fixture_command", "unpatch <id> : remove a fixture from the patch"))
+			reply.append(("fixture_command", "release <id> [<attr>] : release a fixture's attribute (or all its attributes)"))
+			reply.append(("fixture_command", "(at %s<id>/<attr>) [<val> [<time>]] : get, set or fade an attribute" % self.fixture_prefix))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd in ('ls', 'list'):
+			return self._lsOSCFixtures()
+			
+		if cmd == 'types':
+			return self._lsOSCFixtureTypes()
+			
+		if cmd not in ('type', 'patch', 'unpatch', 'release'):
+			self.srv.reportErr("Unrecognized OSC /dmx/fixture command: '%s'" % str(cmd), client_address)
+			return None
+			
+		if (not len(data)) or ((cmd == 'type') and ((len(data) < 3) or not (len(data) & 1))) or ((cmd == 'patch') and (len(data) < 3)):
+			self.srv.reportErr("Missing argument(s) in OSC /dmx/fixture '%s ...' command" % cmd, client_address)
+			return None
+			
+		try:
+			if cmd == 'type':
+				attrs = [(data[i], data[i + 1]) for i in range(1, len(data), 2)]
+				self.addFixtureType(data[0], attrs)
+				return self._lsOSCFixtureTypes()
+				
+			if cmd == 'patch':
+				if type(data[2]) != types.IntType:
+					raise ValueError("invalid address '%s'" % str(data[2]))
+					
+				self.patchFixture(data[0], str(data[1]), data[2])
+			elif cmd == 'unpatch':
+				self.unpatchFixture(data[0])
+			else:
+				self.releaseFixture(*data[:2])
+				return None
+				
+		except (ValueError, IndexError, KeyError), e:
+			self.srv.reportErr("Error in OSC /dmx/fixture '%s ...' command: %s" % (cmd, str(e)), client_address)
+			return None
+			
+		return self._lsOSCFixtures()
+	
+	def _matchFixtureAttrs(self, fid, attr):
+		"""Return a list of the (fixture-id, attribute) pairs matching the given fixture-id & attribute,
+		either of which may contain OSC-wildcards ('*', '?', '[]' & '{,}')
+		"""
+		if not len(set('*?[{') & set(fid + attr)):
+			return [(fid, attr)]
+			
+		(fid_re, attr_re) = (OSC.getRegEx(fid), OSC.getRegEx(attr))
+		with self.patch.lock:
+			keys = sorted(self.patch.index.keys())
+			
+		matches = []
+		for (f, a) in keys:
+			(f_match, a_match) = (fid_re.match(f), attr_re.match(a))
+			if f_match and a_match and (f_match.end() == len(f)) and (a_match.end() == len(a)):
+				matches.append((f, a))
+				
+		return matches
+	
+	def dmxFixtureAttrHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/fixture/<id>/<attr>' addresses. This is registered as the OSCServer's
+		'default' handler; messages to any other unhandled address are passed on to the OSCServer's noCallback_handler
+		"""
+		if not addr.startswith(self.fixture_prefix):
+			return self.srv.noCallback_handler(addr, tags, data, client_address)
+			
+		parts = addr[len(self.fixture_prefix):].split('/')
+		if len(parts) != 2:
+			self.srv.reportErr("Invalid OSC fixture-address '%s'; should be %s<id>/<attr>" % (addr, self.fixture_prefix), client_address)
+			return None
+			
+		targets = self._matchFixtureAttrs(*parts)
+		if not len(data):		# get
+			reply = OSC.OSCBundle('/dmxinfo')
+			for (fid, attr) in targets:
+				try:
+					val = self.getFixture(fid, attr)
+				except KeyError, e:
+					self.srv.reportErr("Error in OSC fixture-address '%s': %s" % (addr, str(e)), client_address)
+					return None
+					
+				if val == None:
+					val = -1
+					
+				reply.append(('fixture', fid, attr, val))
+				
+			return reply
+			
+		for arg in data:
+			if type(arg) not in (types.IntType, types.FloatType):
+				self.srv.reportErr("Invalid argument in OSC fixture-address '%s': '%s'" % (addr, str(arg)), client_address)
+				return None
+				
+		try:
+			for (fid, attr) in targets:
+				self.setFixture(fid, attr, *data[:2])
+		except (ValueError, KeyError), e:
+			self.srv.reportErr("Error in OSC fixture-address '%s': %s" % (addr, str(e)), client_address)
+			
+		return None
+	
+	def _lsOSCMasters(self):
+		"""Construct an OSCBundle listing the grand master & all submasters; name, level & nr of channels
+		"""
+		reply = OSC.OSCBundle('/dmxinfo')
+		with self.masters.lock:
+			reply.append(('master', 'grand', self.masters.grand, int(self.masters.intensity.sum())))
+			for name in sorted(self.masters.subs.keys()):
+				(mask, level) = self.masters.subs[name]
+				reply.append(('master', name, level, int(mask.sum())))
+				
+		return reply
+	
+	def dmxMasterHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/master' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("master_command", "ls | list : list the grand master & submasters (name, level & nr of channels)"))
+			reply.append(("master_command", "grand <level> : set the grand master (0.0 - 1.0)"))
+			reply.append(("master_command", "intensity [<from_ch> <to_ch> ...] : set the channels the grand master scales (default: all)"))
+			reply.append(("master_command", "add <name> <from_ch> <to_ch> [<from_ch> <to_ch> ...] : add (or replace) a submaster over ranges of channels"))
+			reply.append(("master_command", "del <name> : remove a submaster"))
+			reply.append(("master_command", "sub <name> <level> : set a submaster (0.0 - 1.0)"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd in ('ls', 'list'):
+			return self._lsOSCMasters()
+			
+		if cmd not in ('grand', 'intensity', 'add', 'del', 'sub'):
+			self.srv.reportErr("Unrecognized OSC /dmx/master command: '%s'" % str(cmd), client_address)
+			return None
+			
+		name = None
+		if cmd in ('add', 'del', 'sub'):
+			if not len(data):
+				self.srv.reportErr("Missing argument(s) in OSC /dmx/master '%s ...' command" % cmd, client_address)
+				return None
+				
+			name = str(data.pop(0))
+			
+		for arg in data:
+			if type(arg) not in (types.IntType, types.FloatType):
+				self.srv.reportErr("Invalid argument in OSC /dmx/master '%s ...' command: '%s'" % (cmd, str(arg)), client_address)
+				return None
+				
+		if ((cmd in ('grand', 'sub')) and (len(data) != 1)) or ((cmd in ('add', 'intensity')) and (len(data) & 1)) or \
+				((cmd == 'add') and not len(data)):
+			self.srv.reportErr("Wrong number of arguments in OSC /dmx/master '%s ...' command" % cmd, client_address)
+			return None
+			
+		channels = []
+		for i in range(0, len(data) - 1, 2):
+			channels.extend(range(int(data[i]), int(data[i + 1]) + 1))
+			
+		try:
+			if cmd == 'grand':
+				self.setGrandMaster(data[0])
+			elif cmd == 'sub':
+				self.setSubmaster(name, data[0])
+			elif cmd == 'del':
+				self.delSubmaster(name)
+			elif cmd == 'add':
+				self.addSubmaster(name, channels)
+			elif len(data):
+				self.setIntensityChannels(channels)
+			else:
+				self.setIntensityChannels(None)
+				
+		except (ValueError, IndexError, KeyError), e:
+			self.srv.reportErr("Error in OSC /dmx/master '%s ...' command: %s" % (cmd, str(e)), client_address)
+			
+		return None
+	
+	def _lsOSCCurves(self):
+		"""Construct an OSCBundle listing the channels that aren't linear, unlimited & un-parked;
+		channel, curve, limits, inversion & park-value (-1 if not parked)
+		"""
+		reply = OSC.OSCBundle('/dmxinfo')
+		with self.curves.lock:
+			chans = sorted(set(self.curves.settings.keys()) | set(self.curves.parked.keys()))
+			
+		for ch in chans:
+			(curve, low, high, invert, park) = self.curves.get(ch)
+			if park == None:
+				park = -1
+				
+			reply.append(('curve', ch, curve, low, high, int(invert), park))
+			
+		return reply
+	
+	def dmxCurveHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/curve' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("curve_command", "ls | list : list the channels with a curve, limits or parking (ch, curve, low, high, invert & park-value)"))
+			reply.append(("curve_command", "set <from_ch> <to_ch> <curve> [<low> [<high> [<invert>]]] : set the curve, limits & inversion of channels"))
+			reply.append(("curve_command", "curves : %s" % ", ".join(DMXCurves.curves)))
+			reply.append(("curve_command", "park <from_ch> <to_ch> <val> : park channels at a value"))
+			reply.append(("curve_command", "unpark <from_ch> <to_ch> : un-park channels"))
+			reply.append(("curve_command", "reset [<from_ch> <to_ch>] : reset channels (default: all) to linear, unlimited & not parked"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd in ('ls', 'list'):
+			return self._lsOSCCurves()
+			
+		if cmd not in ('set', 'park', 'unpark', 'reset'):
+			self.srv.reportErr("Unrecognized OSC /dmx/curve command: '%s'" % str(cmd), client_address)
+			return None
+			
+		needed = {'set':3, 'park':3, 'unpark':2, 'reset':0}[cmd]
+		if (len(data) < needed) or ((cmd == 'reset') and (len(data) not in (0, 2))):
+			self.srv.reportErr("Missing argument(s) in OSC /dmx/curve '%s ...' command" % cmd, client_address)
+			return None
+			
+		args = data[:2] + data[3:]
+		if cmd != 'set':
+			args = data
+			
+		for arg in args:
+			if type(arg) not in (types.IntType, types.FloatType):
+				self.srv.reportErr("Invalid argument in OSC /dmx/curve '%s ...' command: '%s'" % (cmd, str(arg)), client_address)
+				return None
+				
+		channels = None
+		if len(data):
+			channels = range(int(data[0]), int(data[1]) + 1)
+			
+		try:
+			if cmd == 'set':
+				self.setCurve(channels, str(data[2]), *data[3:6])
+			elif cmd == 'park':
+				self.parkChannels(channels, data[2])
+			elif cmd == 'unpark':
+				self.unparkChannels(channels)
+			else:
+				self.resetCurves(channels)
+				
+		except (ValueError, IndexError), e:
+			self.srv.reportErr("Error in OSC /dmx/curve '%s ...' command: %s" % (cmd, str(e)), client_address)
+			
+		return None
+	
+	def _recordOSCStatus(self):
+		"""Construct an OSCMessage with the recording-status; file, nr of frames & bytes recorded
+		"""
+		reply = OSC.OSCMessage('/dmxinfo')
+		recorder = self.recorder
+		if recorder == None:
+			reply.append(['record', 'off'])
+		else:
+			reply.append(['record', recorder.filename, recorder.frames, recorder.bytes])
+			
+		return reply
+	
+	def dmxRecordHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/record' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("record_command", "start <filename> [<inputs>] : start recording the output (and the input, if <inputs> is 1) to a show-file"))
+			reply.append(("record_command", "stop : stop recording"))
+			reply.append(("record_command", "status : return the recording-status (filename, nr of frames & bytes)"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd == 'start':
+			if not len(data):
+				self.srv.reportErr("Missing argument(s) in OSC /dmx/record '%s ...' command" % cmd, client_address)
+				return None
+				
+			try:
+				self.startRecording(str(data[0]), len(data) > 1 and bool(data[1]))
+			except IOError, e:
+				self.srv.reportErr("Error in OSC /dmx/record '%s ...' command: %s" % (cmd, str(e)), client_address)
+				return None
+				
+		elif cmd == 'stop':
+			self.stopRecording()
+		elif cmd != 'status':
+			self.srv.reportErr("Unrecognized OSC /dmx/record command: '%s'" % str(cmd), client_address)
+			return None
+			
+		return self._recordOSCStatus()
+	
+	def _replayOSCStatus(self):
+		"""Construct an OSCMessage with the playback-status; file, position, duration & whether it's still playing
+		"""
+		reply = OSC.OSCMessage('/dmxinfo')
+		player = self.show_player
+		if player == None:
+			reply.append(['replay', 'off'])
+		else:
+			reply.append(['replay', player.show.filename, float(player.pos), float(player.show.duration()), int(player.isPlaying())])
+			
+		return reply
+	
+	def dmxReplayHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/replay' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("replay_command", "play <filename> [<loop> [<start> [<speed>]]] : play the output recorded in a show-file"))
+			reply.append(("replay_command", "input <filename> [<loop> [<start> [<speed>]]] : play the input recorded in a show-file"))
+			reply.append(("replay_command", "stop : stop playing"))
+			reply.append(("replay_command", "status : return the playback-status (filename, position, duration & playing)"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd in ('play', 'input'):
+			if not len(data):
+				self.srv.reportErr("Missing argument(s) in OSC /dmx/replay '%s ...' command" % cmd, client_address)
+				return None
+				
+			filename = str(data.pop(0))
+			for arg in data:
+				if type(arg) not in (types.IntType, types.FloatType):
+					self.srv.reportErr("Invalid argument in OSC /dmx/replay '%s ...' command: '%s'" % (cmd, str(arg)), client_address)
+					return None
+					
+			args = []
+			if len(data):
+				args = [bool(data[0])] + data[1:3]
+				
+			kind = {'play':'output', 'input':'input'}[cmd]
+			try:
+				self.playShow(filename, *args, **{'kind':kind})
+			except (IOError, ValueError), e:
+				self.srv.reportErr("Error in OSC /dmx/replay '%s ...' command: %s" % (cmd, str(e)), client_address)
+				return None
+				
+		elif cmd == 'stop':
+			self.stopShow()
+		elif cmd != 'status':
+			self.srv.reportErr("Unrecognized OSC /dmx/replay command: '%s'" % str(cmd), client_address)
+			return None
+			
+		return self._replayOSCStatus()
+	
+	def _lsOSCNetInput(self):
+		"""Construct an OSCBundle listing all received network-universes, with their nr of packets & slots,
+		and their merge-priority (-1 if not merged)
+		"""
+		reply = OSC.OSCBundle('/dmxinfo')
+		if self.net_input == None:
+			return reply
+			
+		for ((protocol, universe), univ) in sorted(self.net_input.universes.items()):
+			prio = -1
+			if (protocol, universe) in self.net_sources:
+				prio = self.net_sources[(protocol, universe)].priority
+				
+			reply.append(('netinput', protocol, universe, univ.packets, univ.size, prio))
+			
+		return reply
+	
+	def dmxNetInputHandler(self, addr, tags, data, client_address):
+		"""Handle OSC-messages to the '.../dmx/netinput' address
+		"""
+		if not len(data):
+			return None
+			
+		if data[0] in ('help', 'info'):	# handler-info request
+			reply = OSC.OSCBundle(self.srv.info_prefix)
+			reply.append(("server", str(self.srv)))
+			reply.append(("netinput_command", "start [artnet | sacn] : start receiving Art-Net and/or sACN"))
+			reply.append(("netinput_command", "stop : stop receiving Art-Net & sACN"))
+			reply.append(("netinput_command", "ls | list : list received universes (protocol, universe, packets, slots, merge-priority)"))
+			reply.append(("netinput_command", "listen <protocol> <universe> : start receiving a universe"))
+			reply.append(("netinput_command", "unlisten <protocol> <universe> : stop receiving a universe"))
+			reply.append(("netinput_command", "merge <protocol> <universe> [<prio>] : merge a received universe as source '<protocol>/<universe>'"))
+			reply.append(("netinput_command", "merge <protocol> <universe> off : stop merging a received universe"))
+			reply.append(("netinput_command", "capture <protocol> <universe> <scene> : store a received universe as scene"))
+			return reply
+			
+		cmd = data.pop(0)
+		if cmd == 'start':
+			(artnet, sacn) = (True, True)
+			if len(data):
+				(artnet, sacn) = (data[0] == 'artnet', data[0] == 'sacn')
+				
+			try:
+				self.startNetInput(artnet, sacn)
+			except socket.error, e:
+				self.srv.reportErr("Error starting network DMX-input: %s" % str(e), client_address)
+				
+			return None
+			
+		if cmd == 'stop':
+			self.stopNetInput()
+			return None
+			
+		if cmd in ('ls', 'list'):
+			return self._lsOSCNetInput()
+			
+		if cmd not in ('listen', 'unlisten', 'merge', 'capture'):
+			self.srv.reportErr("Unrecognized OSC /dmx/netinput command: '%s'" % str(cmd), client_address)
+			return None
+			
+		if (len(data) < 2) or (data[0] not in DMXNetInput.protocols) or (type(data[1]) != types.IntType):
+			self.srv.reportErr("Missing protocol & universe in OSC /dmx/netinput '%s ...' command" % cmd, client_address)
+			return None
+			
+		(protocol, universe) = data[:2]
+		data = data[2:]
+		try:
+			if cmd == 'listen':
+				self.listenNetInput(protocol, universe)
+			elif cmd == 'unlisten':
+				self.unlistenNetInput(protocol, universe)
+			elif cmd == 'merge':
+				prio = 0
+				if len(data):
+					prio = data.pop(0)
+					if prio == 'off':
+						prio = None
+					elif type(prio) != types.IntType:
+						self.srv.reportErr("Unrecognized priority in OSC /dmx/netinput 'merge ...' command: '%s'" % str(prio), client_address)
+						return None
+						
+				self.mergeNetInput(protocol, universe, prio)
+			else:	# cmd == 'capture'
+				if (not len(data)) or (type(data[0]) != types.IntType):
+					self.srv.reportErr("Missing scene-number in OSC /dmx/netinput 'capture ...' command", client_address)
+					return None
+					
+				self.captureNetScene(data[0], protocol, universe)
+				return None
+				
+		except (ValueError, IndexError), e:
+			self.srv.reportErr("Error in OSC /dmx/netinput '%s ...' command: %s" % (cmd, str(e)), client_address)
+			return None
+			
+		return self._lsOSCNetInput()
+
+###
+# Main 
+###
+# Creates and starts an OSCDMXCtrl instance
+###
+
+if __name__ == '__main__':
+	# Define default values
+	default_serport = "/dev/ttyUSB0"
+	default_port = 6788
+	default_listen = ":%d" % default_port
+	default_scenefile = "scenes.xml"
+	default_scenemap = None
+	default_workers = 4
+	default_queue_size = 256
+	default_overload = 'drop-oldest'
+	default_sacn_priority = 100
+	default_sync_universe = 63999
+
+	op = optparse.OptionParser()
+
+	# Define command-line options and arguments
+	op.add_option("-s", "--serport", action='store', type='string', dest='serport', metavar='DEV',
+									help="connect to DMX USB Pro box on DEV [default = %s]" % default_serport)
+	op.add_option("-l", "--listen", action='store', type='string', dest='listen', metavar='URL',
+									help="listen for OSC-messages on URL [default = %s]" % default_listen)
+	op.add_option("-f", "--scenefile", action='store', type='string', dest='scenefile', metavar='FILE',
+									help="load scene-memory from FILE [default = %s]" % default_scenefile)
+	op.add_option("-m", "--scenemap", action='store', type='string', dest='scenemap', metavar='FILE',
+									help="keep scene-memory in memory-mapped FILE [default = in RAM]")
+	op.add_option("-w", "--workers", action='store', type='int', dest='workers', metavar='N',
+									help="handle OSC-messages with N worker-threads, or in the receiving thread if N is 0 [default = %d]" % default_workers)
+	op.add_option("-q", "--queue", action='store', type='int', dest='queue_size', metavar='SIZE',
+									help="queue at most SIZE OSC-messages for the worker-threads [default = %d]" % default_queue_size)
+	op.add_option("--overload", action='store', type='choice', dest='overload', metavar='POLICY', choices=PooledOSCServer.overload_policies,
+									help="when the queue is full; 'drop-oldest', 'drop-newest' or 'block' [default = %s]" % default_overload)
+	op.add_option("-t", "--threading", action='store_true', dest='threading',
+									help="handle every OSC-message in a new thread, instead of using worker-threads")
+	op.add_option("-u", "--unclocked", action='store_true', dest='unclocked',
+									help="send every change to the DMX USB Pro box immediately, instead of once per DMX-frame")
+	op.add_option("-i", "--input", action='store_true', dest='input',
+									help="receive DMX-input, and push changes to '/dmx/input subscribe'-d OSC-clients")
+	op.add_option("-b", "--background", action='store_true', dest='background',
+									help="start listening for OSC-messages immediately, and probe the DMX USB Pro box & load the scene-file in the background")
+	op.add_option("--split", action='store_true', dest='split',
+									help="write to the DMX USB Pro box from a separate output-process, with its own output-clock. Can't be used with '-i'")
+	op.add_option("--no-box", action='store_true', dest='no_box',
+									help="don't use a DMX USB Pro box; send the output only to the network (see '--artnet' & '--sacn')")
+	op.add_option("--artnet", action='store', type='string', dest='artnet', metavar='URL',
+									help="also send the output as Art-Net, to URL = [<host>][:<port>][/<universe>] [default = broadcast, universe 0]")
+	op.add_option("--sacn", action='store', type='string', dest='sacn', metavar='URL',
+									help="also send the output as sACN (E1.31), to URL = [<host>][:<port>][/<universe>] [default = multicast, universe 1]")
+	op.add_option("--sacn-priority", action='store', type='int', dest='sacn_priority', metavar='PRIO',
+									help="send sACN with priority PRIO (0 - 200) [default = %d]" % default_sacn_priority)
+	op.add_option("--sync", action='store_true', dest='sync',
+									help="send a sync-packet after every frame to the network-outputs")
+	op.add_option("--sync-universe", action='store', type='int', dest='sync_universe', metavar='N',
+									help="send sACN sync-packets on universe N [default = %d]" % default_sync_universe)
+	op.add_option("--netinput", action='append', type='string', dest='netinput', metavar='PROTO/N',
+									help="receive universe N as Art-Net or sACN (PROTO = 'artnet' or 'sacn'), and merge it into the output (may be repeated)")
+	op.add_option("-p", "--patch", action='store', type='string', dest='patch', metavar='FILE',
+									help="load the fixture-patch from FILE (JSON)")
+	op.add_option("--record", action='store', type='string', dest='record', metavar='FILE',
+									help="record every frame sent to the DMX USB Pro box to the show-file FILE")
+	op.add_option("--record-input", action='store_true', dest='record_input',
+									help="with '--record', also record every frame received from the DMX USB Pro box")
+	op.add_option("--trace", action='store', type='string', dest='trace', metavar='FILE',
+									help="trace the latency of every OSC-message, and write the trace to FILE (Chrome trace JSON) when quitting")
+
+	# Set defaults
+	op.set_defaults(serport=default_serport)
+	op.set_defaults(listen=default_listen)
+	op.set_defaults(scenefile=default_scenefile)
+	op.set_defaults(scenemap=default_scenemap)
+	op.set_defaults(input=False)
+	op.set_defaults(workers=default_workers)
+	op.set_defaults(queue_size=default_queue_size)
+	op.set_defaults(overload=default_overload)
+	op.set_defaults(threading=False)
+	op.set_defaults(unclocked=False)
+	op.set_defaults(background=False)
+	op.set_defaults(split=False)
+	op.set_defaults(no_box=False)
+	op.set_defaults(sync=False)
+	op.set_defaults(sacn_priority=default_sacn_priority)
+	op.set_defaults(sync_universe=default_sync_universe)
+	op.set_defaults(netinput=[])
+	op.set_defaults(record_input=False)
+
+	# Parse command-line options
+	(opts, args) = op.parse_args()
+	
+	outputs = []
+	if opts.artnet != None:
+		try:
+			(host, port, universe) = parseOutputUrl(opts.artnet, '255.255.255.255', DMXArtNetOutput.port)
+			outputs.append(DMXArtNetOutput(host, port, universe, opts.sync))
+		except (ValueError, socket.error), e:
+			op.error("invalid Art-Net URL '%s': %s" % (opts.artnet, str(e)))
+			
+	if opts.sacn != None:
+		sync_universe = 0
+		if opts.sync:
+			sync_universe = opts.sync_universe
+			
+		try:
+			(host, port, universe) = parseOutputUrl(opts.sacn, None, DMXSACNOutput.port, 1)
+			outputs.append(DMXSACNOutput(host, port, universe, opts.sacn_priority, sync_universe))
+		except (ValueError, socket.error), e:
+			op.error("invalid sACN output '%s': %s" % (opts.sacn, str(e)))
+			
+	netinputs = []
+	for spec in opts.netinput:
+		try:
+			(protocol, universe) = spec.split('/', 1)
+			netinputs.append((protocol, int(universe)))
+		except ValueError:
+			op.error("invalid network-input '%s'; should be <protocol>/<universe>" % spec)
+			
+		if protocol not in DMXNetInput.protocols:
+			op.error("invalid network-input '%s'; the protocol should be 'artnet' or 'sacn'" % spec)
+			
+	if opts.threading:
+		opts.workers = None
+	elif opts.workers < 0:
+		op.error("the number of workers can't be negative")
+		
+	if opts.split and opts.input:
+		op.error("DMX-input is not available with the '--split' option")
+		
+	if opts.no_box:
+		if opts.input or opts.split:
+			op.error("the '--no-box' option can't be used with '-i' or '--split'")
+			
+		opts.serport = None
+
+	def showwarning(message, category, filename, lineno, file=None):
+		"""Alternate 'warnings' printing function.
+		Writes warnings to stderr (using the write() method)
+		"""
+		sys.stderr.write("Warning: %s\n" % message)
+	
+	warnings.showwarning = showwarning
 	
 	# Instatitiate (and connect to) OSC DMX USB Pro interface
+	# With the '-b' option, the box is probed (and the scenes are loaded) in the background,
+	# while the OSCServer is already running. Any error is re-raised by waitReady()
+	odc = None
 	try:
 		#dc = DMXCtrl(opts.serport, opts.scenefile)
-		odc = OSCDMXCtrl(opts.serport, opts.scenefile, opts.listen)
+		odc = OSCDMXCtrl(opts.serport, opts.scenefile, opts.listen, opts.scenemap, opts.workers, opts.queue_size, opts.overload, opts.background, opts.split)
+		sys.stdout.write("%s\n" % str(odc))
 		
+		for output in outputs:
+			sys.stdout.write("Adding %s\n" % str(output))
+			odc.addOutput(output)
+		
+		if opts.trace != None:
+			sys.stdout.write("Tracing latency to '%s'\n" % opts.trace)
+			odc.startTrace()
+			
+		if opts.background:
+			sys.stdout.write("Starting %s\n" % str(odc.srv))
+			odc.start(not opts.unclocked)
+			sys.stdout.write("Warming up...\n")
+			odc.waitReady()
+			
 	except DMXUSBError, e:
 		sys.stderr.write("DMXUSBError: USB DMX Pro not detected on '%s': %s\n" % (opts.serport, str(e)))
+		if opts.background:
+			odc.close()
 		sys.exit(1)
 	
 	except serial.SerialException, e:
 		sys.stderr.write("SerialException: %s\n" % str(e))
+		if opts.background:
+			odc.close()
 		sys.exit(2)
-
-	sys.stdout.write("%s\n" % str(odc))
-	sys.stdout.write("Detected %s\n" % str(odc.box))
-	sys.stdout.write("Starting %s\n" % str(odc.srv))
 	
-	# start OSCServer thread
-	odc.start()
+	except (DMXError, Exception), e:	# e.g. an error in the scene-file; DMXError is not an Exception
+		sys.stderr.write("Error starting up: %s: %s\n" % (e.__class__.__name__, str(e)))
+		if odc != None:		# the OSCServer may be running already (with the '-b' option)
+			odc.close()
+		sys.exit(6)
+
+	if odc.box != None:
+		sys.stdout.write("Detected %s\n" % str(odc.box))
+	else:
+		sys.stdout.write("No DMX USB Pro box; sending to the network only\n")
+	if odc.load_stats != None:
+		sys.stdout.write("%s\n" % odc.loadStatsStr())
+		
+	if not opts.background:
+		sys.stdout.write("Starting %s\n" % str(odc.srv))
+		
+		# start OSCServer thread
+		odc.start(not opts.unclocked)
 	
+	if opts.input:
+		sys.stdout.write("Receiving DMX-input\n")
+		odc.startRX()
+		
+	if len(netinputs):
+		protocols = [protocol for (protocol, universe) in netinputs]
+		try:
+			odc.startNetInput('artnet' in protocols, 'sacn' in protocols)
+			sys.stdout.write("%s\n" % str(odc.net_input))
+			for (protocol, universe) in netinputs:
+				odc.mergeNetInput(protocol, universe)
+		except (ValueError, socket.error), e:
+			sys.stderr.write("Error starting network DMX-input: %s\n" % str(e))
+			odc.close()
+			sys.exit(3)
+			
+	if opts.patch != None:
+		try:
+			odc.loadPatch(opts.patch)
+			sys.stdout.write("Patched %d fixtures from '%s'\n" % (len(odc.patch), opts.patch))
+		except (IOError, ValueError, KeyError, IndexError, TypeError), e:
+			sys.stderr.write("Error loading patch-file '%s': %s\n" % (opts.patch, str(e)))
+			odc.close()
+			sys.exit(4)
+			
+	if opts.record != None:
+		try:
+			odc.startRecording(opts.record, opts.record_input)
+			sys.stdout.write("Recording to '%s'\n" % opts.record)
+		except IOError, e:
+			sys.stderr.write("Error recording to '%s': %s\n" % (opts.record, str(e)))
+			odc.close()
+			sys.exit(5)
+			
+			
 	sys.stdout.write("Use Ctrl-C to quit\n")
 	
 	# main loop
@@ -800,6 +3261,15 @@ if __name__ == '__main__':
 	except KeyboardInterrupt:
 		sys.stdout.write("\nQuitting!\n")
 
+	recorder = odc.stopRecording()
 	odc.close()
 	
+	if recorder != None:
+		sys.stdout.write("Recorded %d frames (%d bytes) to '%s'\n" % (recorder.frames, recorder.bytes, recorder.filename))
+		if recorder.dropped:
+			sys.stdout.write("Dropped %d frames while the disk was busy\n" % recorder.dropped)
+		
+	if opts.trace != None:
+		sys.stdout.write("Wrote %d trace-events to '%s'\n" % (odc.dumpTrace(opts.trace), opts.trace))
 	
+
@@ -0,0 +1,414 @@
+#!/usr/bin/python
+
+###
+# DMX Cue-list sequencer
+###
+# A cue-list (see DMXCueList) is an ordered list of cues (see DMXCue), numbered like on a lighting-desk (1, 2, 2.5, 3, ...).
+# Each cue refers to a scene in the scene-memory (see DMXSceneStore), and has these times (in seconds):
+#	fade_in		the fade-time of the channels whose level goes up
+#	fade_out	the fade-time of the channels whose level goes down (default: the same as fade_in)
+#	delay		the time between GO and the start of the fade
+#	follow		if given, the next cue is started automatically this long after the GO of this cue
+#
+# The transition into every cue (from the cue before it) is compiled ahead of time into per-channel timeline-segments
+# (see DMXCueTransition): the numbers of the channels that change, and per channel its start- & end-level, start-time and
+# fade-rate, as numpy arrays. Playing a transition (see DMXCuePlayer) then costs a handful of array operations over the
+# changing channels per frame, regardless of the length of the cue-list.
+# Only a GO that doesn't continue from the end of the previous cue (a GOTO, a BACK, or a GO during a fade)
+# compiles its transition from the current levels, once, at the GO.
+# A compiled transition is re-compiled when a cue's times, or one of the two scenes involved, have changed
+# (the scene-memory keeps a change-counter per scene).
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import bisect, time, threading, types
+
+import numpy
+
+from dmx512 import *
+
+
+class DMXCue(object):
+	"""One cue of a DMXCueList
+	"""
+	def __init__(self, nr, scene, fade_in=0., fade_out=None, delay=0., follow=None):
+		"""Set-up a cue that fades to the given scene (see the module-description for the times)
+		"""
+		if type(scene) != types.IntType or (scene < 0):
+			raise ValueError("Invalid scene number '%s'" % str(scene))
+			
+		if fade_out == None:
+			fade_out = fade_in
+			
+		for t in (fade_in, fade_out, delay, follow):
+			if (t != None) and ((type(t) not in (types.IntType, types.FloatType)) or (t < 0)):
+				raise ValueError("Invalid cue-time '%s'" % str(t))
+				
+		self.nr = float(nr)
+		self.scene = scene
+		self.fade_in = float(fade_in)
+		self.fade_out = float(fade_out)
+		self.delay = float(delay)
+		self.follow = follow
+		
+		# the compiled transition from the previous cue, and what it was compiled from (see DMXCueList.transition(...))
+		self.transition = None
+		self.compiled = None
+	
+	def __repr__(self):
+		return "<DMXCue %g: scene %d, in %g, out %g, delay %g, follow %s>" % (self.nr, self.scene, self.fade_in,
+				self.fade_out, self.delay, str(self.follow))
+	
+	def times(self):
+		"""Return the cue's times, as a tuple (fade_in, fade_out, delay, follow)
+		"""
+		return (self.fade_in, self.fade_out, self.delay, self.follow)
+
+
+class DMXCueTransition(object):
+	"""The timeline-segments of a transition; per changing channel, a linear fade from 'start' to 'end' level,
+	beginning 'delay' seconds after GO, at 'rate' (1 / fade-time) per second. All are numpy arrays.
+	"""
+	def __init__(self, chans, start, end, delay, rate, duration):
+		self.chans = chans
+		self.start = start
+		self.delta = end - start
+		self.end = end
+		self.delay = delay
+		self.rate = rate
+		self.duration = duration
+	
+	def __len__(self):
+		"""Return the nr of changing channels
+		"""
+		return len(self.chans)
+	
+	def evaluate(self, t, levels):
+		"""Write the levels of the changing channels at 't' seconds after GO into 'levels' (a float array of all channels)
+		Returns True when the transition has finished
+		"""
+		if t >= self.duration:
+			levels[self.chans] = self.end
+			return True
+			
+		p = (t - self.delay) * self.rate
+		numpy.clip(p, 0., 1., p)
+		levels[self.chans] = self.start + (self.delta * p)
+		return False
+
+
+def compileTransition(levels, look, cue):
+	"""Compile the transition from the given levels (a float array of all channels) to the given look
+	(an array of all channels' levels), with the given cue's times. Returns a DMXCueTransition
+	"""
+	chans = numpy.flatnonzero(levels != look)
+	start = levels[chans]
+	end = look[chans].astype(numpy.float64)
+	
+	fade = numpy.where(end > start, cue.fade_in, cue.fade_out)
+	rate = numpy.empty(len(chans), dtype=numpy.float64)
+	rate.fill(1e9)		# no fade-time; jump at the end of the delay
+	nz = (fade > 0)
+	rate[nz] = 1. / fade[nz]
+	
+	delay = numpy.empty(len(chans), dtype=numpy.float64)
+	delay.fill(cue.delay)
+	
+	duration = cue.delay
+	if len(chans):
+		duration += fade.max()
+		
+	return DMXCueTransition(chans, start, end, delay, rate, duration)
+
+
+class DMXCueList(object):
+	"""An ordered list of cues (see DMXCue), referring to the scenes in the given DMXSceneStore
+	"""
+	def __init__(self, scenes):
+		self.scenes = scenes
+		self.lock = threading.RLock()
+		self.cues = []
+		self.numbers = []
+	
+	def __len__(self):
+		return len(self.cues)
+	
+	def __getitem__(self, index):
+		"""Return the cue at the given position in the list
+		"""
+		return self.cues[index]
+	
+	def index(self, nr):
+		"""Return the position in the list of the cue with the given number. Raises IndexError if there is no such cue
+		"""
+		i = bisect.bisect_left(self.numbers, float(nr))
+		if (i == len(self.numbers)) or (self.numbers[i] != float(nr)):
+			raise IndexError("No cue %g" % float(nr))
+			
+		return i
+	
+	def add(self, cue):
+		"""Add the given cue (replacing the cue with the same number, if any), and compile the transitions into it
+		and into the cue after it
+		"""
+		with self.lock:
+			i = bisect.bisect_left(self.numbers, cue.nr)
+			if (i < len(self.numbers)) and (self.numbers[i] == cue.nr):
+				self.cues[i] = cue
+			else:
+				self.cues.insert(i, cue)
+				self.numbers.insert(i, cue.nr)
+				
+			for j in (i, i + 1):
+				try:
+					self.transition(j)
+				except IndexError:	# an empty scene, or no next cue; compiled when the scene is stored
+					pass
+	
+	def remove(self, nr):
+		"""Remove the cue with the given number
+		"""
+		with self.lock:
+			i = self.index(nr)
+			del self.cues[i]
+			del self.numbers[i]
+	
+	def clear(self):
+		"""Remove all cues
+		"""
+		with self.lock:
+			self.cues = []
+			self.numbers = []
+	
+	def look(self, scene):
+		"""Return the levels of all channels in the given scene (a uint8 array), its size and its change-counter
+		Raises IndexError if the scene is empty
+		"""
+		look = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		with self.scenes.lock:
+			slots = self.scenes.getSlots(scene)
+			look[:len(slots)] = slots
+			return (look, len(slots), int(self.scenes.gen[scene]))
+	
+	def transition(self, index):
+		"""Return the (compiled) transition from the cue before the given position in the list into the cue at that position
+		(from all channels at 0 for the first cue), re-compiling it if the cues or their scenes have changed since.
+		Returns a tuple (transition, look, size, source, target), where 'source' and 'target' identify the scenes
+		the transition starts from and ends in.
+		"""
+		with self.lock:
+			cue = self.cues[index]
+			prev = None
+			if index > 0:
+				prev = self.cues[index - 1]
+				
+			(look, size, gen) = self.look(cue.scene)
+			if prev != None:
+				(levels, prev_size, prev_gen) = self.look(prev.scene)
+				source = (prev.scene, prev_gen)
+			else:
+				levels = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+				source = None
+				
+			key = (source, cue.scene, gen, cue.times())
+			if cue.compiled != key:
+				cue.transition = compileTransition(levels.astype(numpy.float64), look, cue)
+				cue.compiled = key
+				
+			return (cue.transition, look, size, source, (cue.scene, gen))
+
+
+class DMXCuePlayer(threading.Thread):
+	"""Background-thread that plays a DMXCueList into a merge-source (see DMXMergeSource)
+	While a transition is running, the levels are evaluated 'rate' times per second, written to the merge-source,
+	and 'send_func' is called (e.g. DMXCtrl.sendDMX)
+	"""
+	def __init__(self, cues, source, send_func, rate=40):
+		"""Set-up (but don't start) the player-thread
+		"""
+		threading.Thread.__init__(self, name="DMXCuePlayer")
+		self.setDaemon(True)
+		
+		self.cues = cues
+		self.source = source
+		self.send_func = send_func
+		self.period = 1. / rate
+		
+		self.cond = threading.Condition()
+		self.running = True
+		
+		# the current levels of all channels, the nr of channels in use,
+		# and the scene (& its change-counter) the levels end in when the running transition has finished
+		self.levels = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.float64)
+		self.out = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		self.size = 0
+		self.settled = None
+		
+		# the number of the current cue (None for none), and its running transition
+		self.current = None
+		self.active = None
+		self.go_time = 0.
+		self.follow_at = None
+		
+		self.frames = 0
+	
+	def position(self):
+		"""Return the position in the cue-list of the current cue (-1 for none).
+		If the current cue has been removed from the list, the position of the cue before it is returned
+		"""
+		if self.current == None:
+			return -1
+			
+		return bisect.bisect_right(self.cues.numbers, self.current) - 1
+	
+	def _go(self, index, now):
+		"""Start the transition into the cue at the given position in the list. (call with self.cond held)
+		"""
+		with self.cues.lock:
+			(transition, look, size, source, target) = self.cues.transition(index)
+			cue = self.cues[index]
+			
+		if (index != self.position() + 1) or (self.active != None) or (self.settled != source):
+			# not continuing from the end of the previous cue
+			transition = compileTransition(self.levels, look, cue)
+			
+		self.current = cue.nr
+		self.active = transition
+		self.settled = target
+		self.size = max(self.size, size)
+		self.go_time = now
+		self.follow_at = None
+		if cue.follow != None:
+			self.follow_at = now + cue.follow
+			
+		self.cond.notify()
+	
+	def go(self):
+		"""Start the next cue. Returns False if the current cue is the last one
+		"""
+		with self.cond:
+			index = self.position() + 1
+			if index >= len(self.cues):
+				return False
+				
+			self._go(index, time.time())
+			return True
+	
+	def back(self):
+		"""Go back to the previous cue (with that cue's times). Returns False if there is no previous cue
+		"""
+		with self.cond:
+			index = self.position()
+			if (index >= 0) and (self.cues.numbers[index] == self.current):
+				index -= 1
+				
+			if index < 0:
+				return False
+				
+			self._go(index, time.time())
+			return True
+	
+	def goto(self, nr):
+		"""Go to the cue with the given number (with that cue's times)
+		"""
+		with self.cond:
+			self._go(self.cues.index(nr), time.time())
+	
+	def release(self):
+		"""Stop playing, and release all channels
+		"""
+		with self.cond:
+			self.current = None
+			self.active = None
+			self.follow_at = None
+			self.settled = None
+			self.levels[:] = 0
+			self.out[:] = 0
+			self.size = 0
+			self.source.release()
+			
+		self.send_func()
+	
+	def _follow(self):
+		"""Start the next cue if the current cue's follow-time has passed. (call with self.cond held)
+		Returns the time (in seconds) until the follow is due, or None if no follow is pending
+		"""
+		if self.follow_at == None:
+			return None
+			
+		now = time.time()
+		wait = self.follow_at - now
+		if wait > 0:
+			return wait
+			
+		now = self.follow_at
+		index = self.position() + 1
+		self.follow_at = None
+		if index < len(self.cues):
+			try:
+				self._go(index, now)
+			except IndexError:	# the next cue's scene is empty
+				pass
+				
+		return None
+	
+	def _step(self, now):
+		"""Evaluate the running transition, and write the levels to the merge-source. (call with self.cond held)
+		"""
+		transition = self.active
+		if transition.evaluate(now - self.go_time, self.levels):
+			# the levels are now exactly the cue's look, so the next GO can use the compiled transition
+			self.active = None
+			
+		self.out[transition.chans] = (self.levels[transition.chans] + 0.5).astype(numpy.uint8)
+		self.source.setFrame(self.out[:self.size])
+		self.frames += 1
+	
+	def run(self):
+		next = time.time()
+		while True:
+			with self.cond:
+				while self.running:
+					wait = self._follow()
+					if self.active != None:
+						break
+						
+					self.cond.wait(wait)
+					
+				if not self.running:
+					return
+					
+				self._step(time.time())
+				active = (self.active != None)
+				
+			self.send_func()
+			
+			if not active:
+				continue
+				
+			next += self.period
+			now = time.time()
+			if now < next:
+				time.sleep(next - now)
+			else:
+				next = now
+	
+	def stop(self):
+		"""Stop the player-thread
+		"""
+		with self.cond:
+			self.running = False
+			self.cond.notify()
+			
+		if self.isAlive():
+			self.join()
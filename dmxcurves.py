@@ -0,0 +1,177 @@
+#!/usr/bin/python
+
+###
+# DMX Output-curves
+###
+# Per-channel output-processing: dimmer-curves, min/max limits, inversion & parking.
+#
+# Every channel has a curve:
+#	'linear'	the output follows the level (the default)
+#	'square'	the output follows the square of the level; finer control at the low end (for incandescent dimmers)
+#	'sqrt'		the output follows the square-root of the level; coarser control at the low end
+#	's'		an S-curve (smoothstep); slow at both ends
+#	'switch'	the output is 'low' below 50%, and 'high' from 50% up (for non-dim relays)
+# The curve is scaled to the channel's 'low' & 'high' limits (default 0 & 255), and can be inverted.
+# A parked channel outputs a fixed value, whatever its level.
+#
+# All settings are compiled into one 512 x 256 lookup-table; a row per channel, with the output-value for every
+# level. Applying the curves to a frame (see DMXCurves.apply(...)) is then one numpy 'take' from the table,
+# whatever the settings. While all channels are linear, unlimited and not parked, apply(...) returns the frame as it is.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import threading
+
+import numpy
+
+from dmx512 import *
+
+
+class DMXCurves(object):
+	"""Per-channel output-curves, limits & parking, compiled into a 512 x 256 lookup-table
+	"""
+	curves = ('linear', 'square', 'sqrt', 's', 'switch')
+	levels = numpy.arange(256) / 255.
+	
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.lut = numpy.zeros((DMXPacket.packetMaxSlots, 256), dtype=numpy.uint8)
+		# the offset of each channel's row in the flattened table
+		self.base = numpy.arange(DMXPacket.packetMaxSlots) * 256
+		self.settings = {}		# channel -> (curve, low, high, invert)
+		self.parked = {}		# channel -> value
+		self.reset()
+	
+	def _channels(self, channels):
+		"""Check a list of channel-numbers
+		"""
+		chans = [int(ch) for ch in channels]
+		for ch in chans:
+			if (ch < 1) or (ch > DMXPacket.packetMaxSlots):
+				raise IndexError("Channel %d out of range (1, %d)" % (ch, DMXPacket.packetMaxSlots))
+				
+		return chans
+	
+	def _row(self, curve, low, high, invert):
+		"""Return a lookup-table row for the given settings
+		"""
+		x = self.levels
+		if curve == 'square':
+			y = x * x
+		elif curve == 'sqrt':
+			y = numpy.sqrt(x)
+		elif curve == 's':
+			y = x * x * (3. - (2. * x))
+		elif curve == 'switch':
+			y = (x >= 0.5).astype(numpy.float64)
+		else:
+			y = x
+			
+		if invert:
+			y = 1. - y
+			
+		return (low + ((high - low) * y) + 0.5).astype(numpy.uint8)
+	
+	def _update(self):
+		"""Update the flattened table, and note whether the table changes anything (call with self.lock held)
+		"""
+		self.flat = self.lut.ravel()
+		self.identity = not (len(self.settings) or len(self.parked))
+		# frames are padded up to the last channel that doesn't output 0 for level 0
+		nonzero = numpy.flatnonzero(self.lut[:, 0])
+		self.min_len = 0
+		if len(nonzero):
+			self.min_len = nonzero[-1] + 1
+	
+	def setCurve(self, channels, curve='linear', low=0, high=255, invert=False):
+		"""Set the curve, limits & inversion of the given channels (a list of channel-numbers)
+		"""
+		if curve not in self.curves:
+			raise ValueError("Unknown curve '%s'" % str(curve))
+			
+		if (low < 0) or (high > 255) or (low > high):
+			raise ValueError("Invalid limits (%s, %s)" % (str(low), str(high)))
+			
+		chans = self._channels(channels)
+		settings = (curve, int(low), int(high), bool(invert))
+		row = self._row(*settings)
+		with self.lock:
+			for ch in chans:
+				if settings == ('linear', 0, 255, False):
+					self.settings.pop(ch, None)
+				else:
+					self.settings[ch] = settings
+					
+				if ch not in self.parked:
+					self.lut[ch - 1] = row
+					
+			self._update()
+	
+	def park(self, channels, value):
+		"""Park the given channels (a list of channel-numbers) at 'value'
+		"""
+		if (value < 0) or (value > 255):
+			raise ValueError("Invalid park-value: '%s'" % str(value))
+			
+		chans = self._channels(channels)
+		with self.lock:
+			for ch in chans:
+				self.parked[ch] = int(value)
+				self.lut[ch - 1] = value
+				
+			self._update()
+	
+	def unpark(self, channels):
+		"""Un-park the given channels (a list of channel-numbers)
+		"""
+		chans = self._channels(channels)
+		with self.lock:
+			for ch in chans:
+				if self.parked.pop(ch, None) != None:
+					self.lut[ch - 1] = self._row(*self.settings.get(ch, ('linear', 0, 255, False)))
+					
+			self._update()
+	
+	def reset(self, channels=None):
+		"""Reset the given channels (a list of channel-numbers; None for all channels) to linear, unlimited & not parked
+		"""
+		if channels == None:
+			channels = range(1, DMXPacket.packetMaxSlots + 1)
+			
+		chans = self._channels(channels)
+		row = self._row('linear', 0, 255, False)
+		with self.lock:
+			for ch in chans:
+				self.settings.pop(ch, None)
+				self.parked.pop(ch, None)
+				self.lut[ch - 1] = row
+				
+			self._update()
+	
+	def get(self, ch):
+		"""Return a channel's settings, as a tuple (curve, low, high, invert, park-value); park-value is None if not parked
+		"""
+		ch = self._channels([ch])[0]
+		with self.lock:
+			return self.settings.get(ch, ('linear', 0, 255, False)) + (self.parked.get(ch),)
+	
+	def apply(self, values):
+		"""Return the given slot-values (a uint8 array, of up to 512 slots) passed through the lookup-table, as a new array.
+		The frame is extended as far as needed for the channels that don't output 0 for level 0 (e.g. parked channels).
+		"""
+		n = len(values)
+		if n < self.min_len:
+			values = numpy.concatenate((values, numpy.zeros(self.min_len - n, dtype=numpy.uint8)))
+			n = self.min_len
+			
+		return self.flat.take(self.base[:n] + values)
@@ -0,0 +1,235 @@
+#!/usr/bin/python
+
+###
+# DMX Effects-engine
+###
+# Runs parameterized effect-generators over groups of channels:
+#	'sine'		a sine-wave
+#	'saw'		a rising ramp, jumping back to 'low' at the end of every cycle
+#	'ramp'		a falling ramp, jumping back to 'high' at the start of every cycle
+#	'triangle'	a rising & falling ramp
+#	'square'	'high' for the first 'duty' part of every cycle, 'low' for the rest
+#	'strobe'	a square-wave with a short flash (default duty 0.05)
+#	'flicker'	random levels, changing 'rate' times per second
+#	'chase'		a step-chase; each channel in turn is 'high' for one step (a square-wave with duty 1 / <nr of channels>,
+#			spread over the channels in order)
+# Every effect has a 'rate' (in cycles per second; for a chase, one cycle passes all channels), a 'low' and 'high' level,
+# a 'phase' (in cycles) and a 'spread'; the phase is shifted by 'spread' cycles over the channels of the group,
+# so a spread of 1 (or -1) spreads one whole cycle evenly over the group.
+#
+# The effects are compiled into one set of per-slot arrays (channel, rate, phase, low, span, ...), with every slot of
+# every effect concatenated, and the slots sorted by waveform. A frame (see DMXEffectEngine.render(...)) is then a
+# fixed handful of in-place numpy operations per waveform in use (each on a slice of the arrays),
+# however many effects and channels there are.
+# Where effects overlap, the highest level wins (HTP).
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import math, threading, time
+
+import numpy
+
+from dmx512 import *
+
+
+class DMXEffect(object):
+	"""One effect-generator, running over a group of channels (see the module-description)
+	"""
+	shapes = ('sine', 'saw', 'ramp', 'triangle', 'square', 'strobe', 'flicker', 'chase')
+	
+	def __init__(self, channels, shape='sine', rate=1., low=0, high=255, spread=0., phase=0., duty=None):
+		"""Set-up an effect over the given channels (a list of channel-numbers, in effect-order)
+		"""
+		if shape not in self.shapes:
+			raise ValueError("Unknown effect-shape '%s'" % str(shape))
+			
+		chans = numpy.asarray(channels, dtype=int)
+		if (not len(chans)) or (chans.min() < 1) or (chans.max() > DMXPacket.packetMaxSlots):
+			raise IndexError("Effect-channels must be in range (1, %d)" % DMXPacket.packetMaxSlots)
+			
+		for val in (low, high):
+			if (val < 0) or (val > 255):
+				raise ValueError("Invalid effect level: '%s'" % str(val))
+				
+		if rate < 0:
+			raise ValueError("Invalid effect rate: '%s'" % str(rate))
+			
+		if duty == None:
+			duty = {'strobe':0.05, 'chase':1. / len(chans)}.get(shape, 0.5)
+			
+		if shape == 'chase' and not spread:
+			spread = -1.
+			
+		self.channels = chans
+		self.shape = shape
+		self.rate = float(rate)
+		self.low = float(low)
+		self.high = float(high)
+		self.phase = float(phase)
+		self.spread = float(spread)
+		self.duty = float(duty)
+		self.start = 0.
+	
+	def __len__(self):
+		return len(self.channels)
+	
+	def __repr__(self):
+		return "<DMXEffect %s over %d channels, %g Hz, %g - %g>" % (self.shape, len(self), self.rate, self.low, self.high)
+	
+	def phases(self):
+		"""Return the phase of every channel (in cycles, at the effect's start)
+		"""
+		return self.phase + (self.spread * numpy.arange(len(self)) / len(self))
+
+
+class DMXEffectEngine(object):
+	"""A set of named effects (see DMXEffect), rendered together
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.effects = {}
+		self.epoch = time.time()
+		
+		self.out = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		self.mask = numpy.zeros(DMXPacket.packetMaxSlots, dtype=bool)
+		self._compile()
+	
+	def __len__(self):
+		return len(self.effects)
+	
+	def __contains__(self, name):
+		return name in self.effects
+	
+	def __getitem__(self, name):
+		return self.effects[name]
+	
+	def add(self, name, effect, now=None):
+		"""Add (or replace) the named effect; it starts at 'now' (default: the current time)
+		"""
+		if now == None:
+			now = time.time()
+			
+		with self.lock:
+			effect.start = now - self.epoch
+			self.effects[name] = effect
+			self._compile()
+	
+	def remove(self, name):
+		"""Remove the named effect
+		"""
+		with self.lock:
+			del self.effects[name]
+			self._compile()
+	
+	def clear(self):
+		"""Remove all effects
+		"""
+		with self.lock:
+			self.effects = {}
+			self._compile()
+	
+	def _compile(self):
+		"""Concatenate the per-slot parameters of all effects, sorted by waveform. (call with self.lock held)
+		"""
+		effects = self.effects.values()
+		effects.sort(key=lambda eff: DMXEffect.shapes.index(eff.shape))
+		cat = lambda parts: numpy.concatenate([numpy.zeros(0)] + parts)
+		per_slot = lambda attr: cat([numpy.zeros(len(eff)) + getattr(eff, attr) for eff in effects])
+		
+		self.chans = cat([eff.channels - 1 for eff in effects]).astype(int)
+		self.rate = per_slot('rate')
+		# the phase at the engine's epoch, so that x = t * rate + offset
+		self.offset = cat([eff.phases() - (eff.start * eff.rate) for eff in effects])
+		self.low = per_slot('low') + 0.5	# rounded when stored as uint8
+		self.span = per_slot('high') + 0.5 - self.low
+		self.duty = per_slot('duty')
+		self.x = numpy.zeros(len(self.chans))
+		self.w = numpy.zeros(len(self.chans))
+		
+		# the (start, end) slice of the slots of each waveform in use
+		self.groups = []
+		start = 0
+		for eff in effects:
+			if len(self.groups) and (self.groups[-1][0] == eff.shape):
+				self.groups[-1][2] += len(eff)
+			else:
+				self.groups.append([eff.shape, start, start + len(eff)])
+				
+			start += len(eff)
+			
+		# flicker: the random levels, and the cycle they were drawn for
+		self.random = numpy.random.random(len(self.chans))
+		self.cycle = numpy.zeros(len(self.chans)) - 1
+		
+		# where effects overlap, the slots are sorted by channel, and the levels per channel combined HTP
+		# (with numpy.maximum.reduceat); otherwise they are simply stored
+		self.uchans = numpy.unique(self.chans)
+		self.overlap = len(self.uchans) != len(self.chans)
+		if self.overlap:
+			self.order = numpy.argsort(self.chans, kind='mergesort')
+			self.starts = numpy.flatnonzero(numpy.diff(numpy.concatenate(([-1], self.chans[self.order]))))
+			
+		self.mask[:] = False
+		self.mask[self.chans] = True
+	
+	def render(self, now=None):
+		"""Compute all effects' levels at time 'now' (default: the current time)
+		Returns a tuple (values, mask); 'values' holds the levels of all channels (a uint8 array), and 'mask' (a boolean array)
+		marks the channels that are part of an effect. Both arrays are re-used by the next render()
+		"""
+		if now == None:
+			now = time.time()
+			
+		with self.lock:
+			if not len(self.chans):
+				return (self.out, self.mask)
+				
+			(x, w) = (self.x, self.w)
+			numpy.multiply(self.rate, now - self.epoch, x)
+			x += self.offset
+			numpy.floor(x, w)
+			numpy.subtract(x, w, w)		# the position in the cycle (0 - 1)
+			for (shape, start, end) in self.groups:
+				p = w[start:end]
+				if shape == 'sine':
+					p *= -2 * math.pi
+					numpy.cos(p, p)
+					p *= -0.5
+					p += 0.5
+				elif shape == 'ramp':
+					numpy.subtract(1., p, p)
+				elif shape == 'triangle':
+					p *= 2.
+					p -= 1.
+					numpy.abs(p, p)
+					numpy.subtract(1., p, p)
+				elif shape in ('square', 'strobe', 'chase'):
+					numpy.less(p, self.duty[start:end], p)
+				elif shape == 'flicker':
+					cycle = numpy.floor(x[start:end])
+					new = cycle != self.cycle[start:end]
+					if new.any():
+						self.random[start:end][new] = numpy.random.random(new.sum())
+						self.cycle[start:end] = cycle
+						
+					p[:] = self.random[start:end]
+				# 'saw' is the position in the cycle itself
+				
+			w *= self.span
+			w += self.low
+			if self.overlap:
+				self.out[self.uchans] = numpy.maximum.reduceat(w[self.order], self.starts)
+			else:
+				self.out[self.chans] = w
+				
+			return (self.out, self.mask)
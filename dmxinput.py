@@ -0,0 +1,254 @@
+#!/usr/bin/python
+
+###
+# DMX Input-pipeline
+###
+# A background-thread that keeps receiving DMX from the 'DMX USB Pro' box (see DMXInputReader),
+# and a background-thread that pushes the changed channels to subscribers (see DMXInputPusher)
+#
+# The reader compares each received DMXPacket with the previous one, and passes on a mask of
+# the changed channels. The pusher accumulates these masks per subscriber, and sends only the
+# changed channel-ranges, no more often than each subscriber's rate-limit allows.
+# So monitoring a busy universe costs bandwidth in proportion to the actual changes.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import time, threading, warnings
+
+import numpy
+
+from dmx512 import *
+from dmxusbpro import DMXUSBError
+
+
+def changedRanges(mask, gap=4):
+	"""Return the ranges of set values in the given (boolean) mask, as a list of (start, end) tuples
+	('end' is inclusive). Ranges separated by fewer than 'gap' unset values are joined,
+	because sending a few unchanged values is cheaper than starting a new range.
+	"""
+	idx = numpy.flatnonzero(mask)
+	if not len(idx):
+		return []
+		
+	breaks = numpy.flatnonzero(numpy.diff(idx) > gap)
+	starts = idx[numpy.r_[0, breaks + 1]]
+	ends = idx[numpy.r_[breaks, len(idx) - 1]]
+	
+	return zip(starts.tolist(), ends.tolist())
+
+
+class DMXInputReader(threading.Thread):
+	"""Background-thread that keeps receiving DMX-input through the given DMXCtrl (see DMXCtrl.receiveDMX())
+	After every received DMXPacket that differs from the previous one, 'callback' is called as
+	callback(values, mask), where 'values' is a numpy uint8 array of all 512 slot-values,
+	and 'mask' is a boolean array marking the changed slots.
+	Errors (a malformed packet, a serial-port error, an error in the callback) are counted and reported
+	(with warnings.warn()), and the thread keeps receiving.
+	"""
+	# after a serial-port error, wait this long (in seconds) before receiving again
+	retry_delay = 0.5
+	
+	def __init__(self, ctrl, callback=None):
+		"""Set-up (but don't start) the input-thread
+		"""
+		threading.Thread.__init__(self, name="DMXInputReader")
+		self.setDaemon(True)
+		
+		self.ctrl = ctrl
+		self.callback = callback
+		self.running = True
+		self.errors = 0
+		self.last_error = None
+		self.packets = 0
+		self.values = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+	
+	def run(self):
+		values = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		
+		while self.running:
+			try:
+				self.ctrl.receiveDMX()
+			except DMXUSBError:
+				# time-out, or a reception-error signalled by the box
+				self.errors += 1
+				continue
+			except DMXError, e:
+				# a malformed packet
+				self._error(e)
+				continue
+			except Exception, e:
+				# a serial-port error
+				self._error(e)
+				time.sleep(self.retry_delay)
+				continue
+				
+			self.packets += 1
+			
+			in_str = str(self.ctrl.dmx_in)[1:]
+			values[:] = 0
+			values[:len(in_str)] = numpy.fromstring(in_str, dtype=numpy.uint8)
+			
+			mask = (values != self.values)
+			if not mask.any():
+				continue
+				
+			self.values = values.copy()
+			if self.callback != None:
+				try:
+					self.callback(self.values, mask)
+				except Exception, e:
+					self._error(e)
+	
+	def _error(self, e):
+		"""Count & report an error
+		"""
+		self.errors += 1
+		self.last_error = e
+		warnings.warn("DMX-input error: %s: %s" % (e.__class__.__name__, str(e)))
+	
+	def stop(self):
+		"""Stop the input-thread. This may take up to the serial-port's timeout.
+		"""
+		self.running = False
+		if self.isAlive():
+			self.join()
+
+
+class DMXInputSubscriber(object):
+	"""One subscriber of a DMXInputPusher
+	"""
+	def __init__(self, key, rate=0):
+		"""Set-up a subscriber, with a rate-limit of 'rate' updates per second (0 means unlimited)
+		"""
+		self.key = key
+		self.setRate(rate)
+		self.last = 0
+		self.dirty = numpy.zeros(DMXPacket.packetMaxSlots, dtype=bool)
+		self.sent = 0
+	
+	def setRate(self, rate):
+		"""Change the rate-limit
+		"""
+		self.rate = rate
+		if rate > 0:
+			self.interval = 1. / rate
+		else:
+			self.interval = 0.
+	
+	def due(self):
+		"""Return the time at which the next update may be sent
+		"""
+		return self.last + self.interval
+
+
+class DMXInputPusher(threading.Thread):
+	"""Background-thread that pushes changed channels to subscribers.
+	Every subscriber is identified by a 'key' (e.g. a network-address), and the changes are sent by calling
+	send_func(key, ranges), where 'ranges' is a list of (start_ch, values) tuples; 'start_ch' is the
+	(1-based) channel-number of the first channel in the range, and 'values' is a string of slot-values.
+	"""
+	def __init__(self, send_func, gap=4):
+		"""Set-up (but don't start) the pusher-thread
+		'gap' is passed on to changedRanges(...)
+		"""
+		threading.Thread.__init__(self, name="DMXInputPusher")
+		self.setDaemon(True)
+		
+		self.send_func = send_func
+		self.gap = gap
+		self.cond = threading.Condition()
+		self.subscribers = {}
+		self.values = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		self.size = 0
+		self.running = True
+		self.errors = 0
+	
+	def subscribe(self, key, rate=0):
+		"""Add (or update) a subscriber, with a rate-limit of 'rate' updates per second (0 means unlimited)
+		A new subscriber is sent all channels first.
+		"""
+		with self.cond:
+			if key in self.subscribers:
+				self.subscribers[key].setRate(rate)
+				return
+				
+			sub = DMXInputSubscriber(key, rate)
+			sub.dirty[:self.size] = True
+			self.subscribers[key] = sub
+			self.cond.notify()
+	
+	def unsubscribe(self, key):
+		"""Remove a subscriber. Returns False if there was no such subscriber
+		"""
+		with self.cond:
+			return (self.subscribers.pop(key, None) != None)
+	
+	def update(self, values, mask):
+		"""Pass on a change of the DMX-input (see DMXInputReader)
+		"""
+		with self.cond:
+			self.values = values
+			on = numpy.flatnonzero(values)
+			if len(on):
+				self.size = max(self.size, int(on[-1]) + 1)
+				
+			for sub in self.subscribers.values():
+				sub.dirty |= mask
+				
+			self.cond.notify()
+	
+	def run(self):
+		while True:
+			out = []
+			with self.cond:
+				if not self.running:
+					return
+					
+				now = time.time()
+				wait = None
+				for sub in self.subscribers.values():
+					if not sub.dirty.any():
+						continue
+						
+					due = sub.due()
+					if due > now:
+						if (wait == None) or ((due - now) < wait):
+							wait = due - now
+						continue
+						
+					ranges = [(start + 1, self.values[start:end + 1].tostring()) for (start, end) in changedRanges(sub.dirty, self.gap)]
+					sub.dirty[:] = False
+					sub.last = now
+					sub.sent += 1
+					out.append((sub.key, ranges))
+					
+				if not len(out):
+					self.cond.wait(wait)
+					continue
+					
+			for (key, ranges) in out:
+				try:
+					self.send_func(key, ranges)
+				except Exception:
+					# a failing subscriber must not stop the pusher
+					self.errors += 1
+	
+	def stop(self):
+		"""Stop the pusher-thread
+		"""
+		with self.cond:
+			self.running = False
+			self.cond.notify()
+			
+		if self.isAlive():
+			self.join()
@@ -0,0 +1,143 @@
+#!/usr/bin/python
+
+###
+# DMX Masters
+###
+# A grand master and any number of named submasters, scaling the output's intensity-channels.
+#
+# The grand master scales the intensity-channels (by default all channels; see DMXMasters.setIntensity(...)),
+# and each submaster scales its own set of channels. All levels are compiled into one fixed-point
+# multiplier-array (level * 256) when a master moves, so applying the masters to a frame
+# (see DMXMasters.apply(...)) is one multiply & shift over the whole frame, however many masters there are.
+# While all masters are at full, apply(...) returns the frame as it is.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import threading
+
+import numpy
+
+from dmx512 import *
+
+
+class DMXMasters(object):
+	"""The grand master & submasters, compiled into one multiplier-array
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.grand = 1.
+		self.intensity = numpy.ones(DMXPacket.packetMaxSlots, dtype=bool)
+		self.subs = {}		# name -> [channel-mask, level]
+		self._compile()
+	
+	def __len__(self):
+		return len(self.subs)
+	
+	def __contains__(self, name):
+		return name in self.subs
+	
+	def _mask(self, channels):
+		"""Return a channel-mask (a boolean array) for the given list of channel-numbers
+		"""
+		chans = numpy.asarray(channels, dtype=int)
+		if len(chans) and ((chans.min() < 1) or (chans.max() > DMXPacket.packetMaxSlots)):
+			raise IndexError("Master-channels must be in range (1, %d)" % DMXPacket.packetMaxSlots)
+			
+		mask = numpy.zeros(DMXPacket.packetMaxSlots, dtype=bool)
+		mask[chans - 1] = True
+		return mask
+	
+	def _level(self, level):
+		"""Check a master-level (0.0 - 1.0)
+		"""
+		if (level < 0) or (level > 1):
+			raise ValueError("Invalid master-level: '%s'" % str(level))
+			
+		return float(level)
+	
+	def _compile(self):
+		"""Compute the multiplier-array (call with self.lock held)
+		"""
+		factor = numpy.ones(DMXPacket.packetMaxSlots)
+		factor[self.intensity] = self.grand
+		for (mask, level) in self.subs.values():
+			factor[mask] *= level
+			
+		self.factor = (factor * 256 + 0.5).astype(numpy.uint16)
+		self.identity = bool((self.factor == 256).all())
+	
+	def setIntensity(self, channels=None):
+		"""Set the channels the grand master scales (a list of channel-numbers; None for all channels)
+		"""
+		with self.lock:
+			if channels == None:
+				self.intensity[:] = True
+			else:
+				self.intensity = self._mask(channels)
+				
+			self._compile()
+	
+	def setGrand(self, level):
+		"""Set the grand master's level (0.0 - 1.0)
+		"""
+		with self.lock:
+			self.grand = self._level(level)
+			self._compile()
+	
+	def addSub(self, name, channels, level=1.):
+		"""Add (or replace) a submaster, scaling the given channels (a list of channel-numbers)
+		"""
+		with self.lock:
+			self.subs[name] = [self._mask(channels), self._level(level)]
+			self._compile()
+	
+	def setSub(self, name, level):
+		"""Set a submaster's level (0.0 - 1.0)
+		"""
+		with self.lock:
+			if name not in self.subs:
+				raise KeyError("Unknown submaster '%s'" % str(name))
+				
+			self.subs[name][1] = self._level(level)
+			self._compile()
+	
+	def getSub(self, name):
+		"""Return a submaster's level
+		"""
+		with self.lock:
+			if name not in self.subs:
+				raise KeyError("Unknown submaster '%s'" % str(name))
+				
+			return self.subs[name][1]
+	
+	def removeSub(self, name):
+		"""Remove a submaster
+		"""
+		with self.lock:
+			if name not in self.subs:
+				raise KeyError("Unknown submaster '%s'" % str(name))
+				
+			del self.subs[name]
+			self._compile()
+	
+	def apply(self, values):
+		"""Return the given slot-values (a uint8 array, of up to 512 slots) scaled by the masters, as a new array,
+		or the given array itself if all masters are at full
+		"""
+		if self.identity:
+			return values
+			
+		scaled = values * self.factor[:len(values)]
+		scaled += 128
+		scaled >>= 8
+		return scaled.astype(numpy.uint8)
@@ -0,0 +1,296 @@
+#!/usr/bin/python
+
+###
+# DMX Merge-engine
+###
+# Combines the channel-levels of several named control-sources (OSC consoles, scene-playback,
+# DMX-input, ...) into one output-universe.
+#
+# Each source holds its own 512-channel layer, with a priority. Per channel, only the sources
+# with the highest priority that are active on that channel take part in the merge.
+# Between those, a channel is merged either HTP (highest-takes-precedence; the highest level wins)
+# or LTP (latest-takes-precedence; the source that changed the channel last wins)
+#
+# All layers are kept in one stacked (sources x 512) array, so that the merge is a handful of
+# vectorized numpy operations per frame, regardless of the number of sources.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import types, threading
+
+import numpy
+
+from dmx512 import *
+
+
+class DMXMergeSource(object):
+	"""One named control-source of a DMXMerger.
+	Channel-numbers are 1-based, like DMXPacket slot-numbers.
+	A source is only 'active' on the channels it has set; inactive channels don't take part in the merge.
+	"""
+	def __init__(self, merger, name, index, priority=0):
+		"""Don't instantiate DMXMergeSources directly, use DMXMerger.addSource(...)
+		"""
+		self.merger = merger
+		self.name = name
+		self.index = index
+		self.priority = priority
+	
+	def __repr__(self):
+		return "<DMXMergeSource '%s' priority %d>" % (self.name, self.priority)
+	
+	def __len__(self):
+		"""Return the number of channels up to and including the highest active channel
+		"""
+		active = numpy.flatnonzero(self.merger.active[self.index])
+		if not len(active):
+			return 0
+			
+		return int(active[-1]) + 1
+	
+	def setPriority(self, priority):
+		"""Change this source's priority. Higher priorities override lower ones.
+		"""
+		with self.merger.lock:
+			self.priority = priority
+			self.merger.priority[self.index] = priority
+			self.merger.changed = True
+	
+	def setChannel(self, ch, val):
+		"""Set the given channel to the given value
+		"""
+		if (type(ch) != types.IntType) or (ch < 1) or (ch > DMXPacket.packetMaxSlots):
+			raise IndexError("Channel-number must be in range (1, %d)" % DMXPacket.packetMaxSlots)
+			
+		if (type(val) != types.IntType) or (val < 0) or (val > 255):
+			raise ValueError("Invalid channel value: '%s'" % str(val))
+			
+		m = self.merger
+		with m.lock:
+			m.levels[self.index, ch - 1] = val
+			m.active[self.index, ch - 1] = True
+			m.stamps[self.index, ch - 1] = m._stamp()
+			m.changed = True
+	
+	def getChannel(self, ch):
+		"""Return the given channel's value in this source's layer, or None if this source isn't active on the channel
+		"""
+		if not self.merger.active[self.index, ch - 1]:
+			return None
+			
+		return int(self.merger.levels[self.index, ch - 1])
+	
+	def setChannels(self, start, values):
+		"""Set a range of channels, starting at channel 'start', to the given values
+		'values' can be a string of slot-values, a list of ints or a numpy-array.
+		Only the channels whose value actually changes (or that were inactive) are time-stamped,
+		so a source that re-sends the same frame doesn't 'take' LTP-channels from other sources.
+		"""
+		if type(values) in types.StringTypes:
+			values = numpy.fromstring(str(values), dtype=numpy.uint8)
+		else:
+			values = numpy.asarray(values)
+			
+		end = start + len(values) - 1
+		if (start < 1) or (end > DMXPacket.packetMaxSlots):
+			raise IndexError("Channel-range (%d, %d) exceeds range (1, %d)" % (start, end, DMXPacket.packetMaxSlots))
+			
+		m = self.merger
+		with m.lock:
+			level = m.levels[self.index, start - 1:end]
+			active = m.active[self.index, start - 1:end]
+			chg = (level != values) | ~active
+			if chg.any():
+				level[:] = values
+				active[:] = True
+				m.stamps[self.index, start - 1:end][chg] = m._stamp()
+				m.changed = True
+	
+	def setFrame(self, values):
+		"""Replace this source's whole layer with the given slot-values (see setChannels(...)).
+		The source becomes inactive on all channels beyond the given values.
+		"""
+		m = self.merger
+		with m.lock:
+			if len(values):
+				self.setChannels(1, values)
+				
+			if m.active[self.index, len(values):].any():
+				m.active[self.index, len(values):] = False
+				m.changed = True
+	
+	def setLayer(self, values, mask):
+		"""Replace this source's whole layer; the source becomes active on exactly the channels marked in 'mask'
+		(a boolean array of 512), with the levels from 'values' (an array of 512). Like setChannels(...), only the channels
+		whose value actually changes (or that were inactive) are time-stamped.
+		"""
+		m = self.merger
+		with m.lock:
+			level = m.levels[self.index]
+			active = m.active[self.index]
+			chg = mask & ((level != values) | ~active)
+			if chg.any() or (active != mask).any():
+				level[chg] = values[chg]
+				active[:] = mask
+				m.stamps[self.index][chg] = m._stamp()
+				m.changed = True
+	
+	def release(self, start=1, end=DMXPacket.packetMaxSlots):
+		"""Make this source inactive on the given range of channels (default: all channels)
+		"""
+		m = self.merger
+		with m.lock:
+			m.active[self.index, start - 1:end] = False
+			m.changed = True
+
+
+class DMXMerger(object):
+	"""Merge-engine for multiple named control-sources (see DMXMergeSource)
+	"""
+	def __init__(self, capacity=4):
+		"""Set-up a merger with room for 'capacity' sources (it grows when needed)
+		All channels are LTP by default (see setHTP(...))
+		"""
+		self.lock = threading.RLock()
+		self.sources = {}
+		
+		slots = DMXPacket.packetMaxSlots
+		self.levels = numpy.zeros((capacity, slots), dtype=numpy.uint8)
+		self.active = numpy.zeros((capacity, slots), dtype=bool)
+		self.stamps = numpy.zeros((capacity, slots), dtype=numpy.int64)
+		self.priority = numpy.zeros(capacity, dtype=numpy.int32)
+		self.used = numpy.zeros(capacity, dtype=bool)
+		
+		# per-channel merge-mode; True for HTP, False for LTP
+		self.htp = numpy.zeros(slots, dtype=bool)
+		
+		self.clock = 0
+		self.changed = True
+		self.output = numpy.zeros(0, dtype=numpy.uint8)
+		self.index = numpy.arange(slots)
+	
+	def __len__(self):
+		"""Return the number of sources
+		"""
+		return len(self.sources)
+	
+	def __contains__(self, name):
+		return name in self.sources
+	
+	def __getitem__(self, name):
+		"""Return the named DMXMergeSource
+		"""
+		return self.sources[name]
+	
+	def _stamp(self):
+		"""Return a new time-stamp for LTP-merging. (call with the lock held)
+		"""
+		self.clock += 1
+		return self.clock
+	
+	def _grow(self):
+		"""Double the number of source-layers
+		"""
+		capacity = len(self.used) * 2
+		for attr in ('levels', 'active', 'stamps', 'priority', 'used'):
+			old = getattr(self, attr)
+			new = numpy.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+			new[:len(old)] = old
+			setattr(self, attr, new)
+	
+	def addSource(self, name, priority=0):
+		"""Add a new named source with the given priority, and return it (a DMXMergeSource)
+		If a source by that name exists already, that source is returned (with its priority changed)
+		"""
+		with self.lock:
+			if name in self.sources:
+				src = self.sources[name]
+				src.setPriority(priority)
+				return src
+				
+			free = numpy.flatnonzero(~self.used)
+			if not len(free):
+				self._grow()
+				free = numpy.flatnonzero(~self.used)
+				
+			idx = int(free[0])
+			self.used[idx] = True
+			self.active[idx] = False
+			self.priority[idx] = priority
+			
+			src = DMXMergeSource(self, name, idx, priority)
+			self.sources[name] = src
+			self.changed = True
+			return src
+	
+	def removeSource(self, name):
+		"""Remove the named source from the merge
+		"""
+		with self.lock:
+			src = self.sources.pop(name)
+			self.used[src.index] = False
+			self.active[src.index] = False
+			self.changed = True
+	
+	def setHTP(self, start=1, end=DMXPacket.packetMaxSlots, htp=True):
+		"""Set the merge-mode of the given range of channels to HTP (or to LTP, if 'htp' is False)
+		"""
+		if (start < 1) or (end < start) or (end > DMXPacket.packetMaxSlots):
+			raise IndexError("Channel-range (%d, %d) exceeds range (1, %d)" % (start, end, DMXPacket.packetMaxSlots))
+			
+		with self.lock:
+			self.htp[start - 1:end] = htp
+			self.changed = True
+	
+	def setLTP(self, start=1, end=DMXPacket.packetMaxSlots):
+		"""Set the merge-mode of the given range of channels to LTP
+		"""
+		self.setHTP(start, end, False)
+	
+	def render(self):
+		"""Merge all sources' layers, and return the resulting slot-values as a numpy uint8 array.
+		The array is as long as the highest channel that any source is active on.
+		The previous result is returned if nothing changed since the last render()
+		"""
+		with self.lock:
+			if not self.changed:
+				return self.output
+				
+			active = self.active
+			
+			# per channel, the highest priority of any source active on that channel
+			prio = numpy.where(active, self.priority[:, numpy.newaxis], numpy.iinfo(numpy.int32).min)
+			top = prio.max(axis=0)
+			cand = active & (prio == top)
+			
+			# HTP: highest level of the top-priority sources
+			htp_val = numpy.where(cand, self.levels, 0).max(axis=0)
+			
+			# LTP: level of the top-priority source that changed the channel last
+			latest = numpy.where(cand, self.stamps, -1).argmax(axis=0)
+			ltp_val = self.levels[latest, self.index]
+			
+			out = numpy.where(self.htp, htp_val, ltp_val)
+			
+			any_active = active.any(axis=0)
+			on = numpy.flatnonzero(any_active)
+			size = 0
+			if len(on):
+				size = int(on[-1]) + 1
+				
+			out[~any_active] = 0
+			self.output = out[:size].astype(numpy.uint8)
+			self.changed = False
+			
+			return self.output
+
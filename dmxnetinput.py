@@ -0,0 +1,378 @@
+#!/usr/bin/python
+
+###
+# Network DMX-input
+###
+# Receives DMX-universes over the network, as Art-Net 'ArtDmx' packets and/or as sACN (ANSI E1.31) data packets.
+#
+# One background-thread (see DMXNetInput) serves all universes of both protocols; it waits on the (non-blocking)
+# sockets with select(), and reads every waiting datagram with recvfrom_into() straight into one preallocated
+# receive-buffer. The headers are checked in place, and the slot-values are compared with, and copied into,
+# the universe's own preallocated buffer (see DMXNetUniverse); so no strings are built per packet.
+# Only the universes that are listened to (see DMXNetInput.listen(...)) are decoded; other packets are counted & ignored.
+#
+# After every received packet that changes a universe, the universe's callback is called as callback(values, mask),
+# like the DMXInputReader's callback (see dmxinput.py)
+#
+# sACN sources are selected per universe by priority; a lower-priority source is ignored until the current source
+# has been silent for 'source_timeout' seconds or has sent 'stream terminated'. Out-of-order packets
+# (as told by the sequence-nr) are dropped, for both protocols.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import errno, select, socket, struct, threading, time, types
+
+import numpy
+
+from dmx512 import *
+from dmxoutput import DMXArtNetOutput, DMXSACNOutput
+
+
+class DMXNetUniverse(object):
+	"""One universe received by a DMXNetInput
+	'values' holds the last received slot-values (without the start-code), 'size' the nr of slots received.
+	"""
+	def __init__(self, protocol, universe, callback=None):
+		"""Don't instantiate DMXNetUniverses directly, use DMXNetInput.listen(...)
+		"""
+		self.protocol = protocol
+		self.universe = universe
+		self.callback = callback
+		
+		self.values = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		self.mask = numpy.zeros(DMXPacket.packetMaxSlots, dtype=bool)
+		self.size = 0
+		
+		# the current source; its address, sACN component-identifier & priority, and its last sequence-nr
+		# (None until the first packet from the source)
+		self.source = None
+		self.cid = None
+		self.priority = -1
+		self.seq = None
+		self.last = 0.
+		
+		self.packets = 0
+		self.dropped = 0
+		self.joined = False
+	
+	def __repr__(self):
+		return "<DMXNetUniverse %s/%d, %d slots>" % (self.protocol, self.universe, self.size)
+	
+	def _update(self, data):
+		"""Store the given slot-values (a numpy uint8 array; a view on the receive-buffer), and call the callback
+		if anything changed. (called by the DMXNetInput-thread, with the DMXNetInput's lock held)
+		"""
+		size = len(data)
+		mask = self.mask
+		mask[:size] = (self.values[:size] != data)
+		mask[size:self.size] = True
+		mask[max(size, self.size):] = False
+		
+		self.packets += 1
+		if (size == self.size) and not mask[:size].any():
+			return
+			
+		self.values[:size] = data
+		self.values[size:] = 0
+		self.size = size
+		if self.callback != None:
+			self.callback(self.values[:size], mask)
+	
+	def getValues(self):
+		"""Return a copy of the last received slot-values, as a numpy uint8 array
+		"""
+		return self.values[:self.size].copy()
+
+
+class DMXNetInput(threading.Thread):
+	"""Background-thread that receives Art-Net and/or sACN universes
+	"""
+	protocols = ('artnet', 'sacn')
+	
+	# receive-buffer size; larger than the largest packet of either protocol
+	rx_size = 1144
+	
+	# sACN 'network data loss' time-out
+	source_timeout = 2.5
+	
+	# header-layouts, unpacked in place from the receive-buffer (with struct.unpack_from(...))
+	# ArtDmx: id, op-code, (protocol-version), sequence-nr, (physical), port-address & length
+	artnet_head = struct.Struct('<8sH2xBxH')
+	artnet_length = struct.Struct('>H')
+	# E1.31 data packet: (preamble & postamble), ACN id, root-vector, CID, framing-vector, (source-name), priority,
+	# (sync-universe), sequence-nr, options, universe, DMP-vector, (address-type, first-address & increment),
+	# property-count & start-code
+	sacn_head = struct.Struct('>4x12s2xI16s2xI64xB2xBBH2xB5xHB')
+	
+	opt_preview = 0x80
+	
+	def __init__(self, artnet=True, sacn=True, host='', artnet_port=None, sacn_port=None, timeout=0.1):
+		"""Set-up (but don't start) the input-thread, receiving Art-Net and/or sACN on the given local address
+		(default: all interfaces, port 6454 for Art-Net, 5568 for sACN)
+		'timeout' is the time (in seconds) after which the thread checks whether it should stop.
+		"""
+		threading.Thread.__init__(self, name="DMXNetInput")
+		self.setDaemon(True)
+		
+		if artnet_port == None:
+			artnet_port = DMXArtNetOutput.port
+			
+		if sacn_port == None:
+			sacn_port = DMXSACNOutput.port
+			
+		self.host = host
+		self.timeout = timeout
+		self.running = True
+		
+		self.artnet_sock = None
+		self.sacn_sock = None
+		if artnet:
+			self.artnet_sock = self._socket(artnet_port)
+		if sacn:
+			self.sacn_sock = self._socket(sacn_port)
+			
+		# the universes listened to, by (protocol, universe)
+		self.lock = threading.Lock()
+		self.universes = {}
+		
+		self.rx = numpy.zeros(self.rx_size, dtype=numpy.uint8)
+		self.artnet_id = DMXArtNetOutput.header
+		self.sacn_id = DMXSACNOutput.acn_id
+		
+		self.packets = 0
+		self.ignored = 0
+		self.errors = 0
+	
+	def __str__(self):
+		out = []
+		if self.artnet_sock != None:
+			out.append("Art-Net on %s:%d" % self.artnet_sock.getsockname())
+		if self.sacn_sock != None:
+			out.append("sACN on %s:%d" % self.sacn_sock.getsockname())
+			
+		return "Network DMX-input (%s)" % ", ".join(out)
+	
+	def _socket(self, port):
+		"""Return a non-blocking UDP-socket bound to the given port
+		"""
+		sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		sock.bind((self.host, port))
+		sock.setblocking(0)
+		return sock
+	
+	def _membership(self, universe):
+		"""Return the IP_ADD_MEMBERSHIP / IP_DROP_MEMBERSHIP argument for the given sACN universe's multicast-group
+		"""
+		group = "239.255.%d.%d" % (universe >> 8, universe & 0xFF)
+		return socket.inet_aton(group) + socket.inet_aton(self.host or '0.0.0.0')
+	
+	def listen(self, protocol, universe, callback=None):
+		"""Start receiving the given universe of the given protocol ('artnet' or 'sacn'), and return its DMXNetUniverse
+		For sACN, the universe's multicast-group is joined. If the universe is received already, its callback is replaced.
+		'callback' is called as callback(values, mask) when the universe changes; 'values' is a view on the universe's
+		buffer, which is only valid during the call.
+		"""
+		if protocol not in self.protocols:
+			raise ValueError("Unknown protocol '%s'" % str(protocol))
+			
+		sock = getattr(self, protocol + '_sock')
+		if sock == None:
+			raise ValueError("Not receiving %s" % protocol)
+			
+		if protocol == 'artnet':
+			if (type(universe) != types.IntType) or (universe < 0) or (universe > 0x7FFF):
+				raise ValueError("Art-Net universe must be in range (0, 32767)")
+		elif (type(universe) != types.IntType) or (universe < 1) or (universe > 63999):
+			raise ValueError("sACN universe must be in range (1, 63999)")
+			
+		with self.lock:
+			univ = self.universes.get((protocol, universe))
+			if univ != None:
+				univ.callback = callback
+				return univ
+				
+			univ = DMXNetUniverse(protocol, universe, callback)
+			if protocol == 'sacn':
+				try:
+					sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, self._membership(universe))
+					univ.joined = True
+				except socket.error:
+					# no multicast route; the universe can still be received by unicast
+					self.errors += 1
+					
+			self.universes[(protocol, universe)] = univ
+			return univ
+	
+	def unlisten(self, protocol, universe):
+		"""Stop receiving the given universe. Returns False if it wasn't received
+		"""
+		with self.lock:
+			univ = self.universes.pop((protocol, universe), None)
+			if univ == None:
+				return False
+				
+			if univ.joined:
+				try:
+					self.sacn_sock.setsockopt(socket.IPPROTO_IP, socket.IP_DROP_MEMBERSHIP, self._membership(universe))
+				except socket.error:
+					self.errors += 1
+					
+			return True
+	
+	def __getitem__(self, key):
+		"""Return the DMXNetUniverse for the given (protocol, universe)
+		"""
+		return self.universes[key]
+	
+	def _inSequence(self, univ, seq):
+		"""Return False if the given sequence-nr is older than the universe's last one (see E1.31, 6.7.2)
+		The first packet from a source is always accepted.
+		"""
+		if univ.seq == None:
+			univ.seq = seq
+			return True
+			
+		diff = (seq - univ.seq) & 0xFF
+		if (diff != 0) and (diff < 0xEC):	# not within the last 20 packets
+			univ.seq = seq
+			return True
+			
+		univ.dropped += 1
+		return False
+	
+	def decodeArtNet(self, size, address):
+		"""Decode the ArtDmx packet of 'size' bytes in the receive-buffer (self.rx), received from 'address'
+		"""
+		head = DMXArtNetOutput.dmx_header
+		if size < head:
+			self.ignored += 1
+			return
+			
+		(art_id, opcode, seq, universe) = self.artnet_head.unpack_from(self.rx)
+		if (art_id != self.artnet_id) or (opcode != DMXArtNetOutput.op_dmx):
+			self.ignored += 1
+			return
+			
+		with self.lock:
+			univ = self.universes.get(('artnet', universe & 0x7FFF))
+			if univ == None:
+				self.ignored += 1
+				return
+				
+			if address != univ.source:
+				univ.seq = None
+				
+			# Art-Net sequence-nr 0 means 'no sequencing'
+			if (seq != 0) and not self._inSequence(univ, seq):
+				return
+				
+			(length,) = self.artnet_length.unpack_from(self.rx, 16)
+			length = min(length, size - head, DMXPacket.packetMaxSlots)
+			univ.source = address
+			univ.last = time.time()
+			univ._update(self.rx[head:head + length])
+	
+	def decodeSACN(self, size, address):
+		"""Decode the E1.31 data packet of 'size' bytes in the receive-buffer (self.rx), received from 'address'
+		"""
+		head = DMXSACNOutput.dmx_header
+		if size <= head:
+			self.ignored += 1
+			return
+			
+		(acn_id, root_vector, cid, frame_vector, priority, seq, options, universe, dmp_vector, count, startcode) = \
+				self.sacn_head.unpack_from(self.rx)
+		if (acn_id != self.sacn_id) or (root_vector != DMXSACNOutput.vector_root_data) \
+				or (frame_vector != DMXSACNOutput.vector_frame_data) or (dmp_vector != 0x02):
+			self.ignored += 1
+			return
+			
+		with self.lock:
+			univ = self.universes.get(('sacn', universe))
+			if univ == None:
+				self.ignored += 1
+				return
+				
+			if (options & self.opt_preview) or (startcode != 0):	# preview-data, or not a NULL start-code
+				univ.dropped += 1
+				return
+				
+			now = time.time()
+			if options & DMXSACNOutput.opt_terminated:
+				if cid == univ.cid:
+					univ.cid = None
+					univ.priority = -1
+				return
+				
+			if cid != univ.cid:
+				if (univ.cid != None) and (priority <= univ.priority) and ((now - univ.last) < self.source_timeout):
+					univ.dropped += 1
+					return
+					
+				univ.cid = cid
+				univ.seq = None
+				
+			if not self._inSequence(univ, seq):
+				return
+				
+			length = max(0, min(count - 1, size - head - 1, DMXPacket.packetMaxSlots))
+			univ.priority = priority
+			univ.source = address
+			univ.last = now
+			univ._update(self.rx[head + 1:head + 1 + length])
+	
+	def _receive(self, sock, decode):
+		"""Read & decode all datagrams waiting on the given socket
+		"""
+		while True:
+			try:
+				(size, address) = sock.recvfrom_into(self.rx)
+			except socket.error, e:
+				if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+					self.errors += 1
+				return
+				
+			self.packets += 1
+			decode(size, address)
+	
+	def run(self):
+		decoders = {}
+		if self.artnet_sock != None:
+			decoders[self.artnet_sock] = self.decodeArtNet
+		if self.sacn_sock != None:
+			decoders[self.sacn_sock] = self.decodeSACN
+			
+		while self.running:
+			try:
+				(ready, w, x) = select.select(decoders.keys(), [], [], self.timeout)
+			except select.error:
+				continue
+				
+			for sock in ready:
+				try:
+					self._receive(sock, decoders[sock])
+				except Exception:
+					# a failing callback must not stop the input
+					self.errors += 1
+	
+	def stop(self):
+		"""Stop the input-thread, and close the sockets. This may take up to 'timeout' seconds.
+		"""
+		self.running = False
+		if self.isAlive():
+			self.join()
+			
+		for sock in (self.artnet_sock, self.sacn_sock):
+			if sock != None:
+				sock.close()
@@ -0,0 +1,389 @@
+#!/usr/bin/python
+
+###
+# DMX Output-backends
+###
+# Besides the 'DMX USB Pro' box, a DMXCtrl can send its output through any number of output-backends
+# (see DMXCtrl.addOutput(...)). An output-backend is any object with these methods:
+#	sendDMX(dmx_packet)	send one DMXPacket (one frame of the DMXCtrl's universe)
+#	sync()			called after all backends have been sent a frame
+#	close()			stop sending
+# DMXOutput is the base-class for output-backends.
+#
+# DMXArtNetOutput sends universes as Art-Net 'ArtDmx' packets over UDP, optionally followed by an 'ArtSync' packet
+# per frame, so that receivers output all universes at the same time.
+# DMXSACNOutput sends universes as streaming ACN (ANSI E1.31) data packets, with a priority, optionally followed by
+# an E1.31 synchronization packet per frame, on a separate sync-universe.
+# Each universe has one preallocated datagram; per frame, only the sequence-nr and the slot-values are patched in,
+# and the datagram is sent straight from its buffer.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import socket, struct, threading, types, uuid
+
+import numpy
+
+from dmx512 import *
+
+
+class DMXOutput(object):
+	"""Base-class for DMXCtrl output-backends
+	"""
+	def sendDMX(self, dmx_packet):
+		"""Send one DMXPacket
+		"""
+		raise NotImplementedError("%s.sendDMX()" % self.__class__.__name__)
+	
+	def sync(self):
+		"""Called after all output-backends have been sent a frame
+		"""
+		pass
+	
+	def close(self):
+		"""Stop sending, and release any resources
+		"""
+		pass
+
+
+def parseOutputUrl(url, default_host, default_port, default_universe=0):
+	"""Parse an output-url of the form '[<host>][:<port>][/<universe>]'
+	Returns a (host, port, universe) tuple, with the given defaults for the omitted parts.
+	"""
+	universe = default_universe
+	if '/' in url:
+		(url, universe) = url.split('/', 1)
+		universe = int(universe)
+		
+	port = default_port
+	if ':' in url:
+		(url, port) = url.split(':', 1)
+		port = int(port)
+		
+	host = url or default_host
+	return (host, port, universe)
+
+
+class DMXArtNetOutput(DMXOutput):
+	"""Output-backend that sends universes as Art-Net 'ArtDmx' packets (Art-Net 4, protocol version 14)
+	The DMXCtrl's universe (see sendDMX(...)) is sent as Art-Net universe (i.e. 15-bit port-address) 'universe';
+	other universes can be sent with sendUniverse(...)
+	"""
+	port = 6454
+	
+	header = 'Art-Net\x00'
+	op_dmx = 0x5000
+	op_sync = 0x5200
+	protocol = 14
+	
+	# ArtDmx header-size; the slot-values follow the header
+	dmx_header = 18
+	
+	def __init__(self, host='255.255.255.255', port=None, universe=0, sync=False):
+		"""Set-up the Art-Net output, sending to the given host & UDP-port (default: broadcast to port 6454)
+		If 'sync' is True, an 'ArtSync' packet is sent after every frame (see sync())
+		"""
+		if port == None:
+			port = self.port
+			
+		self.address = (host, port)
+		self.universe = universe
+		self.use_sync = sync
+		
+		self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+		
+		# per universe, a preallocated ArtDmx datagram, and the length of its last frame
+		self.lock = threading.Lock()
+		self.datagrams = {}
+		self.lengths = {}
+		self.seq = {}
+		
+		self.sync_datagram = self.header + struct.pack('<H', self.op_sync) + struct.pack('>H', self.protocol) + '\x00\x00'
+		
+		self.packets = 0
+		self.errors = 0
+		
+		self._datagram(universe)
+	
+	def __str__(self):
+		return "Art-Net output to %s:%d, universe %d" % (self.address[0], self.address[1], self.universe)
+	
+	def _datagram(self, universe):
+		"""Return the preallocated datagram for the given universe (a numpy uint8 array), allocating it on first use
+		"""
+		if universe in self.datagrams:
+			return self.datagrams[universe]
+			
+		if (type(universe) != types.IntType) or (universe < 0) or (universe > 0x7FFF):
+			raise ValueError("Art-Net universe must be in range (0, 32767)")
+			
+		head = self.header + struct.pack('<H', self.op_dmx) + struct.pack('>H', self.protocol)
+		head += struct.pack('BBBB', 0, 0, universe & 0xFF, universe >> 8) + struct.pack('>H', DMXPacket.packetMaxSlots)
+		
+		dg = numpy.zeros(self.dmx_header + DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		dg[:self.dmx_header] = numpy.fromstring(head, dtype=numpy.uint8)
+		self.datagrams[universe] = dg
+		self.lengths[universe] = DMXPacket.packetMaxSlots
+		self.seq[universe] = 0
+		return dg
+	
+	def sendUniverse(self, universe, values):
+		"""Send the given slot-values (a string, or a numpy uint8 array; without the start-code) as the given universe
+		"""
+		if type(values) in types.StringTypes:
+			values = numpy.fromstring(values, dtype=numpy.uint8)
+			
+		size = len(values)
+		if size > DMXPacket.packetMaxSlots:
+			raise IndexError("A universe can only have %d slots" % DMXPacket.packetMaxSlots)
+			
+		# the length must be even, and at least 2
+		length = max(2, size + (size & 1))
+		
+		with self.lock:
+			dg = self._datagram(universe)
+			
+			# sequence-nrs run from 1 to 255; 0 means 'no sequencing'
+			seq = (self.seq[universe] % 255) + 1
+			self.seq[universe] = seq
+			dg[12] = seq
+			
+			if length != self.lengths[universe]:
+				dg[16] = length >> 8
+				dg[17] = length & 0xFF
+				self.lengths[universe] = length
+				
+			dg[self.dmx_header:self.dmx_header + size] = values
+			dg[self.dmx_header + size:self.dmx_header + length] = 0
+			
+			try:
+				self.sock.sendto(dg[:self.dmx_header + length], self.address)
+				self.packets += 1
+			except socket.error:
+				self.errors += 1
+	
+	def sendDMX(self, dmx_packet):
+		"""Send the given DMXPacket as this output's universe
+		Art-Net only carries NULL start-code packets; packets with another start-code are not sent.
+		"""
+		out = str(dmx_packet)
+		if out[0] != '\x00':
+			return
+			
+		self.sendUniverse(self.universe, out[1:])
+	
+	def sync(self):
+		"""Send an 'ArtSync' packet (if enabled); receivers output the universes received since the previous ArtSync
+		"""
+		if not self.use_sync:
+			return
+			
+		try:
+			self.sock.sendto(self.sync_datagram, self.address)
+		except socket.error:
+			self.errors += 1
+	
+	def close(self):
+		self.sock.close()
+
+
+class DMXSACNOutput(DMXOutput):
+	"""Output-backend that sends universes as streaming ACN (ANSI E1.31-2016) data packets
+	The DMXCtrl's universe (see sendDMX(...)) is sent as sACN universe 'universe' (1 - 63999);
+	other universes can be sent with sendUniverse(...)
+	Packets are multicast to each universe's multicast-group (239.255.<universe-hi>.<universe-lo>),
+	unless a (unicast) host is given.
+	"""
+	port = 5568
+	
+	acn_id = 'ASC-E1.17\x00\x00\x00'
+	vector_root_data = 0x04
+	vector_root_extended = 0x08
+	vector_frame_data = 0x02
+	vector_frame_sync = 0x01
+	
+	# data-packet size (always 512 slots); the start-code & slot-values follow the header
+	dmx_header = 125
+	# the 'options' & 'sequence-nr' offsets in the data- & sync-packets
+	seq_offset = 111
+	options_offset = 112
+	sync_seq_offset = 44
+	
+	opt_terminated = 0x40
+	
+	def __init__(self, host=None, port=None, universe=1, priority=100, sync_universe=0, source_name="OSCDMXCtrl", cid=None):
+		"""Set-up the sACN output, sending to the given host & UDP-port (default: multicast to port 5568)
+		'priority' (0 - 200) is the priority of this source; receivers use the highest-priority source of a universe.
+		If 'sync_universe' is given (1 - 63999), data-packets tell receivers to wait for a synchronization packet
+		on that universe, and a synchronization packet is sent after every frame (see sync())
+		'cid' is the 16-byte component-identifier of this source (default: a new random UUID)
+		"""
+		if port == None:
+			port = self.port
+			
+		if (priority < 0) or (priority > 200):
+			raise ValueError("sACN priority must be in range (0, 200)")
+			
+		if sync_universe and ((sync_universe < 1) or (sync_universe > 63999)):
+			raise ValueError("sACN sync-universe must be in range (1, 63999)")
+			
+		if cid == None:
+			cid = uuid.uuid4().bytes
+			
+		self.host = host
+		self.port = port
+		self.universe = universe
+		self.priority = priority
+		self.sync_universe = sync_universe
+		self.source_name = source_name
+		self.cid = cid
+		
+		self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 8)
+		
+		# per universe, a preallocated data-packet, its destination-address and its sequence-nr
+		self.lock = threading.Lock()
+		self.datagrams = {}
+		self.addresses = {}
+		self.seq = {}
+		
+		self.sync_datagram = None
+		self.sync_seq = 0
+		if sync_universe:
+			self.sync_datagram = numpy.fromstring(self._syncHeader(), dtype=numpy.uint8)
+			
+		self.packets = 0
+		self.errors = 0
+		
+		self._datagram(universe)
+	
+	def __str__(self):
+		out = "sACN output to %s:%d, universe %d, priority %d" % (self.host or "multicast", self.port, self.universe, self.priority)
+		if self.sync_universe:
+			out += ", sync-universe %d" % self.sync_universe
+			
+		return out
+	
+	def _address(self, universe):
+		"""Return the destination-address for the given universe
+		"""
+		if self.host != None:
+			return (self.host, self.port)
+			
+		return ("239.255.%d.%d" % (universe >> 8, universe & 0xFF), self.port)
+	
+	def _rootLayer(self, vector, size):
+		"""Return the root-layer of a packet of the given total size
+		"""
+		return struct.pack('>HH', 0x0010, 0x0000) + self.acn_id + struct.pack('>HI', 0x7000 | (size - 16), vector) + self.cid
+	
+	def _dataHeader(self, universe):
+		"""Return the root-, framing- & DMP-layer headers of a (512-slot) data-packet for the given universe
+		"""
+		size = self.dmx_header + 1 + DMXPacket.packetMaxSlots
+		name = self.source_name[:63] + '\x00' * (64 - len(self.source_name[:63]))
+		
+		head = self._rootLayer(self.vector_root_data, size)
+		head += struct.pack('>HI', 0x7000 | (size - 38), self.vector_frame_data) + name
+		head += struct.pack('>BHBBH', self.priority, self.sync_universe, 0, 0, universe)
+		head += struct.pack('>HBBHHH', 0x7000 | (size - 115), 0x02, 0xA1, 0x0000, 0x0001, 1 + DMXPacket.packetMaxSlots)
+		return head
+	
+	def _syncHeader(self):
+		"""Return a synchronization packet for the sync-universe
+		"""
+		size = 49
+		head = self._rootLayer(self.vector_root_extended, size)
+		head += struct.pack('>HIBHH', 0x7000 | (size - 38), self.vector_frame_sync, 0, self.sync_universe, 0)
+		return head
+	
+	def _datagram(self, universe):
+		"""Return the preallocated data-packet for the given universe (a numpy uint8 array), allocating it on first use
+		"""
+		if universe in self.datagrams:
+			return self.datagrams[universe]
+			
+		if (type(universe) != types.IntType) or (universe < 1) or (universe > 63999):
+			raise ValueError("sACN universe must be in range (1, 63999)")
+			
+		dg = numpy.zeros(self.dmx_header + 1 + DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		dg[:self.dmx_header] = numpy.fromstring(self._dataHeader(universe), dtype=numpy.uint8)
+		self.datagrams[universe] = dg
+		self.addresses[universe] = self._address(universe)
+		self.seq[universe] = 0
+		return dg
+	
+	def sendUniverse(self, universe, values, startcode=0):
+		"""Send the given slot-values (a string, or a numpy uint8 array; without the start-code) as the given universe
+		Always 512 slots are sent; the slots beyond the given values are 0.
+		"""
+		if type(values) in types.StringTypes:
+			values = numpy.fromstring(values, dtype=numpy.uint8)
+			
+		size = len(values)
+		if size > DMXPacket.packetMaxSlots:
+			raise IndexError("A universe can only have %d slots" % DMXPacket.packetMaxSlots)
+			
+		with self.lock:
+			dg = self._datagram(universe)
+			
+			seq = (self.seq[universe] + 1) & 0xFF
+			self.seq[universe] = seq
+			dg[self.seq_offset] = seq
+			
+			dg[self.dmx_header] = startcode
+			dg[self.dmx_header + 1:self.dmx_header + 1 + size] = values
+			dg[self.dmx_header + 1 + size:] = 0
+			
+			try:
+				self.sock.sendto(dg, self.addresses[universe])
+				self.packets += 1
+			except socket.error:
+				self.errors += 1
+	
+	def sendDMX(self, dmx_packet):
+		"""Send the given DMXPacket as this output's universe
+		"""
+		out = str(dmx_packet)
+		self.sendUniverse(self.universe, out[1:], ord(out[0]))
+	
+	def sync(self):
+		"""Send a synchronization packet on the sync-universe (if any); receivers output the universes that refer to
+		this sync-universe at the same moment
+		"""
+		if not self.sync_universe:
+			return
+			
+		with self.lock:
+			self.sync_seq = (self.sync_seq + 1) & 0xFF
+			self.sync_datagram[self.sync_seq_offset] = self.sync_seq
+			try:
+				self.sock.sendto(self.sync_datagram, self._address(self.sync_universe))
+			except socket.error:
+				self.errors += 1
+	
+	def close(self):
+		"""Tell the receivers that this source stops (three 'stream terminated' packets per universe), and stop sending
+		"""
+		with self.lock:
+			for (universe, dg) in self.datagrams.items():
+				dg[self.options_offset] |= self.opt_terminated
+				for i in range(3):
+					self.seq[universe] = (self.seq[universe] + 1) & 0xFF
+					dg[self.seq_offset] = self.seq[universe]
+					try:
+						self.sock.sendto(dg, self.addresses[universe])
+					except socket.error:
+						pass
+						
+		self.sock.close()
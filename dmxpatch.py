@@ -0,0 +1,314 @@
+#!/usr/bin/python
+
+###
+# DMX Fixture-patch
+###
+# Addresses the output by fixture & attribute, instead of by channel.
+#
+# A fixture-type (see DMXFixtureType) lists a fixture's attributes in channel-order; an attribute is either
+# 8-bit (one channel) or 16-bit (a coarse channel followed by a fine channel). Attribute-values are in the
+# attribute's own range; 0 - 255 for 8-bit attributes, 0 - 65535 for 16-bit attributes.
+# The patch (see DMXPatch) places fixtures, by id, at a start-address in the universe.
+#
+# The patch is compiled into per-attribute arrays (value, fade-state) and into one channel-array with,
+# per channel, the attribute it takes its value from and the byte (coarse or fine) it takes. Rendering a frame
+# (see DMXPatch.render(...)) computes all running fades and scatters all attribute-values into the universe
+# with a handful of numpy operations, however many fixtures are patched.
+#
+# A patch can be loaded from a JSON-file (see DMXPatch.load(...)) like:
+#	{"types": {"spot": [["dimmer", 8], ["pan", 16], ["tilt", 16], ["color", 8]]},
+#	 "fixtures": {"1": ["spot", 1], "2": ["spot", 7]}}
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import threading, time, types
+
+import numpy
+
+from dmx512 import *
+
+
+class DMXFixtureType(object):
+	"""A fixture-definition; the fixture's attributes, in channel-order
+	"""
+	def __init__(self, name, attrs):
+		"""Define a fixture-type with the given attributes; a list of (name, bits) tuples (bits is 8 or 16),
+		or of names (for 8-bit attributes)
+		"""
+		self.name = str(name)
+		self.attrs = []
+		self.offsets = {}
+		offset = 0
+		for attr in attrs:
+			if type(attr) in types.StringTypes:
+				(attr, bits) = (attr, 8)
+			else:
+				(attr, bits) = attr
+				
+			attr = str(attr)
+			if bits not in (8, 16):
+				raise ValueError("Attribute '%s' of fixture-type '%s' must be 8- or 16-bit" % (attr, self.name))
+				
+			if attr in self.offsets:
+				raise ValueError("Duplicate attribute '%s' in fixture-type '%s'" % (attr, self.name))
+				
+			self.attrs.append((attr, offset, bits))
+			self.offsets[attr] = offset
+			offset += bits / 8
+			
+		self.footprint = offset
+	
+	def __len__(self):
+		return self.footprint
+	
+	def __repr__(self):
+		return "<DMXFixtureType '%s': %s>" % (self.name, ", ".join(["%s/%d" % (attr, bits) for (attr, offset, bits) in self.attrs]))
+
+
+class DMXPatch(object):
+	"""The fixture-types and the patched fixtures, compiled into arrays (see the module-description)
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.types = {}
+		self.fixtures = {}		# fixture-id -> (DMXFixtureType, start-address)
+		
+		self.out = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		self.mask = numpy.zeros(DMXPacket.packetMaxSlots, dtype=bool)
+		self._compile()
+	
+	def __len__(self):
+		return len(self.fixtures)
+	
+	def __contains__(self, fid):
+		return str(fid) in self.fixtures
+	
+	def addType(self, ftype):
+		"""Add (or replace) a fixture-type (a DMXFixtureType). Fixtures already patched keep their old type.
+		"""
+		with self.lock:
+			self.types[ftype.name] = ftype
+	
+	def patch(self, fid, typename, address):
+		"""Patch (or re-patch) a fixture of the given type at the given start-address.
+		The fixture's channels may not overlap those of another fixture.
+		"""
+		fid = str(fid)
+		with self.lock:
+			if typename not in self.types:
+				raise ValueError("Unknown fixture-type '%s'" % str(typename))
+				
+			ftype = self.types[typename]
+			end = address + len(ftype) - 1
+			if (address < 1) or (end > DMXPacket.packetMaxSlots):
+				raise IndexError("Fixture '%s' (%d channels) doesn't fit at address %d" % (fid, len(ftype), address))
+				
+			for (other, (otype, start)) in self.fixtures.items():
+				if (other != fid) and (start <= end) and (address < start + len(otype)):
+					raise ValueError("Fixture '%s' at address %d overlaps fixture '%s'" % (fid, address, other))
+					
+			self.fixtures[fid] = (ftype, address)
+			self._compile()
+	
+	def unpatch(self, fid):
+		"""Remove a fixture from the patch
+		"""
+		with self.lock:
+			del self.fixtures[str(fid)]
+			self._compile()
+	
+	def clear(self):
+		"""Remove all fixtures (and fixture-types)
+		"""
+		with self.lock:
+			self.fixtures = {}
+			self.types = {}
+			self._compile()
+	
+	def load(self, filename):
+		"""Add the fixture-types & fixtures from a JSON patch-file (see the module-description)
+		"""
+		try:
+			import json		# imported when first needed, to keep start-up fast
+		except ImportError:
+			import simplejson as json
+			
+		f = open(filename, 'r')
+		try:
+			spec = json.load(f)
+		finally:
+			f.close()
+			
+		for (name, attrs) in spec.get('types', {}).items():
+			self.addType(DMXFixtureType(name, attrs))
+			
+		for (fid, (typename, address)) in spec.get('fixtures', {}).items():
+			self.patch(fid, typename, address)
+	
+	def _compile(self):
+		"""Compile the patch into the per-attribute & per-channel arrays. The values, fades & active-state of
+		attributes that were patched before are kept. (call with self.lock held)
+		"""
+		old = getattr(self, 'index', {})
+		keys = []
+		chans = []
+		src = []
+		shift = []
+		maxval = []
+		for fid in sorted(self.fixtures.keys()):
+			(ftype, address) = self.fixtures[fid]
+			for (attr, offset, bits) in ftype.attrs:
+				idx = len(keys)
+				keys.append((fid, attr))
+				maxval.append((1 << bits) - 1)
+				for byte in range(bits / 8):	# coarse first, then fine
+					chans.append(address + offset + byte - 1)
+					src.append(idx)
+					shift.append(bits - 8 - (byte * 8))
+					
+		n = len(keys)
+		self.index = dict([(key, i) for (i, key) in enumerate(keys)])
+		self.chans = numpy.array(chans, dtype=int)
+		self.src = numpy.array(src, dtype=int)
+		self.shift = numpy.array(shift, dtype=int)
+		self.maxval = numpy.array(maxval, dtype=numpy.float64)
+		
+		# the attribute-values, and the fades running on them
+		values = numpy.zeros(n)
+		active = numpy.zeros(n, dtype=bool)
+		fading = numpy.zeros(n, dtype=bool)
+		fade_from = numpy.zeros(n)
+		fade_to = numpy.zeros(n)
+		fade_start = numpy.zeros(n)
+		fade_time = numpy.ones(n)
+		for (key, i) in self.index.items():
+			j = old.get(key)
+			if j != None:
+				values[i] = self.values[j]
+				active[i] = self.active[j]
+				fading[i] = self.fading[j]
+				(fade_from[i], fade_to[i]) = (self.fade_from[j], self.fade_to[j])
+				(fade_start[i], fade_time[i]) = (self.fade_start[j], self.fade_time[j])
+				
+		(self.values, self.active, self.fading) = (values, active, fading)
+		(self.fade_from, self.fade_to, self.fade_start, self.fade_time) = (fade_from, fade_to, fade_start, fade_time)
+		self._updateMask()
+	
+	def _updateMask(self):
+		"""Mark the channels of the active attributes in self.mask (call with self.lock held)
+		"""
+		self.mask[:] = False
+		self.mask[self.chans[self.active[self.src]]] = True
+	
+	def _lookup(self, fid, attr):
+		"""Return the index of the given attribute (call with self.lock held)
+		"""
+		i = self.index.get((str(fid), str(attr)))
+		if i == None:
+			if str(fid) not in self.fixtures:
+				raise KeyError("Unknown fixture '%s'" % str(fid))
+				
+			raise KeyError("Fixture '%s' has no attribute '%s'" % (str(fid), str(attr)))
+			
+		return i
+	
+	def _attributes(self, fid):
+		"""Return the names of the given fixture's attributes, in channel-order (call with self.lock held)
+		"""
+		if str(fid) not in self.fixtures:
+			raise KeyError("Unknown fixture '%s'" % str(fid))
+			
+		return [attr for (attr, offset, bits) in self.fixtures[str(fid)][0].attrs]
+	
+	def attributes(self, fid):
+		"""Return the names of the given fixture's attributes, in channel-order
+		"""
+		with self.lock:
+			return self._attributes(fid)
+	
+	def set(self, fid, attr, value, duration=0., now=None):
+		"""Set the given attribute to 'value', or fade it there in 'duration' seconds, starting at 'now'
+		(default: the current time). The fade runs from the attribute's current value, as a float,
+		so 16-bit attributes fade in steps of the fine channel.
+		"""
+		if now == None:
+			now = time.time()
+			
+		with self.lock:
+			i = self._lookup(fid, attr)
+			if (value < 0) or (value > self.maxval[i]):
+				raise ValueError("Value %s out of range (0, %d) for attribute '%s' of fixture '%s'" % (str(value), self.maxval[i], attr, fid))
+				
+			if duration > 0:
+				if self.fading[i]:	# continue from where the running fade is now
+					self._fade(now)
+					
+				(self.fade_from[i], self.fade_to[i]) = (self.values[i], value)
+				(self.fade_start[i], self.fade_time[i]) = (now, duration)
+				self.fading[i] = True
+			else:
+				self.values[i] = value
+				self.fading[i] = False
+				
+			if not self.active[i]:
+				self.active[i] = True
+				self._updateMask()
+	
+	def get(self, fid, attr):
+		"""Return the given attribute's current value (or None if it was never set)
+		"""
+		with self.lock:
+			i = self._lookup(fid, attr)
+			if not self.active[i]:
+				return None
+				
+			return int(self.values[i] + 0.5)
+	
+	def release(self, fid, attr=None):
+		"""Stop controlling the given attribute (or all attributes of the fixture)
+		"""
+		with self.lock:
+			if attr != None:
+				idx = [self._lookup(fid, attr)]
+			else:
+				idx = [self._lookup(fid, a) for a in self._attributes(fid)]
+				
+			self.active[idx] = False
+			self.fading[idx] = False
+			self._updateMask()
+	
+	def _fade(self, now):
+		"""Advance the running fades to time 'now' (call with self.lock held)
+		"""
+		idx = numpy.flatnonzero(self.fading)
+		t = (now - self.fade_start[idx]) / self.fade_time[idx]
+		numpy.clip(t, 0., 1., t)
+		self.values[idx] = self.fade_from[idx] + ((self.fade_to[idx] - self.fade_from[idx]) * t)
+		self.fading[idx[t >= 1.]] = False
+	
+	def render(self, now=None):
+		"""Compute the running fades at time 'now' (default: the current time), and scatter the attribute-values
+		into the universe. Returns a tuple (values, mask, fading); 'values' holds the levels of all channels (a uint8 array),
+		'mask' (a boolean array) marks the channels of the attributes that are set, and 'fading' is True while fades are running.
+		Both arrays are re-used by the next render()
+		"""
+		if now == None:
+			now = time.time()
+			
+		with self.lock:
+			if self.fading.any():
+				self._fade(now)
+				
+			ints = (self.values + 0.5).astype(int)
+			self.out[self.chans] = (ints[self.src] >> self.shift) & 0xff
+			return (self.out, self.mask, self.fading.any())
@@ -0,0 +1,408 @@
+#!/usr/bin/python
+
+###
+# DMX Show-recorder & -player
+###
+# Records DMX-frames (the output, and optionally the input) to a compact, append-only binary show-file,
+# and plays them back, frame-accurately, from the memory-mapped file.
+#
+# The show-file starts with a header (see DMXRecorder.file_head); the magic-string and the start-time.
+# Then follows one record per recorded frame; a record-header (see DMXRecorder.rec_head) with the time
+# (in ms since the start), the kind (output or input, and whether it's a key-frame) and the payload-length.
+# The payload of a key-frame is the frame's slot-values. The payload of every other record is the frame's size,
+# followed by the changed slots relative to the previous frame of the same kind, as runs of (start, count)
+# and the slot-values. Frames that didn't change aren't recorded at all.
+# A key-frame is written every 'key_interval' seconds, so playback can start anywhere without decoding the whole file.
+# A DMXRecordWriter writes the frames from a background-thread, so a slow disk never delays the output.
+#
+# With a few channels changing per frame, a record is some 15 bytes; an hour of 40 frames/s fits in a few MB.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import bisect, mmap, os, struct, threading, time, types, warnings
+
+import numpy
+
+from dmx512 import *
+from dmxinput import changedRanges
+
+
+class DMXRecorder(object):
+	"""Records DMX-frames to a show-file (see the module-description)
+	"""
+	magic = 'DMXSHOW1'
+	file_head = struct.Struct('<8sd')	# magic, start-time
+	rec_head = struct.Struct('<IBH')	# time (ms), kind, payload-length
+	run_head = struct.Struct('<HB')		# start-slot, nr of slots
+	size_head = struct.Struct('<H')		# frame-size
+	
+	OUTPUT = 0
+	INPUT = 1
+	KEY = 0x80
+	kinds = {'output':OUTPUT, 'input':INPUT}
+	
+	def __init__(self, filename, key_interval=10.):
+		"""Create the show-file (overwriting any existing file), and start the recording's clock
+		"""
+		self.filename = filename
+		self.key_interval = key_interval
+		self.lock = threading.Lock()
+		self.start = time.time()
+		self.prev = {}			# kind -> the previous frame (a uint8 array)
+		self.last_key = {}		# kind -> the time of the last key-frame
+		self.frames = 0
+		
+		self.f = open(filename, 'wb')
+		self.f.write(self.file_head.pack(self.magic, self.start))
+		self.bytes = self.file_head.size
+	
+	def __repr__(self):
+		return "<DMXRecorder '%s': %d frames, %d bytes>" % (self.filename, self.frames, self.bytes)
+	
+	def _runs(self, values, prev):
+		"""Return the delta-payload of the given frame, relative to the previous frame, or None if nothing changed
+		"""
+		n = min(len(values), len(prev))
+		mask = (values[:n] != prev[:n])
+		if len(values) > n:
+			mask = numpy.concatenate((mask, numpy.ones(len(values) - n, dtype=bool)))
+			
+		if (len(values) == len(prev)) and not mask.any():
+			return None
+			
+		parts = [self.size_head.pack(len(values))]
+		for (start, end) in changedRanges(mask):
+			for first in xrange(start, end + 1, 255):
+				count = min(end + 1 - first, 255)
+				parts.append(self.run_head.pack(first, count))
+				parts.append(values[first:first + count].tostring())
+				
+		return ''.join(parts)
+	
+	def record(self, kind, values, now=None):
+		"""Record a frame of the given kind (DMXRecorder.OUTPUT or DMXRecorder.INPUT) at time 'now' (default: the current time).
+		'values' are the frame's slot-values; a string or a uint8 array.
+		"""
+		if now == None:
+			now = time.time()
+			
+		if type(values) in types.StringTypes:
+			values = numpy.fromstring(values, dtype=numpy.uint8)
+		else:
+			values = numpy.array(values, dtype=numpy.uint8)
+			
+		with self.lock:
+			if self.f == None:
+				return
+				
+			payload = None
+			if (kind in self.prev) and (now - self.last_key[kind] < self.key_interval):
+				payload = self._runs(values, self.prev[kind])
+				if payload == None:
+					return
+					
+			flags = kind
+			if (payload == None) or (len(payload) >= len(values)):
+				payload = values.tostring()
+				flags |= self.KEY
+				self.last_key[kind] = now
+				
+			t = max(int(((now - self.start) * 1000) + 0.5), 0)
+			self.f.write(self.rec_head.pack(t, flags, len(payload)) + payload)
+			self.prev[kind] = values
+			self.frames += 1
+			self.bytes += self.rec_head.size + len(payload)
+	
+	def close(self):
+		"""Stop recording, and close the show-file
+		"""
+		with self.lock:
+			if self.f == None:
+				return
+				
+			self.f.close()
+			self.f = None
+
+
+class DMXRecordWriter(threading.Thread):
+	"""Background-thread that writes the frames queued by record(...) to a DMXRecorder
+	When 'queue_size' frames are waiting to be written (e.g. on a slow disk), further frames are dropped (and counted),
+	so recording never delays the caller. Write-errors are counted and reported (with warnings.warn()).
+	"""
+	def __init__(self, recorder, queue_size=1024):
+		"""Set-up (but don't start) a writer-thread for the given DMXRecorder
+		"""
+		threading.Thread.__init__(self, name="DMXRecordWriter")
+		self.setDaemon(True)
+		
+		self.recorder = recorder
+		self.queue_size = queue_size
+		self.cond = threading.Condition()
+		self.queue = []
+		self.running = True
+		self.dropped = 0
+		self.errors = 0
+		self.last_error = None
+	
+	def __repr__(self):
+		return "<DMXRecordWriter '%s': %d frames, %d bytes, %d dropped>" % (self.filename, self.frames, self.bytes, self.dropped)
+		
+	filename = property(lambda self: self.recorder.filename)
+	frames = property(lambda self: self.recorder.frames)
+	bytes = property(lambda self: self.recorder.bytes)
+	
+	def record(self, kind, values, now=None):
+		"""Queue a frame to be recorded (see DMXRecorder.record(...)); 'now' defaults to the current time
+		"""
+		if now == None:
+			now = time.time()
+			
+		if type(values) not in types.StringTypes:
+			values = numpy.array(values, dtype=numpy.uint8)	# a copy; the caller may re-use its array
+			
+		with self.cond:
+			if not self.running:
+				return
+				
+			if len(self.queue) >= self.queue_size:
+				self.dropped += 1
+				return
+				
+			self.queue.append((kind, values, now))
+			self.cond.notify()
+	
+	def run(self):
+		while True:
+			with self.cond:
+				while self.running and not len(self.queue):
+					self.cond.wait()
+					
+				if not len(self.queue):
+					break
+					
+				(queue, self.queue) = (self.queue, [])
+				
+			for (kind, values, now) in queue:
+				try:
+					self.recorder.record(kind, values, now)
+				except (IOError, OSError), e:
+					self.errors += 1
+					self.last_error = e
+					warnings.warn("Error recording to '%s': %s" % (self.filename, str(e)))
+					
+		self.recorder.close()
+	
+	def close(self):
+		"""Stop the writer-thread after writing all queued frames, and close the show-file
+		"""
+		with self.cond:
+			self.running = False
+			self.cond.notify()
+			
+		if self.isAlive():
+			self.join()
+		else:
+			self.recorder.close()
+
+
+class DMXShowFile(object):
+	"""A recorded show-file (see DMXRecorder), memory-mapped, with an index of its records
+	"""
+	def __init__(self, filename):
+		"""Open & index the show-file. An incomplete last record (of an interrupted recording) is ignored.
+		"""
+		self.filename = filename
+		f = open(filename, 'rb')
+		try:
+			size = os.fstat(f.fileno()).st_size
+			if size < DMXRecorder.file_head.size:
+				raise ValueError("'%s' is not a show-file" % filename)
+				
+			self.map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+		finally:
+			f.close()
+			
+		(magic, self.start) = DMXRecorder.file_head.unpack_from(self.map, 0)
+		if magic != DMXRecorder.magic:
+			self.map.close()
+			raise ValueError("'%s' is not a show-file" % filename)
+			
+		offsets = []
+		lengths = []
+		times = []
+		flags = []
+		pos = DMXRecorder.file_head.size
+		head = DMXRecorder.rec_head
+		while pos + head.size <= size:
+			(t, flag, length) = head.unpack_from(self.map, pos)
+			if pos + head.size + length > size:
+				break
+				
+			offsets.append(pos + head.size)
+			lengths.append(length)
+			times.append(t)
+			flags.append(flag)
+			pos += head.size + length
+			
+		self.offsets = numpy.array(offsets, dtype=int)
+		self.lengths = numpy.array(lengths, dtype=int)
+		self.times = numpy.array(times, dtype=numpy.float64) / 1000.
+		self.flags = numpy.array(flags, dtype=int)
+	
+	def __len__(self):
+		return len(self.offsets)
+	
+	def __repr__(self):
+		return "<DMXShowFile '%s': %d frames, %.1f s>" % (self.filename, len(self), self.duration())
+	
+	def duration(self):
+		"""Return the time of the last record (in seconds since the start of the recording)
+		"""
+		if not len(self.times):
+			return 0.
+			
+		return self.times[-1]
+	
+	def records(self, kind=DMXRecorder.OUTPUT):
+		"""Return the indices of the records of the given kind
+		"""
+		return numpy.flatnonzero((self.flags & ~DMXRecorder.KEY) == kind)
+	
+	def isKey(self, i):
+		"""Return True if record 'i' is a key-frame
+		"""
+		return bool(self.flags[i] & DMXRecorder.KEY)
+	
+	def decode(self, i, values):
+		"""Apply record 'i' to 'values' (a uint8 array of 512 slots, holding the previous frame of the same kind),
+		and return the frame's size
+		"""
+		pos = self.offsets[i]
+		end = pos + self.lengths[i]
+		if self.isKey(i):
+			size = end - pos
+			values[:size] = numpy.frombuffer(self.map[pos:end], dtype=numpy.uint8)
+			values[size:] = 0
+			return size
+			
+		(size,) = DMXRecorder.size_head.unpack_from(self.map, pos)
+		pos += DMXRecorder.size_head.size
+		run = DMXRecorder.run_head
+		while pos < end:
+			(start, count) = run.unpack_from(self.map, pos)
+			pos += run.size
+			values[start:start + count] = numpy.frombuffer(self.map[pos:pos + count], dtype=numpy.uint8)
+			pos += count
+			
+		values[size:] = 0
+		return size
+	
+	def close(self):
+		self.map.close()
+
+
+class DMXShowPlayer(threading.Thread):
+	"""Background-thread that plays the frames of one kind from a DMXShowFile into a merge-source (see DMXMergeSource),
+	at their recorded times, calling send_func() after every frame
+	When looping, the show restarts at the end of the recording, but never sooner than 'min_loop' seconds after it last started.
+	"""
+	min_loop = 0.025
+	def __init__(self, show, source, send_func, kind=DMXRecorder.OUTPUT, loop=False, start=0., speed=1.):
+		"""Set-up (but don't start) the player; playback starts at 'start' seconds into the recording
+		"""
+		threading.Thread.__init__(self, name="DMXShowPlayer")
+		self.setDaemon(True)
+		
+		if speed <= 0:
+			raise ValueError("Invalid playback-speed: '%s'" % str(speed))
+			
+		self.show = show
+		self.source = source
+		self.send_func = send_func
+		self.records = show.records(kind)
+		if loop and not len(self.records):
+			raise ValueError("Can't loop a show without frames")
+			
+		self.loop = loop
+		self.start_at = float(start)
+		self.speed = float(speed)
+		self.values = numpy.zeros(DMXPacket.packetMaxSlots, dtype=numpy.uint8)
+		self.pos = 0.			# the recording-time of the last frame played
+		self.frames = 0
+		self.done = threading.Event()
+	
+	def _seek(self, t):
+		"""Decode the frames up to time 't', starting at the last key-frame before it. Returns the index (in self.records)
+		of the next frame to play.
+		"""
+		times = self.show.times[self.records]
+		n = bisect.bisect_right(times.tolist(), t)
+		first = n - 1
+		while (first > 0) and not self.show.isKey(self.records[first]):
+			first -= 1
+			
+		size = None
+		for j in xrange(max(first, 0), n):
+			size = self.show.decode(self.records[j], self.values)
+			
+		if size != None:
+			self._output(size, times[n - 1])
+			
+		return n
+	
+	def _output(self, size, t):
+		"""Set the decoded frame into the merge-source, and send it
+		"""
+		self.source.setFrame(self.values[:size])
+		self.send_func()
+		self.pos = t
+		self.frames += 1
+	
+	def run(self):
+		start = self.start_at
+		while not self.done.isSet():
+			n = self._seek(start)
+			t0 = time.time()		# when the recording-time 'start' is played
+			for i in self.records[n:]:
+				t = self.show.times[i]
+				delay = t0 + ((t - start) / self.speed) - time.time()
+				if delay > 0:
+					self.done.wait(delay)
+					
+				if self.done.isSet():
+					return
+					
+				size = self.show.decode(i, self.values)
+				self._output(size, t)
+				
+			if not self.loop:
+				return
+				
+			# wait for the end of the recording (or at least 'min_loop' seconds) before starting over
+			end = t0 + max((self.show.duration() - start) / self.speed, self.min_loop)
+			delay = end - time.time()
+			if delay > 0:
+				self.done.wait(delay)
+				
+			self.values[:] = 0
+			start = 0.
+	
+	def isPlaying(self):
+		return self.isAlive() and not self.done.isSet()
+	
+	def stop(self):
+		"""Stop playback
+		"""
+		self.done.set()
+		if self.isAlive() and (threading.currentThread() is not self):
+			self.join()
@@ -0,0 +1,923 @@
+#!/usr/bin/python
+
+###
+# DMX Scene-memory
+###
+# A scene-store that keeps all scenes in one contiguous (scenes x 512) array of slot-values,
+# with an occupancy-map marking which scene-numbers hold a stored scene.
+# The store can optionally be backed by a memory-mapped file, so that large scene-memories
+# are available instantly on start-up, and can be shared between processes.
+#
+# Scene-files (XML) are read with a streaming (expat) parser, which decodes each scene's
+# hex-block in one go, straight into the scene-store.
+#
+# Scenes can also be kept in a binary scene-archive; an index of scene-numbers & file-offsets
+# followed by fixed-size (or compressed) per-scene records. Archives are memory-mapped, and
+# a scene is only read from the archive when it is first used.
+# Run this file as a script to convert between XML scene-files and scene-archives.
+#
+# Every change to a scene bumps that scene's 'generation'-count, so scene-files can be saved
+# incrementally; only changed scenes are re-encoded. Saving happens in the background
+# (see DMXSceneSaver), and files are written atomically (write to a temp-file, then rename)
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import errno, os, sys, mmap, optparse, struct, time, types, threading, binascii, zlib
+
+import numpy
+
+from dmx512 import *
+
+
+class DMXSceneStore(object):
+	"""Scene-memory for DMXCtrl.
+	Scenes are stored as rows of a (capacity x 512) uint8 array. A scene's row can be
+	retrieved as an array-view (see getSlots()), so recalling or fading to a scene copies no data.
+	For compatibility with the old list-based scene-memory, indexing the store returns a DMXPacket
+	(or None, for an empty scene-memory location) and len() returns the highest used scene-number + 1
+	"""
+	sceneSlots = DMXPacket.packetMaxSlots
+	
+	# memory-map file header: magic, version, capacity
+	mapMagic = 'DMXM'
+	mapVersion = 1
+	mapHeader = '<4sHxxL4x'
+	
+	def __init__(self, capacity=0, mapfile=None):
+		"""Set-up a new, empty scene-memory with room for 'capacity' scenes.
+		The scene-memory grows automatically when a scene is stored beyond its current capacity.
+		If 'mapfile' is given, the scene-memory is kept in that file (which is created if it doesn't exist)
+		and memory-mapped. The scenes already stored in an existing file are available immediately.
+		"""
+		self.lock = threading.RLock()
+		self.mapfile = mapfile
+		self.capacity = 0
+		self.top = 0
+		
+		# scene-archive (if any) from which non-resident scenes are paged-in on first use
+		self.archive = None
+		self.resident = numpy.zeros(0, dtype=numpy.uint8)
+		
+		# per-scene change-counter (see DMXSceneFileWriter)
+		self.gen = numpy.zeros(0, dtype=numpy.uint32)
+		
+		if mapfile != None:
+			self._openMap(capacity)
+		else:
+			self._alloc(capacity)
+	
+	def __len__(self):
+		"""Return the number of scene-memory locations (i.e. the highest used scene-number + 1)
+		"""
+		return self.top
+	
+	def __contains__(self, nr):
+		"""Return True if a scene is stored at the given scene-number
+		"""
+		if not isinstance(nr, (types.IntType, types.LongType, numpy.integer)):
+			return False
+			
+		return (nr >= 0) and (nr < self.top) and bool(self.used[nr])
+	
+	def __getitem__(self, nr):
+		"""Return the given scene as a (new) DMXPacket, or None if the scene-memory location is empty
+		"""
+		if (nr < 0) or (nr >= self.top):
+			raise IndexError("Scene-memory index out of range: %d" % nr)
+			
+		if not self.used[nr]:
+			return None
+			
+		pkt = DMXPacket()
+		pkt.fromString(str(pkt) + self.getSlots(nr).tostring())
+		return pkt
+	
+	def __setitem__(self, nr, pkt):
+		"""Store the given DMXPacket as the given scene. Storing 'None' empties the scene-memory location
+		"""
+		if pkt == None:
+			self.delete(nr)
+		else:
+			self.store(nr, str(pkt)[1:])
+	
+	def __delitem__(self, nr):
+		"""Empty the given scene-memory location
+		"""
+		self.delete(nr)
+	
+	def _alloc(self, capacity):
+		"""Allocate (or grow) the in-memory scene arrays
+		"""
+		slots = numpy.zeros((capacity, self.sceneSlots), dtype=numpy.uint8)
+		used = numpy.zeros(capacity, dtype=numpy.uint8)
+		sizes = numpy.zeros(capacity, dtype=numpy.uint16)
+		
+		if self.capacity:
+			slots[:self.capacity] = self.slots
+			used[:self.capacity] = self.used
+			sizes[:self.capacity] = self.sizes
+			
+		(self.slots, self.used, self.sizes) = (slots, used, sizes)
+		self._allocMaps(capacity)
+		self.capacity = capacity
+	
+	def _allocMaps(self, capacity):
+		"""Grow the 'resident' map, which marks the stored scenes that need not be paged-in from the scene-archive,
+		and the 'generation' map, which counts the changes made to each scene
+		"""
+		resident = numpy.ones(capacity, dtype=numpy.uint8)
+		resident[:len(self.resident)] = self.resident[:capacity]
+		self.resident = resident
+		
+		gen = numpy.zeros(capacity, dtype=numpy.uint32)
+		gen[:len(self.gen)] = self.gen[:capacity]
+		self.gen = gen
+	
+	def _mapOffsets(self, capacity):
+		"""Return the file-offsets of the slots-, occupancy- and sizes-arrays
+		in a memory-map file with the given capacity
+		"""
+		slots_ofs = struct.calcsize(self.mapHeader)
+		used_ofs = slots_ofs + (capacity * self.sceneSlots)
+		sizes_ofs = used_ofs + capacity
+		end = sizes_ofs + (capacity * 2)
+		return (slots_ofs, used_ofs, sizes_ofs, end)
+	
+	def _mapArrays(self, capacity):
+		"""Memory-map the slots-, occupancy- and sizes-arrays of the backing file
+		"""
+		(slots_ofs, used_ofs, sizes_ofs, end) = self._mapOffsets(capacity)
+		self.slots = numpy.memmap(self.mapfile, dtype=numpy.uint8, mode='r+', offset=slots_ofs, shape=(capacity, self.sceneSlots))
+		self.used = numpy.memmap(self.mapfile, dtype=numpy.uint8, mode='r+', offset=used_ofs, shape=(capacity,))
+		self.sizes = numpy.memmap(self.mapfile, dtype='<u2', mode='r+', offset=sizes_ofs, shape=(capacity,))
+		self._allocMaps(capacity)
+		self.capacity = capacity
+	
+	def _writeMapHeader(self, capacity):
+		"""(Re-)size the backing file for the given capacity, and write its header
+		"""
+		mf = open(self.mapfile, 'r+b')
+		mf.write(struct.pack(self.mapHeader, self.mapMagic, self.mapVersion, capacity))
+		mf.truncate(self._mapOffsets(capacity)[3])
+		mf.close()
+	
+	def _openMap(self, capacity):
+		"""Open (or create) the memory-map file holding the scene-memory
+		"""
+		if not os.path.isfile(self.mapfile):
+			open(self.mapfile, 'wb').close()
+			self._writeMapHeader(max(1, capacity))
+			
+		mf = open(self.mapfile, 'rb')
+		header = mf.read(struct.calcsize(self.mapHeader))
+		mf.close()
+		
+		if len(header) < struct.calcsize(self.mapHeader):
+			raise DMXError("Scene-memory file '%s' is too short" % self.mapfile)
+			
+		(magic, version, map_cap) = struct.unpack(self.mapHeader, header)
+		if (magic != self.mapMagic) or (version != self.mapVersion):
+			raise DMXError("'%s' is not a (version %d) scene-memory file" % (self.mapfile, self.mapVersion))
+			
+		self._mapArrays(map_cap)
+		
+		if capacity > map_cap:
+			self._grow(capacity)
+			
+		occupied = numpy.flatnonzero(self.used)
+		if len(occupied):
+			self.top = int(occupied[-1]) + 1
+	
+	def _grow(self, capacity):
+		"""Grow the scene-memory to (at least) the given capacity.
+		The capacity is at least doubled, so that storing ascending scene-numbers does not re-allocate every time
+		"""
+		capacity = max(capacity, self.capacity * 2, 16)
+		
+		if self.mapfile == None:
+			self._alloc(capacity)
+			return
+			
+		# the occupancy- & sizes-arrays move to the end of the (larger) file; the slots stay in place.
+		used = numpy.array(self.used)
+		sizes = numpy.array(self.sizes)
+		old_cap = self.capacity
+		self.flush()
+		del self.slots, self.used, self.sizes
+		
+		self._writeMapHeader(capacity)
+		self._mapArrays(capacity)
+		self.used[:old_cap] = used
+		self.used[old_cap:] = 0
+		self.sizes[:old_cap] = sizes
+		self.sizes[old_cap:] = 0
+	
+	def _checkNr(self, nr):
+		"""Raise ValueError if 'nr' is not a valid scene-number
+		"""
+		if (type(nr) != types.IntType) or (nr < 0):
+			raise ValueError("Invalid scene number '%s'" % str(nr))
+	
+	def store(self, nr, values):
+		"""Store the given slot-values as the given scene.
+		'values' can be a string (of raw slot-values), a list or tuple of ints or a numpy array
+		"""
+		self._checkNr(nr)
+		
+		if type(values) in types.StringTypes:
+			values = numpy.fromstring(values, dtype=numpy.uint8)
+			
+		size = len(values)
+		if size > self.sceneSlots:
+			raise IndexError("A scene can only have %d slots" % self.sceneSlots)
+			
+		with self.lock:
+			if nr >= self.capacity:
+				self._grow(nr + 1)
+				
+			row = self.slots[nr]
+			row[:size] = values
+			row[size:] = 0
+			self.sizes[nr] = size
+			self.used[nr] = 1
+			self.resident[nr] = 1
+			self.gen[nr] += 1
+			
+			if nr >= self.top:
+				self.top = nr + 1
+	
+	def delete(self, nr):
+		"""Empty the given scene-memory location
+		"""
+		self._checkNr(nr)
+		
+		with self.lock:
+			if nr >= self.top:
+				return
+				
+			self.used[nr] = 0
+			self.sizes[nr] = 0
+			self.gen[nr] += 1
+			
+			if nr == (self.top - 1):
+				occupied = numpy.flatnonzero(self.used[:self.top])
+				if len(occupied):
+					self.top = int(occupied[-1]) + 1
+				else:
+					self.top = 0
+	
+	def clear(self):
+		"""Empty the whole scene-memory
+		"""
+		with self.lock:
+			self.used[:] = 0
+			self.sizes[:] = 0
+			self.gen += 1
+			self.top = 0
+	
+	def isEmpty(self, nr):
+		"""Return True if the given scene-memory location is empty (or beyond the highest used scene-number)
+		"""
+		return not (nr in self)
+	
+	def getSlots(self, nr):
+		"""Return the slot-values of the given scene, as a (read-only) view on the scene-memory
+		Raises IndexError if the scene-memory location is empty
+		"""
+		if nr not in self:
+			raise IndexError("Scene %d is empty" % nr)
+		
+		if not self.resident[nr]:
+			self._pageIn(nr)
+		
+		view = self.slots[nr, :self.sizes[nr]]
+		view.flags.writeable = False
+		return view
+	
+	def getSize(self, nr):
+		"""Return the number of slots in the given scene
+		"""
+		if nr not in self:
+			return 0
+			
+		return int(self.sizes[nr])
+	
+	def numbers(self):
+		"""Return an array with the scene-numbers of all stored scenes, in ascending order
+		"""
+		return numpy.flatnonzero(self.used[:self.top])
+	
+	def _pageIn(self, nr):
+		"""Read the given scene from the scene-archive into the scene-memory
+		"""
+		with self.lock:
+			if self.resident[nr]:
+				return
+				
+			values = self.archive.readScene(nr)
+			row = self.slots[nr]
+			row[:len(values)] = values
+			row[len(values):] = 0
+			self.resident[nr] = 1
+	
+	def pageInAll(self):
+		"""Read all scenes that have not been used yet from the scene-archive
+		"""
+		with self.lock:
+			if self.archive == None:
+				return
+				
+			for nr in numpy.flatnonzero(self.used[:self.top] & (self.resident[:self.top] ^ 1)):
+				self._pageIn(int(nr))
+	
+	def attachArchive(self, archive):
+		"""Make the scenes in the given DMXSceneArchive available in the scene-memory.
+		Scenes in the archive replace scenes with the same scene-number in scene-memory.
+		The scenes' slot-values are read from the archive only when a scene is first used,
+		except for memory-mapped scene-memories, where all scenes are copied into the scene-memory file right away.
+		"""
+		with self.lock:
+			if self.archive != None:
+				self.pageInAll()
+				self.archive.close()
+				self.archive = None
+				
+			nrs = archive.numbers()
+			if not len(nrs):
+				archive.close()
+				return
+				
+			top = int(nrs[-1]) + 1
+			if top > self.capacity:
+				self._grow(top)
+				
+			self.used[nrs] = 1
+			self.sizes[nrs] = archive.sizes()
+			self.resident[nrs] = 0
+			self.gen[nrs] += 1
+			self.top = max(self.top, top)
+			self.archive = archive
+			
+			if self.mapfile != None:
+				self.pageInAll()
+	
+	def flush(self):
+		"""Write any changes to a memory-mapped scene-memory back to its file
+		"""
+		if self.mapfile != None:
+			for ar in (self.slots, self.used, self.sizes):
+				ar.flush()
+	
+	def close(self):
+		"""Flush and release the scene-memory
+		"""
+		self.flush()
+		
+		if self.archive != None:
+			self.archive.close()
+
+
+
+###
+# Scene-file (XML) parsing
+###
+
+def decodeSceneText(in_str):
+	"""Parse the given multi-line string (see DMXCtrl._sceneToStr(...)) into an array of slot-values.
+	The channel-values are represented by 2-digit Hexadecimal, 16 channels per row,
+	preceded by a 3-digit Hexadeciaml slot-number. The whole block is decoded in one operation.
+	"""
+	# strip the 'NNN:' slot-numbers from the rows, then split into 2-digit values
+	tokens = ' '.join([row.rsplit(':', 1)[-1] for row in in_str.splitlines()]).split()
+	hex_str = ''.join(tokens)
+	
+	if len(hex_str) == (2 * len(tokens)):
+		try:
+			return numpy.fromstring(binascii.unhexlify(hex_str), dtype=numpy.uint8)
+		except TypeError:
+			pass
+			
+	# not all 2-digit values; decode value-by-value (and find the offending value, if any)
+	values = []
+	for tok in tokens:
+		try:
+			val = int(tok, 16)
+		except ValueError:
+			raise ValueError("Invalid channel value: '%s'" % str(tok))
+			
+		if (val < 0) or (val > 255):
+			raise ValueError("Invalid channel value: '%s'" % str(tok))
+			
+		values.append(val)
+		
+	return numpy.array(values, dtype=numpy.uint8)
+
+class DMXSceneFileReader(object):
+	"""Streaming parser for scene-files of the form
+	<DMXScenes>
+		<Scene nr="0">
+			001: 00 00 ...
+		</Scene>
+		...
+	</DMXScenes>
+	The parsed scenes are stored directly in the given DMXSceneStore.
+	"""
+	def __init__(self, store):
+		"""Set-up a reader that loads scenes into the given DMXSceneStore
+		"""
+		self.store = store
+	
+	def _startElement(self, name, attrs):
+		"""expat StartElementHandler
+		"""
+		if name == 'DMXScenes':
+			self.in_scenes = True
+			self.found = True
+			
+		elif (name == 'Scene') and self.in_scenes:
+			if 'nr' not in attrs:
+				raise AttributeError("Attribute 'nr' missing from XML scene definition")
+				
+			nr_str = attrs['nr']
+			try:
+				self.nr = int(nr_str)
+			except ValueError:
+				raise ValueError("Invalid 'nr' Attribute in XML scene definition: '%s'" % nr_str)
+				
+			self.text = []
+	
+	def _endElement(self, name):
+		"""expat EndElementHandler
+		"""
+		if name == 'DMXScenes':
+			self.in_scenes = False
+			
+		elif (name == 'Scene') and (self.nr != None):
+			if not len(self.text):
+				raise AttributeError("DMX data missing from XML scene %d definition" % self.nr)
+				
+			self.store.store(self.nr, decodeSceneText(''.join(self.text)))
+			self.count += 1
+			self.nr = None
+	
+	def _charData(self, data):
+		"""expat CharacterDataHandler
+		"""
+		if self.nr != None:
+			self.text.append(data)
+	
+	def read(self, scenefile):
+		"""Parse the given scene-file, and store the scenes in the scene-store.
+		Returns a dict with the load-statistics:
+		'scenes':	the nr of scenes loaded
+		'bytes':	the size of the scene-file
+		'time':		the load-time, in (floating-point) seconds
+		"""
+		self.in_scenes = False
+		self.found = False
+		self.nr = None
+		self.text = []
+		self.count = 0
+		
+		from xml.parsers import expat	# imported when first needed, to keep start-up fast
+		
+		parser = expat.ParserCreate()
+		parser.buffer_text = True
+		parser.StartElementHandler = self._startElement
+		parser.EndElementHandler = self._endElement
+		parser.CharacterDataHandler = self._charData
+		
+		start = time.time()
+		sf = open(scenefile, 'rb')
+		try:
+			parser.ParseFile(sf)
+		finally:
+			sf.close()
+			
+		if not self.found:
+			raise AttributeError("Element <DMXScenes>...</DMXScenes> missing from scenefile %s" % scenefile)
+			
+		return {'scenes':self.count, 'bytes':os.path.getsize(scenefile), 'time':time.time() - start}
+
+###
+# Scene-file (XML) writing
+###
+
+# 2-digit hexadecimal representation (plus separating space) of every possible slot-value
+_hexValues = numpy.array(["%02X " % val for val in range(256)], dtype='S3')
+
+def encodeSceneText(values, indent=""):
+	"""Return the given slot-values as a multi-line string.
+	The channel-values are represented by 2-digit Hexadecimal, 16 channels per row,
+	preceded by a 3-digit Hexadeciaml slot-number.
+	Upto 32 rows per scene (== 512 slots). Every row is prefixed with the given indent.
+	"""
+	hex_str = _hexValues[numpy.asarray(values, dtype=numpy.uint8)].tostring()
+	out = []
+	
+	for start in range(0, len(values), 16):
+		out.append("%s%03X: %s\n" % (indent, start + 1, hex_str[start * 3:(start + 16) * 3]))
+		
+	return ''.join(out)
+
+def atomicWrite(filename, write_func):
+	"""Write a file atomically; 'write_func' is called with an open (temporary) file-object
+	to write the file's contents. The temp-file is then renamed to the given filename,
+	so the file is either completely replaced, or not at all.
+	"""
+	tmp_name = "%s.tmp" % filename
+	tf = open(tmp_name, 'wb')
+	try:
+		write_func(tf)
+		tf.flush()
+		os.fsync(tf.fileno())
+		tf.close()
+	except:
+		tf.close()
+		os.remove(tmp_name)
+		raise
+		
+	try:
+		os.rename(tmp_name, filename)
+	except OSError, e:
+		# Windows can't rename onto an existing file; any other error leaves the existing file as it is
+		if (os.name != 'nt') or (e.errno != errno.EEXIST):
+			os.remove(tmp_name)
+			raise
+			
+		os.remove(filename)
+		os.rename(tmp_name, filename)
+
+class DMXSceneFileWriter(object):
+	"""Writer for XML scene-files (see DMXSceneFileReader)
+	The writer keeps the encoded XML-element of every scene it has written, and on
+	the next write() only re-encodes the scenes that changed in the meantime.
+	"""
+	def __init__(self, store):
+		"""Set-up a writer that saves the scenes in the given DMXSceneStore
+		"""
+		self.store = store
+		
+		# encoded scenes, by scene-number, and the scene-generation they were encoded from
+		self.cache = {}
+		self.gen = numpy.zeros(0, dtype=numpy.uint32)
+		self.cached = numpy.zeros(0, dtype=numpy.uint8)
+	
+	def encodeScene(self, nr, values):
+		"""Return the XML-element for the given scene, as a string
+		"""
+		text = encodeSceneText(values, "\t\t")
+		if not len(text):
+			text = "\t\t\n"
+			
+		return "\t<Scene nr=\"%d\">\n%s\t</Scene>\n" % (nr, text)
+	
+	def update(self):
+		"""Re-encode the scenes that changed since the last update, and drop deleted scenes from the cache.
+		Returns the list of encoded scenes, in scene-number order, and the nr of scenes that were re-encoded
+		"""
+		store = self.store
+		with store.lock:
+			top = len(store)
+			if len(self.gen) < store.capacity:
+				gen = numpy.zeros(store.capacity, dtype=numpy.uint32)
+				gen[:len(self.gen)] = self.gen
+				cached = numpy.zeros(store.capacity, dtype=numpy.uint8)
+				cached[:len(self.cached)] = self.cached
+				(self.gen, self.cached) = (gen, cached)
+				
+			changed = (store.gen[:top] != self.gen[:top]) | (self.cached[:top] ^ 1)
+			todo = numpy.flatnonzero(changed & store.used[:top])
+			gone = numpy.flatnonzero(self.cached & ~store.used[:len(self.cached)].astype(bool))
+			
+			# copy the changed scenes' slot-values; encoding happens outside the lock
+			rows = [(int(nr), numpy.array(store.getSlots(int(nr)))) for nr in todo]
+			numbers = store.numbers()
+			self.gen[todo] = store.gen[todo]
+			
+		for nr in gone:
+			self.cache.pop(int(nr), None)
+			
+		self.cached[gone] = 0
+		
+		for (nr, values) in rows:
+			self.cache[nr] = self.encodeScene(nr, values)
+			
+		self.cached[todo] = 1
+		
+		return ([self.cache[nr] for nr in numbers.tolist()], len(rows))
+	
+	def write(self, scenefile):
+		"""Write all scenes in the scene-store to the given XML-file.
+		Returns the nr of scenes that had to be (re-)encoded
+		"""
+		(scenes, encoded) = self.update()
+		
+		def write_func(sf):
+			sf.write("<?xml version=\"1.0\" ?>\n<DMXScenes>\n")
+			sf.write(''.join(scenes))
+			sf.write("</DMXScenes>\n")
+			
+		atomicWrite(scenefile, write_func)
+		return encoded
+
+
+###
+# Binary scene-archives
+###
+
+class DMXSceneArchive(object):
+	"""A (read-only) binary scene-archive.
+	The archive consists of:
+	- a 16-byte header; magic 'DMXA', version, flags & the nr of scenes
+	- an index; for each scene its scene-number, file-offset, record-length & nr of slots, sorted by scene-number
+	- the per-scene records; either the raw slot-values, or the zlib-compressed slot-values
+	  (if the 'compressed' flag is set)
+	The archive-file is memory-mapped, and only the index is parsed when the archive is opened.
+	"""
+	archiveMagic = 'DMXA'
+	archiveVersion = 1
+	archiveHeader = '<4sHHL4x'
+	
+	flagCompressed = 0x0001
+	
+	indexFormat = [('nr', '<u4'), ('offset', '<u4'), ('length', '<u2'), ('size', '<u2')]
+	
+	def __init__(self, filename):
+		"""Open and memory-map the given scene-archive, and parse its index
+		"""
+		self.filename = filename
+		self.af = open(filename, 'rb')
+		self.mm = None
+		
+		try:
+			hdr_size = struct.calcsize(self.archiveHeader)
+			header = self.af.read(hdr_size)
+			if len(header) < hdr_size:
+				raise DMXError("Scene-archive '%s' is too short" % filename)
+				
+			(magic, version, self.flags, count) = struct.unpack(self.archiveHeader, header)
+			if (magic != self.archiveMagic) or (version != self.archiveVersion):
+				raise DMXError("'%s' is not a (version %d) scene-archive" % (filename, self.archiveVersion))
+				
+			if count:
+				self.mm = mmap.mmap(self.af.fileno(), 0, access=mmap.ACCESS_READ)
+				self.index = numpy.frombuffer(self.mm, dtype=self.indexFormat, count=count, offset=hdr_size)
+			else:
+				self.index = numpy.zeros(0, dtype=self.indexFormat)
+				
+		except:
+			self.af.close()
+			raise
+	
+	def __len__(self):
+		"""Return the nr of scenes in the archive
+		"""
+		return len(self.index)
+	
+	def isArchive(cls, filename):
+		"""Return True if the given file is a scene-archive
+		"""
+		af = open(filename, 'rb')
+		magic = af.read(len(cls.archiveMagic))
+		af.close()
+		return (magic == cls.archiveMagic)
+		
+	isArchive = classmethod(isArchive)
+	
+	def numbers(self):
+		"""Return an array with the scene-numbers of all scenes in the archive, in ascending order
+		"""
+		return self.index['nr'].astype(int)
+	
+	def sizes(self):
+		"""Return an array with the nr of slots of all scenes in the archive (in scene-number order)
+		"""
+		return self.index['size']
+	
+	def readScene(self, nr):
+		"""Return the slot-values of the given scene as an array.
+		For an uncompressed archive, this array is a read-only view on the memory-mapped file
+		"""
+		idx = numpy.searchsorted(self.index['nr'], nr)
+		if (idx >= len(self.index)) or (self.index['nr'][idx] != nr):
+			raise IndexError("Scene %d is not in scene-archive '%s'" % (nr, self.filename))
+			
+		(nr, offset, length, size) = self.index[idx].item()
+		
+		if self.flags & self.flagCompressed:
+			values = numpy.fromstring(zlib.decompress(self.mm[offset:offset + length]), dtype=numpy.uint8)
+		else:
+			values = numpy.frombuffer(self.mm, dtype=numpy.uint8, count=length, offset=offset)
+			
+		if len(values) != size:
+			raise DMXError("Corrupt record for scene %d in scene-archive '%s'" % (nr, self.filename))
+			
+		return values
+	
+	def close(self):
+		"""Close the archive-file
+		"""
+		self.index = numpy.zeros(0, dtype=self.indexFormat)
+		
+		if self.mm != None:
+			self.mm.close()
+			self.mm = None
+			
+		self.af.close()
+
+def writeSceneArchive(store, filename, compress=False):
+	"""Write all scenes in the given DMXSceneStore to a binary scene-archive (see DMXSceneArchive)
+	If 'compress' is True, each scene's record is zlib-compressed.
+	"""
+	with store.lock:
+		nrs = store.numbers()
+		index = numpy.zeros(len(nrs), dtype=DMXSceneArchive.indexFormat)
+		index['nr'] = nrs
+		index['size'] = store.sizes[nrs]
+		
+		if compress:
+			records = [zlib.compress(store.getSlots(int(nr)).tostring()) for nr in nrs]
+		else:
+			store.pageInAll()
+			records = [store.slots[nr, :size].tostring() for (nr, size) in zip(nrs, index['size'])]
+			
+	index['length'] = [len(rec) for rec in records]
+	
+	hdr_size = struct.calcsize(DMXSceneArchive.archiveHeader)
+	ends = numpy.cumsum(index['length'].astype(numpy.uint32))
+	index['offset'][0:1] = hdr_size + index.nbytes
+	index['offset'][1:] = hdr_size + index.nbytes + ends[:-1]
+	
+	flags = 0
+	if compress:
+		flags |= DMXSceneArchive.flagCompressed
+		
+	def write_func(af):
+		af.write(struct.pack(DMXSceneArchive.archiveHeader, DMXSceneArchive.archiveMagic, DMXSceneArchive.archiveVersion, flags, len(nrs)))
+		af.write(index.tostring())
+		af.write(''.join(records))
+		
+	atomicWrite(filename, write_func)
+
+def loadSceneFile(store, scenefile):
+	"""Load the given scene-file (XML or binary scene-archive) into the given DMXSceneStore
+	Returns a dict with load-statistics (see DMXSceneFileReader.read(...))
+	"""
+	if DMXSceneArchive.isArchive(scenefile):
+		start = time.time()
+		archive = DMXSceneArchive(scenefile)
+		count = len(archive)
+		store.attachArchive(archive)
+		return {'scenes':count, 'bytes':os.path.getsize(scenefile), 'time':time.time() - start}
+		
+	return DMXSceneFileReader(store).read(scenefile)
+
+def saveSceneFile(store, scenefile, compress=False, writer=None):
+	"""Save the scenes in the given DMXSceneStore to the given scene-file.
+	Files with the extension '.dmxa' are written as binary scene-archives, all others as XML.
+	Pass a DMXSceneFileWriter as 'writer' to re-use its encoded scenes when writing XML.
+	"""
+	if scenefile.endswith('.dmxa'):
+		writeSceneArchive(store, scenefile, compress)
+	else:
+		if writer is None:
+			writer = DMXSceneFileWriter(store)
+			
+		writer.write(scenefile)
+
+class DMXSceneSaver(threading.Thread):
+	"""Background-thread that saves a DMXSceneStore to its scene-file.
+	Save-requests to the same scene-file made while a save is in progress are collapsed into one follow-up save.
+	"""
+	def __init__(self, store):
+		"""Set-up (but don't start) a saver-thread for the given DMXSceneStore
+		"""
+		threading.Thread.__init__(self, name="DMXSceneSaver")
+		self.setDaemon(True)
+		
+		self.store = store
+		self.writer = DMXSceneFileWriter(store)
+		self.cond = threading.Condition()
+		self.pending = []		# [scenefile, compress, callbacks] of every pending save, in order
+		self.saving = False
+		self.running = True
+		self.saves = 0
+	
+	def save(self, scenefile, compress=False, callback=None, wait=False):
+		"""Request that the scene-store be saved to the given scene-file.
+		If given, 'callback' is called as callback(scenefile, error) once the file is written;
+		'error' is None if the save succeeded.
+		If 'wait' is True, block until the file is written, and raise any error.
+		"""
+		if wait:
+			done = threading.Event()
+			result = []
+			
+			def waiter(filename, error):
+				result.append(error)
+				done.set()
+				if callback != None:
+					callback(filename, error)
+					
+			self.save(scenefile, compress, waiter)
+			done.wait()
+			if result[0] != None:
+				raise result[0]
+				
+			return
+			
+		with self.cond:
+			for pending in self.pending:
+				if pending[0] == scenefile:
+					pending[1] = compress
+					break
+			else:
+				pending = [scenefile, compress, []]
+				self.pending.append(pending)
+				
+			if callback != None:
+				pending[2].append(callback)
+				
+			self.cond.notify()
+	
+	def busy(self):
+		"""Returns True if a save is in progress or pending
+		"""
+		with self.cond:
+			return self.saving or bool(len(self.pending))
+	
+	def run(self):
+		while True:
+			with self.cond:
+				while self.running and not len(self.pending):
+					self.cond.wait()
+					
+				if not len(self.pending):
+					return
+					
+				(scenefile, compress, callbacks) = self.pending.pop(0)
+				self.saving = True
+				
+			try:
+				saveSceneFile(self.store, scenefile, compress, self.writer)
+				error = None
+			except Exception, err:
+				error = err
+				
+			with self.cond:
+				self.saving = False
+				self.saves += 1
+				
+			for cb in callbacks:
+				cb(scenefile, error)
+	
+	def stop(self):
+		"""Stop the saver-thread, after completing any pending save
+		"""
+		with self.cond:
+			self.running = False
+			self.cond.notify()
+			
+		if self.isAlive():
+			self.join()
+
+
+###
+# Main 
+###
+# Converts XML scene-files into binary scene-archives and vice versa
+###
+
+if __name__ == '__main__':
+	op = optparse.OptionParser(usage="%prog [options] <infile> <outfile>\n" +
+					"Convert an XML scene-file into a binary scene-archive or vice versa.\n" +
+					"The <outfile> format is determined by its extension: '.dmxa' for scene-archives, XML otherwise")
+					
+	op.add_option("-z", "--compress", action='store_true', dest='compress',
+									help="compress the scene-records in the scene-archive")
+	op.set_defaults(compress=False)
+	
+	(opts, args) = op.parse_args()
+	if len(args) != 2:
+		op.error("expected <infile> and <outfile> arguments")
+		
+	store = DMXSceneStore()
+	stats = loadSceneFile(store, args[0])
+	sys.stdout.write("loaded %d scenes from '%s' in %.1f ms\n" % (stats['scenes'], args[0], stats['time'] * 1000))
+	
+	start = time.time()
+	saveSceneFile(store, args[1], opts.compress)
+	sys.stdout.write("saved %d scenes to '%s' in %.1f ms\n" % (len(store.numbers()), args[1], (time.time() - start) * 1000))
+	
+	store.close()
@@ -0,0 +1,195 @@
+#!/usr/bin/python
+
+###
+# Worker-pool OSC Server
+###
+# An OSCServer that hands incoming datagrams to a fixed pool of worker-threads, through a bounded queue,
+# instead of starting a new thread for every datagram (like OSC.ThreadingOSCServer does).
+# When the queue is full, the 'overload-policy' decides which datagrams are dropped:
+#	'drop-oldest'	discard the oldest queued datagram to make room for the new one (default)
+#	'drop-newest'	discard the new datagram
+#	'block'		stop receiving until there is room in the queue (the OS drops datagrams once its socket-buffer is full)
+# With 0 workers, datagrams are handled one at a time, in the receiving thread (an event-loop)
+#
+# The server counts received, handled & dropped datagrams, and keeps the latency (from reception
+# until the handler has finished) of the last 1024 datagrams (see dmxstats.py)
+# When a DMXTracer is set (see dmxtrace.py), every datagram gets a trace-id, and its time in the queue
+# and in the handler are traced.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import time, threading, Queue
+
+import OSC
+
+from dmxstats import *
+
+
+class PooledOSCServer(OSC.OSCServer):
+	"""An Asynchronous OSCServer.
+	This server handles incoming requests with a fixed pool of worker-threads
+	"""
+	# the messages in a bundle are dispatched one after another, by the same worker
+	RequestHandlerClass = OSC.OSCRequestHandler
+	
+	overload_policies = ('drop-oldest', 'drop-newest', 'block')
+	
+	# a DMXTracer, or None when tracing is disabled
+	tracer = None
+	
+	def __init__(self, server_address, client=None, return_port=0, workers=4, queue_size=256, overload='drop-oldest'):
+		"""Instantiate a PooledOSCServer.
+		  - workers (int): the nr of worker-threads. With 0 workers, requests are handled in the receiving thread
+		  - queue_size (int): the max. nr of requests waiting to be handled
+		  - overload (string): what to do when the queue is full; 'drop-oldest', 'drop-newest' or 'block'
+		(see OSC.OSCServer for the other arguments)
+		"""
+		if overload not in self.overload_policies:
+			raise ValueError("Unknown overload-policy '%s'" % str(overload))
+			
+		OSC.OSCServer.__init__(self, server_address, client, return_port)
+		
+		self.workers = workers
+		self.overload = overload
+		self.queue = Queue.Queue(queue_size)
+		self.threads = []
+		
+		self.received = 0
+		self.dropped = 0
+		self.handled = 0
+		self.handled_lock = threading.Lock()
+		self.latencies = DMXStatsRing(1024)
+	
+	def __str__(self):
+		"""Returns a string containing this Server's Class-name, software-version, local bound address (if any)
+		and worker-pool configuration
+		"""
+		out = OSC.OSCServer.__str__(self)
+		if self.workers:
+			out += " (%d workers, queue %d, %s)" % (self.workers, self.queue.maxsize, self.overload)
+			
+		return out
+	
+	def process_request(self, request, client_address):
+		"""Queue the request for the worker-threads, or handle it right here if there are no workers.
+		"""
+		self.received += 1
+		if not self.workers:
+			start = time.time()
+			self._handle(request, client_address, start)
+			self.latencies.add(time.time() - start)
+			return
+			
+		item = (request, client_address, time.time())
+		if self.overload == 'block':
+			while self.running:
+				try:
+					self.queue.put(item, True, self.socket_timeout)
+					return
+				except Queue.Full:
+					continue
+			return
+			
+		try:
+			self.queue.put_nowait(item)
+			return
+		except Queue.Full:
+			self.dropped += 1
+			
+		if self.overload == 'drop-newest':
+			return
+			
+		try:
+			self.queue.get_nowait()
+		except Queue.Empty:
+			pass
+			
+		try:
+			self.queue.put_nowait(item)
+		except Queue.Full:
+			pass
+	
+	def _handle(self, request, client_address, queued):
+		"""Handle one request, reporting any errors
+		"""
+		tracer = self.tracer
+		if tracer != None:
+			trace_id = tracer.newId()
+			start = time.time()
+			tracer.span('osc-queued', queued, start, trace_id)
+			tracer.setCurrent(trace_id)
+			
+		try:
+			self.finish_request(request, client_address)
+		except:
+			self.handle_error(request, client_address)
+			
+		if tracer != None:
+			tracer.setCurrent(0)
+			tracer.span('osc-dispatch', start, time.time(), trace_id, flow=True)
+			
+		self.close_request(request)
+		with self.handled_lock:
+			self.handled += 1
+	
+	def _work(self):
+		"""Worker-thread; handle queued requests until the server is closed
+		"""
+		while self.running:
+			try:
+				(request, client_address, queued) = self.queue.get(True, self.socket_timeout)
+			except Queue.Empty:
+				continue
+				
+			self._handle(request, client_address, queued)
+			self.latencies.add(time.time() - queued)
+	
+	def serve_forever(self):
+		"""Start the worker-threads, and receive requests until the server is closed
+		"""
+		self.running = True
+		for i in range(self.workers):
+			t = threading.Thread(target=self._work, name="PooledOSCServer-worker-%d" % i)
+			t.setDaemon(True)
+			t.start()
+			self.threads.append(t)
+			
+		while self.running:
+			self.handle_request()	# this times-out when no data arrives.
+			
+		for t in self.threads:
+			t.join()
+			
+		self.threads = []
+	
+	def queueDepth(self):
+		"""Return the nr of requests waiting to be handled
+		"""
+		return self.queue.qsize()
+	
+	def getStats(self):
+		"""Return a dict with the server's statistics; request-counts, queue-depth and handler-latency percentiles (in ms)
+		"""
+		(p50, p90, p99) = self.latencies.percentiles([50, 90, 99])
+		return {'osc_received':self.received, 'osc_handled':self.handled, 'osc_dropped':self.dropped,
+				'queue_depth':self.queueDepth(), 'queue_size':self.queue.maxsize, 'workers':self.workers,
+				'latency_ms_p50':p50 * 1000, 'latency_ms_p90':p90 * 1000, 'latency_ms_p99':p99 * 1000,
+				'latency_ms_max':self.latencies.max() * 1000}
+	
+	def resetStats(self):
+		"""Reset the request-counts and handler-latencies
+		"""
+		self.received = 0
+		self.dropped = 0
+		self.handled = 0
+		self.latencies.clear()
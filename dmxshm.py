@@ -0,0 +1,346 @@
+#!/usr/bin/python
+
+###
+# DMX Split-mode; the serial-output in a process of its own
+###
+# In split mode, the 'DMX USB Pro' box is owned by a separate output-process (see dmxOutputLoop(...)), which runs
+# a steady clocked loop, writing the most recent frame to the box once per tick. The front-end process (OSC-server,
+# message-handlers, merging, fades & effects) only renders the frames, and never waits for the serial-port.
+# Both processes have their own interpreter (and GIL), so busy handlers don't delay the output's timing.
+#
+# The processes talk through shared memory only:
+#	- a DMXSharedUniverse holds the most recent frame, guarded by a sequence-counter (a 'seqlock'); the front-end
+#	  makes the counter odd, writes the frame and makes it even again. The output-process copies the frame, and
+#	  copies it again if the counter was odd, or changed while copying. Neither side ever waits for the other.
+#	  The output-process keeps its statistics in the same block.
+#	- a DMXCommandRing passes commands (e.g. 'send once', 'quit') from the front-end to the output-process;
+#	  a single-producer, single-consumer ring with a head- and a tail-counter, each written by one side only.
+#
+# In the front-end, a DMXSharedBox stands in for the DMXUSBPro-object, so DMXCtrl works the same in both modes
+# (see the '--split' option of dmxctrl.py). DMX-input needs the box' replies, so it's not available in split mode.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import os, threading, time
+
+import numpy
+
+try:
+	import multiprocessing		# Python 2.6+
+except ImportError:
+	multiprocessing = None
+
+from dmx512 import *
+from dmxusbpro import *
+
+
+class DMXSharedUniverse(object):
+	"""A DMX-frame in shared memory, with a sequence-counter (see the module-description)
+	and the output-process' statistics
+	"""
+	head_size = 64
+	frame_size = DMXPacket.packetMaxSlots + 1
+	
+	# the counters, in the head of the block
+	SEQ = 0				# the sequence-counter; odd while the frame is being written
+	SIZE = 1			# the frame's size, including the startcode
+	FRAMES = 2			# the nr of frames written to the box
+	LATE = 3			# the nr of ticks the output-process started too late (by more than one tick)
+	WRITE_US = 4			# the total time (in us) taken by the serial-writes
+	WRITE_MAX_US = 5		# the longest serial-write (in us)
+	ERRORS = 6			# the nr of failed serial-writes
+	
+	def __init__(self):
+		if multiprocessing == None:
+			raise DMXUSBError("Split mode needs the 'multiprocessing' module (Python 2.6+)")
+			
+		self.raw = multiprocessing.RawArray('B', self.head_size + self.frame_size)
+		self._map()
+	
+	def _map(self):
+		"""Create the numpy-views on the shared block
+		"""
+		self.counters = numpy.frombuffer(self.raw, dtype=numpy.int64, count=self.head_size / 8)
+		self.frame = numpy.frombuffer(self.raw, dtype=numpy.uint8, count=self.frame_size, offset=self.head_size)
+	
+	def __getstate__(self):
+		return {'raw':self.raw}
+	
+	def __setstate__(self, state):
+		self.raw = state['raw']
+		self._map()
+	
+	def publish(self, data):
+		"""Write a new frame (a string; the startcode, followed by the slot-values). There must be only one writer.
+		"""
+		size = min(len(data), self.frame_size)
+		self.counters[self.SEQ] += 1
+		self.frame[:size] = numpy.fromstring(data[:size], dtype=numpy.uint8)
+		self.counters[self.SIZE] = size
+		self.counters[self.SEQ] += 1
+	
+	def sequence(self):
+		"""Return the sequence-counter; it changes with every frame written
+		"""
+		return int(self.counters[self.SEQ])
+	
+	def read(self):
+		"""Return a consistent copy of the most recent frame, as a tuple (sequence-counter, frame-string)
+		"""
+		while True:
+			seq = self.counters[self.SEQ]
+			if seq & 1:
+				continue
+				
+			data = self.frame[:int(self.counters[self.SIZE])].tostring()
+			if self.counters[self.SEQ] == seq:
+				return (int(seq), data)
+
+
+class DMXCommandRing(object):
+	"""A single-producer, single-consumer ring of fixed-size commands in shared memory (see the module-description)
+	A command is an opcode and up to 3 float arguments. In the front-end, push() may be called from any thread.
+	"""
+	QUIT = 1			# stop the output-process
+	ONCE = 2			# send the current frame once (with 'TX_DMX_RX_DMX'), as the last frame before closing
+	
+	def __init__(self, size=64):
+		if multiprocessing == None:
+			raise DMXUSBError("Split mode needs the 'multiprocessing' module (Python 2.6+)")
+			
+		self.size = size
+		self.raw = multiprocessing.RawArray('B', 16 + (size * 4 * 8))
+		self.lock = threading.Lock()	# serializes the front-end's threads; the ring itself needs no lock
+		self._map()
+	
+	def _map(self):
+		"""Create the numpy-views on the shared block
+		"""
+		self.counters = numpy.frombuffer(self.raw, dtype=numpy.int64, count=2)	# head (written by the producer), tail (written by the consumer)
+		self.slots = numpy.frombuffer(self.raw, dtype=numpy.float64, offset=16).reshape((self.size, 4))
+	
+	def __getstate__(self):
+		return {'raw':self.raw, 'size':self.size}
+	
+	def __setstate__(self, state):
+		(self.raw, self.size) = (state['raw'], state['size'])
+		self.lock = threading.Lock()
+		self._map()
+	
+	def __len__(self):
+		return int(self.counters[0] - self.counters[1])
+	
+	def push(self, opcode, *args):
+		"""Add a command. Returns False if the ring is full.
+		"""
+		with self.lock:
+			head = self.counters[0]
+			if head - self.counters[1] >= self.size:
+				return False
+				
+			slot = self.slots[int(head) % self.size]
+			slot[1:] = 0
+			slot[1:1 + len(args)] = args
+			slot[0] = opcode
+			self.counters[0] = head + 1
+			return True
+	
+	def pop(self):
+		"""Take the oldest command, as a tuple (opcode, arg1, arg2, arg3). Returns None if the ring is empty.
+		"""
+		tail = self.counters[1]
+		if tail == self.counters[0]:
+			return None
+			
+		cmd = tuple(self.slots[int(tail) % self.size].tolist())
+		self.counters[1] = tail + 1
+		return (int(cmd[0]),) + cmd[1:]
+
+
+def dmxOutputLoop(serport, universe, ring, pipe, parent_pid):
+	"""The output-process' main function; open the box on 'serport', report the box (or the error) back through 'pipe',
+	then send the frames published in 'universe' (a DMXSharedUniverse) to the box, at most one per tick,
+	and carry out the commands from 'ring' (a DMXCommandRing), until told to quit (or the front-end process has gone)
+	A failed serial-write (e.g. the box was unplugged) is counted, and the frame is sent again on the next tick.
+	"""
+	try:
+		box = DMXUSBPro(serport)
+	except BaseException, e:	# DMXUSBError is not an Exception
+		pipe.send(('error', "%s: %s" % (e.__class__.__name__, str(e))))
+		pipe.close()
+		return
+		
+	pipe.send(('ok', str(box), box.params, box.serial))
+	pipe.close()
+	
+	counters = universe.counters
+	period = 1. / (box.params['dmx_rate'] or 40)
+	sent = 0		# nothing is sent until the first frame is published
+	next = time.time()
+	try:
+		while True:
+			cmd = ring.pop()
+			while cmd != None:
+				if cmd[0] == DMXCommandRing.QUIT:
+					return
+					
+				if cmd[0] == DMXCommandRing.ONCE:
+					packet = DMXPacket()
+					packet.fromString(universe.read()[1])
+					try:
+						box.sendDMXPacketOnce(packet)
+					except (DMXUSBError, DMXError, Exception):	# DMXUSBError & DMXError are not Exceptions
+						counters[universe.ERRORS] += 1
+						
+				cmd = ring.pop()
+				
+			if universe.sequence() != sent:
+				(seq, data) = universe.read()
+				packet = DMXPacket()
+				packet.fromString(data)
+				start = time.time()
+				try:
+					box.sendDMX(packet)
+				except (DMXUSBError, DMXError, Exception):
+					counters[universe.ERRORS] += 1
+				else:
+					sent = seq
+					write_us = int((time.time() - start) * 1e6)
+					counters[universe.FRAMES] += 1
+					counters[universe.WRITE_US] += write_us
+					if write_us > counters[universe.WRITE_MAX_US]:
+						counters[universe.WRITE_MAX_US] = write_us
+						
+			if os.getppid() != parent_pid:
+				return
+				
+			next += period
+			now = time.time()
+			if now < next:
+				time.sleep(next - now)
+			else:
+				if now - next > period:
+					counters[universe.LATE] += 1
+					
+				next = now
+				
+	finally:
+		box.close()
+
+
+class DMXSharedBox(object):
+	"""Stands in for a DMXUSBPro-object in the front-end process; the box itself is opened in an output-process
+	(see dmxOutputLoop(...)), and frames are handed over through shared memory (see the module-description)
+	"""
+	# a DMXTracer, or None when tracing is disabled. The serial-writes happen in the output-process,
+	# so only the hand-over to shared memory is traced
+	tracer = None
+	
+	def __init__(self, serport='/dev/ttyUSB0', timeout=10.):
+		"""Start the output-process, and wait (at most 'timeout' seconds) until it has opened the box
+		on the specified (USB-)serial port. Errors opening the box are raised as a DMXUSBError
+		"""
+		self.universe = DMXSharedUniverse()
+		self.ring = DMXCommandRing()
+		(here, there) = multiprocessing.Pipe(False)
+		self.process = multiprocessing.Process(target=dmxOutputLoop, name="DMXOutput",
+								args=(serport, self.universe, self.ring, there, os.getpid()))
+		self.process.daemon = True
+		self.process.start()
+		there.close()
+		
+		try:
+			if not here.poll(timeout):
+				raise DMXUSBError("Output-process didn't open the box within %g s" % timeout)
+				
+			reply = here.recv()
+		except:
+			self.process.terminate()
+			self.process.join()
+			raise
+			
+		here.close()
+		if reply[0] != 'ok':
+			self.process.join()
+			raise DMXUSBError(reply[1])
+			
+		(self.name, self.params, self.serial) = reply[1:]
+	
+	def __str__(self):
+		return "%s, in output-process %d" % (self.name, self.process.pid)
+	
+	def isAlive(self):
+		return self.process.is_alive()
+	
+	def sendDMX(self, dmx_packet):
+		"""Hand a DMXPacket over to the output-process; it is sent on the output-process' next tick,
+		unless a newer DMXPacket is handed over before that. Raises a DMXUSBError if the output-process has stopped.
+		"""
+		if not self.process.is_alive():
+			raise DMXUSBError("Output-process %d has stopped" % self.process.pid)
+			
+		tracer = self.tracer
+		if tracer != None:
+			start = time.time()
+			
+		self.universe.publish(str(dmx_packet))
+		
+		if tracer != None:
+			tracer.span('shm-publish', start, time.time())
+	
+	def sendDMXPacketOnce(self, dmx_packet):
+		"""Have the output-process send the DMXPacket once (with the 'TX_DMX_RX_DMX' message)
+		"""
+		if not self.process.is_alive():
+			raise DMXUSBError("Output-process %d has stopped" % self.process.pid)
+			
+		self.universe.publish(str(dmx_packet))
+		if not self.ring.push(DMXCommandRing.ONCE):
+			raise DMXUSBError("Output-process command-ring is full")
+	
+	def receiveDMX(self):
+		raise DMXUSBError("DMX-input is not available in split mode")
+	
+	def setDMXRXOnChange(self, mode=True):
+		raise DMXUSBError("DMX-input is not available in split mode")
+	
+	def getStats(self):
+		"""Return a dict with the output-process' runtime-statistics:
+		'output_frames':		the nr of DMX-packets written to the box
+		'output_late':			the nr of ticks the output-process started more than one tick late
+		'output_write_ms_mean':	the mean time taken to write a DMX-packet to the serial-port
+		'output_write_ms_max':		the longest time taken to write a DMX-packet to the serial-port
+		'output_errors':		the nr of failed writes to the serial-port (each failed frame is sent again on the next tick)
+		'output_alive':		1 while the output-process is running, else 0
+		"""
+		counters = self.universe.counters
+		frames = int(counters[DMXSharedUniverse.FRAMES])
+		mean = 0.
+		if frames:
+			mean = counters[DMXSharedUniverse.WRITE_US] / 1000. / frames
+			
+		return {'output_frames':frames, 'output_late':int(counters[DMXSharedUniverse.LATE]),
+				'output_errors':int(counters[DMXSharedUniverse.ERRORS]),
+				'output_write_ms_mean':mean, 'output_write_ms_max':counters[DMXSharedUniverse.WRITE_MAX_US] / 1000.,
+				'output_alive':int(self.process.is_alive())}
+	
+	def close(self, timeout=2.):
+		"""Stop the output-process (which closes the box' serial-port), after it has carried out all pending commands
+		"""
+		if self.process.is_alive():
+			self.ring.push(DMXCommandRing.QUIT)
+			self.process.join(timeout)
+			
+		if self.process.is_alive():
+			self.process.terminate()
+			self.process.join()
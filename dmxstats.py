@@ -0,0 +1,96 @@
+#!/usr/bin/python
+
+###
+# DMX Runtime-statistics
+###
+# Fixed-size ring-buffers of measurements (frame-times, serial write-times, handler-latencies, ...)
+# from which rates, means and percentiles are computed on request.
+# Adding a measurement is cheap (one array-store), so the rings can stay enabled during shows.
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+from __future__ import with_statement
+
+import time, threading
+
+import numpy
+
+
+class DMXStatsRing(object):
+	"""Ring-buffer holding the last 'size' measurements (floats)
+	"""
+	def __init__(self, size=1024):
+		"""Set-up an empty ring-buffer for 'size' measurements
+		"""
+		self.lock = threading.Lock()
+		self.data = numpy.zeros(size, dtype=numpy.float64)
+		self.count = 0
+	
+	def __len__(self):
+		"""Return the nr of measurements held
+		"""
+		return min(self.count, len(self.data))
+	
+	def add(self, value):
+		"""Add a measurement, overwriting the oldest one if the ring is full
+		"""
+		with self.lock:
+			self.data[self.count % len(self.data)] = value
+			self.count += 1
+	
+	def values(self):
+		"""Return a copy of the measurements held (in no particular order)
+		"""
+		with self.lock:
+			return self.data[:len(self)].copy()
+	
+	def clear(self):
+		"""Remove all measurements
+		"""
+		with self.lock:
+			self.count = 0
+	
+	def mean(self):
+		"""Return the mean of the measurements held, or 0 if there are none
+		"""
+		values = self.values()
+		if not len(values):
+			return 0.
+			
+		return float(values.mean())
+	
+	def max(self):
+		"""Return the largest measurement held, or 0 if there are none
+		"""
+		values = self.values()
+		if not len(values):
+			return 0.
+			
+		return float(values.max())
+	
+	def percentiles(self, pcts):
+		"""Return the given percentiles (a list of numbers between 0 and 100) of the measurements held, as a list.
+		(nearest-rank; all 0 if there are no measurements)
+		"""
+		values = numpy.sort(self.values())
+		if not len(values):
+			return [0.] * len(pcts)
+			
+		idx = numpy.round((len(values) - 1) * (numpy.asarray(pcts, dtype=numpy.float64) / 100.)).astype(int)
+		return values[idx].tolist()
+	
+	def rate(self, window=1.):
+		"""Treating the measurements as time-stamps, return the nr of time-stamps per second
+		within the last 'window' seconds
+		"""
+		values = self.values()
+		now = time.time()
+		return (values > (now - window)).sum() / float(window)
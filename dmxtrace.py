@@ -0,0 +1,132 @@
+#!/usr/bin/python
+
+###
+# DMX Latency-tracing
+###
+# Time-stamps the stages a control-message passes through, from OSC-reception to the serial-port:
+#	'osc-queued'	waiting in the OSC-server's queue (see PooledOSCServer)
+#	'osc-dispatch'	decoding & handling the OSC-message (the handler's own stages are nested in this)
+#	'render'	updating the DMXPacket (the output-buffer, merged with the other merge-sources)
+#	'box-send'	sending the DMXPacket to the box; this contains:
+#	'usb-framing'	building the DMXUSBPacket
+#	'serial-write'	writing it to the serial-port
+# Every OSC-message gets a trace-id, and each 'box-send' lists the trace-ids of the messages whose changes it carries,
+# so a message can be followed up to the DMX-frame that put it on the wire.
+#
+# Events are stored in a fixed-size ring-buffer without locking; a slot is claimed by taking the next
+# value of an itertools.count(), which is atomic in CPython.
+# Tracing is disabled by default, and then costs one 'tracer != None' test per stage.
+#
+# The ring-buffer can be dumped as a Chrome trace-file (JSON; open it in chrome://tracing)
+#
+# Stock, V2_Lab Rotterdam, Aug 2008
+###
+
+###
+# Changelog
+###
+# version 0.1
+#	initial version
+###
+
+import itertools, os, time, threading
+
+
+class DMXTracer(object):
+	"""Ring-buffer holding the last 'size' trace-events.
+	An event is a span of time (start & end, as returned by time.time()) on the calling thread, with a name,
+	an optional trace-id, and optional links to other trace-ids
+	"""
+	def __init__(self, size=65536):
+		"""Set-up an empty ring-buffer for 'size' events
+		"""
+		self.size = size
+		self.events = [None] * size
+		self.slots = itertools.count()
+		self.ids = itertools.count(1)
+		self.local = threading.local()
+		self.epoch = time.time()
+	
+	def __len__(self):
+		"""Return the nr of events held
+		"""
+		return len(self.events) - self.events.count(None)
+	
+	def newId(self):
+		"""Return a new (unique) trace-id
+		"""
+		return self.ids.next()
+	
+	def setCurrent(self, trace_id):
+		"""Set the trace-id of the message being handled by the calling thread (0 for none)
+		"""
+		self.local.id = trace_id
+	
+	def current(self):
+		"""Return the trace-id of the message being handled by the calling thread, or 0 if there is none
+		"""
+		return getattr(self.local, 'id', 0)
+	
+	def span(self, name, start, end, trace_id=0, links=None, flow=False):
+		"""Record an event. 'links' is a list of the trace-ids of earlier events that lead to this one.
+		If 'flow' is True, this event starts the flow of the given trace-id (and later events link to it)
+		"""
+		self.events[self.slots.next() % self.size] = (name, start, end, threading.currentThread().getName(), trace_id, links, flow)
+	
+	def clear(self):
+		"""Remove all events
+		"""
+		self.events = [None] * self.size
+	
+	def getEvents(self):
+		"""Return the events held, ordered by start-time
+		"""
+		events = [ev for ev in list(self.events) if ev != None]
+		events.sort(key=lambda ev: ev[1])
+		return events
+	
+	def chromeTrace(self):
+		"""Return the events held as a Chrome trace (a dict with a list of 'traceEvents')
+		"""
+		pid = os.getpid()
+		out = []
+		threads = {}
+		for (name, start, end, thread, trace_id, links, flow) in self.getEvents():
+			tid = threads.setdefault(thread, len(threads) + 1)
+			ts = (start - self.epoch) * 1e6
+			ev = {'name':name, 'cat':'dmx', 'ph':'X', 'ts':ts, 'dur':(end - start) * 1e6, 'pid':pid, 'tid':tid}
+			if trace_id:
+				ev['args'] = {'trace_id':trace_id}
+				
+			if links:
+				ev['args'] = {'trace_ids':links}
+				
+			out.append(ev)
+			
+			if flow and trace_id:
+				out.append({'name':'msg', 'cat':'dmx', 'ph':'s', 'id':trace_id, 'ts':ts, 'pid':pid, 'tid':tid})
+				
+			for link in links or []:
+				out.append({'name':'msg', 'cat':'dmx', 'ph':'f', 'bp':'e', 'id':link, 'ts':ts, 'pid':pid, 'tid':tid})
+				
+		for (thread, tid) in threads.items():
+			out.append({'name':'thread_name', 'ph':'M', 'pid':pid, 'tid':tid, 'args':{'name':thread}})
+			
+		return {'traceEvents':out, 'displayTimeUnit':'ms'}
+	
+	def dump(self, filename):
+		"""Write the events held to the given file, as a Chrome trace (JSON). Returns the nr of events written
+		"""
+		try:
+			import json		# imported when first needed, to keep start-up fast
+		except ImportError:
+			import simplejson as json
+			
+		trace = self.chromeTrace()
+		f = open(filename, 'w')
+		try:
+			json.dump(trace, f)
+		finally:
+			f.close()
+			
+		return len([ev for ev in trace['traceEvents'] if ev['ph'] == 'X'])
@@ -20,6 +20,16 @@
 # version 0.1.1
 #	Added DMXUSBPro.setTimeout() method
 ###
+# version 0.1.2
+#	DMXUSBPro.read_packet() reads the packet's length-header, and then the whole packet in one read,
+#	instead of reading byte-by-byte up to the first end-of-message byte (which may also occur in the data)
+###
+# version 0.1.3
+#	DMXUSBPro.send() traces the packet-framing & the serial write, when a DMXTracer is set (see dmxtrace.py)
+###
+# version 0.1.4
+#	DMXUSBPro() also accepts an opened serial-port object (or a stand-in, see dmxbench.py) instead of a device-name
+###
 
 import string, struct, time, types, os
 import serial
@@ -646,12 +656,20 @@ class DMXUSBSendRDMDiscoveryPacket(DMXUSBPacket):
 class DMXUSBPro(object):
 	"""Class (object) to interface with the Enttec 'DMX USB Pro' box
 	"""
+	# a DMXTracer, or None when tracing is disabled
+	tracer = None
+	
 	def __init__(self, serport='/dev/ttyUSB0'):
 		"""Initialize & open the specified (USB-)serial port
+		'serport' can also be an opened serial.Serial object (or anything with the same read(), write(),
+		flush(), setTimeout() & close() methods)
 		Confirm weather a 'DMX USB Pro' box is in fact connected by exchanging the
 		'GET_WIDGET_PARAMS' and 'GET_WIDGET_SERIAL' messages
 		"""
-		self.ser = serial.Serial(serport)
+		if type(serport) in types.StringTypes:
+			self.ser = serial.Serial(serport)
+		else:
+			self.ser = serport
 		self.setTimeout(1)
 		
 		self.dmx_in = DMXPacket()
@@ -692,6 +710,10 @@ class DMXUSBPro(object):
 		The provided argument can be a DMXUSB*Packet instance or a string,
 		in which case the string is first turned into a USBDMXPacket
 		"""
+		tracer = self.tracer
+		if tracer != None:
+			start = time.time()
+			
 		if isinstance(packet, DMXUSBPacket):
 			out = str(packet)
 		elif type(packet) in types.StringTypes:
@@ -701,24 +723,36 @@ class DMXUSBPro(object):
 		else:
 			raise TypeError("Provided argument must be a DMXUSBPacket, or a string representaion of a valid DMXUSBPacket")
 
+		if tracer != None:
+			framed = time.time()
+			
 		self.ser.write(out)
 		self.ser.flush()		# wait for all data to be sent
 		
+		if tracer != None:
+			tracer.span('usb-framing', start, framed)
+			tracer.span('serial-write', framed, time.time())
+		
 	def read_packet(self):
-		eol_char ='%c' % DMXUSBCodes['EOM']
-		packet = []
+		"""Read one packet from the box; start-of-message, label & length, data and end-of-message.
+		Any bytes preceding the start-of-message are skipped.
+		Returns an empty string if the serial read times-out before a start-of-message is received.
+		"""
+		som_char = '%c' % DMXUSBCodes['SOM']
 		
 		while True:
 			c = self.ser.read(1)
-			if c:
-				packet.append(c)
-				if c == eol_char:
-					break
-			else:
+			if not c:
+				return ""
+			if c == som_char:
 				break
 		
-		packet_str = "".join(packet)
-		return packet_str
+		header = self.ser.read(3)
+		if len(header) < 3:
+			return som_char + header
+			
+		size = struct.unpack('<H', header[1:])[0]
+		return som_char + header + self.ser.read(size + 1)
 	
 	def receive(self):
 		"""Recieve a USBDMX*Packet from the box.